@@ -0,0 +1,61 @@
+# -*- code:utf-8 -*-
+# 模型注册表：model_type -> 构图函数，构图模块在第一次使用时才导入
+import importlib
+from . import metadata
+
+# model_type -> module of its graph builder
+REGISTRY = {
+    'textcnn': 'cnn',
+    'multi_layers_cnn': 'cnn',
+    'hierarchical_cnn': 'cnn',
+    'text_dp_cnn': 'cnn',
+    'text_dense': 'dense',
+    'text_conv_dense': 'dense',
+    'text_inception_dense': 'dense',
+    'text_inception': 'inception',
+    'dpcnn': 'inception',
+    'inception_dense_net': 'inception',
+    'inception_dense_net1': 'inception',
+    'inception_dense_net1_transpose': 'inception',
+    'text_cnn_lstm': 'rnn',
+    'text_bilstm': 'rnn',
+    'textlstm': 'rnn',
+}
+
+
+def model_types():
+    return sorted(REGISTRY)
+
+
+def check_model_type(model_type):
+    if model_type not in REGISTRY:
+        raise ValueError('unknown model_type %s, expected one of %s' % (
+            model_type, ', '.join(model_types())))
+
+
+def get_builder(model_type):
+    """
+    build(model) of model_type, adds the layers between
+    model.input_embedded and model._output to the default graph
+    """
+    check_model_type(model_type)
+    module = importlib.import_module('.' + REGISTRY[model_type], __name__)
+    return getattr(module, model_type)
+
+
+def info(model_type, config):
+    """
+    parameter count and forward FLOPs per token of model_type under config,
+    computed from the config alone, no graph is built
+    """
+    check_model_type(model_type)
+    try:
+        layers, num_features = getattr(metadata, model_type)(config)
+        return metadata.summarize(config, layers, num_features)
+    except KeyError as e:
+        raise ValueError('config of %s misses %s' % (model_type, e))
+
+
+def check_config(model_type, config):
+    # raises ValueError when model_type cannot be built from config
+    info(model_type, config)
@@ -0,0 +1,259 @@
+# -*- code:utf-8 -*-
+# 卷积模型：TextCNN及多层CNN结构
+import tensorflow as tf
+
+
+def textcnn(model):
+    # Create a convolution + maxpool layer for each filter size
+    pooled_outputs = []
+    num_in = 1 if not model.config['embedding_type'] ==\
+        'multiple_channels' else 2
+    # normed_input = model._batch_norm_layer(
+    #     model.input_embedded, model.is_training, 'bn_embedding')
+    for i, filter_size in enumerate(model.config['filter_sizes']):
+        with tf.name_scope("conv-maxpool-%s" % filter_size):
+            # Convolution Layer
+            filter_shape = [filter_size,
+                            model.config['embedding_shape'][1],
+                            num_in, model.config['num_filters']]
+            W = tf.Variable(tf.truncated_normal(
+                filter_shape, stddev=0.1), name="W")
+            b = tf.Variable(tf.constant(
+                0.1, shape=[model.config['num_filters']]), name="b")
+            conv = tf.nn.conv2d(
+                model.input_embedded,
+                W,
+                strides=[1, 1, 1, 1],
+                padding="VALID",
+                name="conv")
+            # Apply nonlinearity
+            h = tf.nn.relu(tf.nn.bias_add(conv, b), name="relu")
+            # Maxpooling over the outputs
+            pooled = tf.nn.max_pool(
+                h,
+                ksize=[1, model.config['max_sent_length'] -
+                       filter_size + 1, 1, 1],
+                strides=[1, 1, 1, 1],
+                padding='VALID',
+                name="pool")
+            pooled_outputs.append(pooled)
+
+    # Combine all the pooled features
+    num_filters_total = model.config['num_filters'] *\
+        len(model.config['filter_sizes'])
+    model.h_pool = tf.concat(pooled_outputs, 3)
+    model.h_pool_flat = tf.reshape(model.h_pool, [-1, num_filters_total])
+
+    # Add dropout
+    with tf.name_scope("dropout"):
+        model.dropout_keep_prob = tf.placeholder(
+            tf.float32, name="dropout_keep_prob")
+        model.h_drop = tf.nn.dropout(
+            model.h_pool_flat, model.dropout_keep_prob)
+
+    # Final (unnormalized) scores and predictions
+    model._output(model.h_drop, num_filters_total)
+
+
+def multi_layers_cnn(model):
+    """
+
+    三层CNN叠加模型
+    """
+    filter_size = model.config['filter_sizes'][-1]
+    filter_shape = [filter_size, model.config['embedding_shape']
+                    [1], 1, model.config['num_filters'] * 3]
+    W = tf.Variable(tf.truncated_normal(
+        filter_shape, stddev=0.1), name="W")
+    b = tf.Variable(tf.constant(
+        0.1, shape=[model.config['num_filters'] * 3]), name="b")
+    conv = tf.nn.conv2d(
+        model.input_embedded,
+        W,
+        strides=[1, 1, 1, 1],
+        padding="VALID",
+        name="conv")
+    # Apply nonlinearity
+    h = tf.nn.relu(tf.nn.bias_add(conv, b), name="relu")
+    filter_shape = [filter_size, 1,
+                    model.config['num_filters'] * 3,
+                    model.config['num_filters'] * 6]
+    W = tf.Variable(tf.truncated_normal(
+        filter_shape, stddev=0.1), name="W")
+    b = tf.Variable(tf.constant(
+        0.1, shape=[model.config['num_filters'] * 6]), name="b")
+    conv = tf.nn.conv2d(
+        conv,
+        W,
+        strides=[1, 1, 1, 1],
+        padding="VALID",
+        name="conv")
+    # Apply nonlinearity
+    h = tf.nn.relu(tf.nn.bias_add(conv, b), name="relu")
+    filter_shape = [filter_size, 1,
+                    model.config['num_filters'] * 6,
+                    model.config['num_filters'] * 9]
+    W = tf.Variable(tf.truncated_normal(
+        filter_shape, stddev=0.1), name="W")
+    b = tf.Variable(tf.constant(
+        0.1, shape=[model.config['num_filters'] * 9]), name="b")
+    conv = tf.nn.conv2d(
+        conv,
+        W,
+        strides=[1, 1, 1, 1],
+        padding="VALID",
+        name="conv")
+    # Apply nonlinearity
+    h = tf.nn.relu(tf.nn.bias_add(conv, b), name="relu")
+    filter_shape = [h.shape[1].value, 1,
+                    model.config['num_filters'] * 9,
+                    model.config['num_filters'] * 9]
+    W = tf.Variable(tf.truncated_normal(
+        filter_shape, stddev=0.1), name="W")
+    b = tf.Variable(tf.constant(
+        0.1, shape=[model.config['num_filters'] * 9]), name="b")
+    conv = tf.nn.conv2d(
+        conv,
+        W,
+        strides=[1, 1, 1, 1],
+        padding="VALID",
+        name="conv")
+    # Apply nonlinearity
+    h = tf.nn.relu(tf.nn.bias_add(conv, b), name="relu")
+    # # Maxpooling over the outputs
+    # pooled = tf.nn.max_pool(
+    #     h,
+    #     ksize=[1, h.get_shape().as_list()[1], 1, 1],
+    #     strides=[1, 1, 1, 1],
+    #     padding='VALID',
+    #     name="pool")
+    # model.h_pool = tf.reshape(
+    # pooled, [-1, model.config['num_filters'] * 9])
+    h = tf.squeeze(h)
+    # Add dropout
+    with tf.name_scope("dropout"):
+        model.dropout_keep_prob = tf.placeholder(
+            tf.float32, name="dropout_keep_prob")
+        model.h_drop = tf.nn.dropout(
+            h, model.dropout_keep_prob)
+
+    # Final (unnormalized) scores and predictions
+    model._output(model.h_drop, model.config['num_filters'] * 9,
+                 l2_loss=True)
+
+
+def hierarchical_cnn(model):
+    """
+
+
+    多层cnn结构，每层加pool层进行输出
+    """
+    with tf.name_scope("m-conv"):
+
+        filter_size = model.config['filter_sizes'][0]
+        num_filters = model.config['num_filters']
+        embedding_size = model.config['embedding_shape'][1]
+        # Convolution Layer
+        filter_shape = [filter_size, embedding_size, 1, num_filters]
+        W = tf.Variable(tf.truncated_normal(
+            filter_shape, stddev=0.1), name="W")
+        b = tf.Variable(tf.constant(
+            0.1, shape=[num_filters]), name="b")
+        conv = tf.nn.conv2d(
+            model.input_embedded,
+            W,
+            strides=[1, 1, 1, 1],
+            padding="VALID",
+            name="conv")
+        # Apply nonlinearity
+        h = tf.nn.relu(tf.nn.bias_add(conv, b), name="relu")
+        pool1 = tf.nn.max_pool(
+            h,
+            ksize=[1, h.get_shape().as_list()[1], 1, 1],
+            strides=[1, 1, 1, 1],
+            padding='VALID',
+            name="pool")
+        filter_shape = [filter_size, 1, num_filters, num_filters]
+        W = tf.Variable(tf.truncated_normal(
+            filter_shape, stddev=0.1), name="W")
+        b = tf.Variable(tf.constant(
+            0.1, shape=[num_filters]), name="b")
+        conv = tf.nn.conv2d(
+            conv,
+            W,
+            strides=[1, 1, 1, 1],
+            padding="VALID",
+            name="conv")
+        # Apply nonlinearity
+        h = tf.nn.relu(tf.nn.bias_add(conv, b), name="relu")
+        pool2 = tf.nn.max_pool(
+            h,
+            ksize=[1, h.get_shape().as_list()[1], 1, 1],
+            strides=[1, 1, 1, 1],
+            padding='VALID',
+            name="pool")
+        filter_shape = [filter_size, 1, num_filters, num_filters]
+        W = tf.Variable(tf.truncated_normal(
+            filter_shape, stddev=0.1), name="W")
+        b = tf.Variable(tf.constant(
+            0.1, shape=[num_filters]), name="b")
+        conv = tf.nn.conv2d(
+            conv,
+            W,
+            strides=[1, 1, 1, 1],
+            padding="VALID",
+            name="conv")
+        # Apply nonlinearity
+        h = tf.nn.relu(tf.nn.bias_add(conv, b), name="relu")
+        # Maxpooling over the outputs
+        pool3 = tf.nn.max_pool(
+            h,
+            ksize=[1, h.get_shape().as_list()[1], 1, 1],
+            strides=[1, 1, 1, 1],
+            padding='VALID',
+            name="pool")
+        pooled_outputs = [pool1, pool2, pool3]
+        pool = tf.concat(pooled_outputs, 3)
+        model.h_pool = tf.reshape(pool, [-1, num_filters * 3])
+
+    # Add dropout
+    with tf.name_scope("dropout"):
+        model.dropout_keep_prob = tf.placeholder(
+            tf.float32, name="dropout_keep_prob")
+        model.h_drop = tf.nn.dropout(
+            model.h_pool, model.dropout_keep_prob)
+
+    # Final (unnormalized) scores and predictions
+    model._output(model.h_drop, num_filters * 3, l2_loss=True)
+
+
+def text_dp_cnn(model):
+    # 多层CNN结构
+    with tf.name_scope('conv1'):
+        num_in = 1 if not model.config['embedding_type'] ==\
+            'multiple_channels' else 2
+        with tf.name_scope('conv'):
+            W = model._weight_variable(
+                shape=[1, model.config['embedding_shape'][1],
+                       num_in, model.config['num_filters'] * 3])
+            conv1 = tf.nn.conv2d(
+                model.input_embedded, W, [1, 1, 1, 1], padding='VALID')
+    model.dropout_keep_prob = tf.placeholder(
+        tf.float32, name="dropout_keep_prob")
+    with tf.name_scope('dp'):
+        features = model.config['num_filters'] * 3
+        current = conv1
+        layers = 2
+        blocks = 5
+        for block in range(blocks):
+            current = model._block_dp(
+                current, layers,
+                features, features, model.is_training,
+                model.dropout_keep_prob, str(block))
+            current = model._avg_pool(current, 2)
+
+    final_dim = features * current.get_shape().as_list()[1]
+    current = model._avg_pool(current, current.get_shape().as_list()[1])
+    final_dim = features
+    current = tf.reshape(current, [-1, final_dim])
+    model._output(current, final_dim, l2_loss=True)
@@ -0,0 +1,237 @@
+# -*- code:utf-8 -*-
+# Dense net结构：卷积/inception特征后接dense block
+import tensorflow as tf
+
+
+def text_dense(model):
+    # block_pooling = bn+relu+fc
+
+    # Create a convolution + maxpool layer for each filter size
+    pooled_outputs = []
+    num_in = 1 if not model.config['embedding_type'] ==\
+        'multiple_channels' else 2
+    # normed_input = model._batch_norm_layer(
+    #     model.input_embedded, model.is_training, 'embedded_input')
+    for i, filter_size in enumerate(model.config['filter_sizes']):
+        with tf.name_scope("conv-maxpool-%s" % filter_size):
+            # Convolution Layer
+            filter_shape = [filter_size,
+                            model.config['embedding_shape'][1],
+                            num_in, model.config['num_filters']]
+            W = tf.Variable(tf.truncated_normal(
+                filter_shape, stddev=0.1), name="W")
+            b = tf.Variable(tf.constant(
+                0.1, shape=[model.config['num_filters']]), name="b")
+            conv = tf.nn.conv2d(
+                model.input_embedded,
+                W,
+                strides=[1, 1, 1, 1],
+                padding="VALID",
+                name="conv")
+            # Apply nonlinearity
+            h = tf.nn.relu(tf.nn.bias_add(conv, b), name="relu")
+            # Maxpooling over the outputs
+            pooled = tf.nn.max_pool(
+                h,
+                ksize=[1, model.config['max_sent_length'] -
+                       filter_size + 1, 1, 1],
+                strides=[1, 1, 1, 1],
+                padding='VALID',
+                name="pool")
+            pooled_outputs.append(pooled)
+
+    # Combine all the pooled features
+    h = tf.concat(pooled_outputs, axis=-1)
+    num_filters_total = h.get_shape().as_list()[-1]
+    current = tf.reshape(h, [-1, num_filters_total])
+    model.dropout_keep_prob = tf.placeholder(
+        tf.float32, name="dropout_keep_prob")
+    current = tf.nn.dropout(current, model.dropout_keep_prob)
+    with tf.name_scope('pooling_block'):
+        features = num_filters_total
+        layers = 4
+        growth = 12
+        num_block = 2
+
+        for block in range(num_block):
+            current, features = model._block_pooling(
+                current, layers, features, growth,
+                model.is_training, model.dropout_keep_prob,
+                'block_pooling' + str(block))
+
+    model._output(current, features)
+
+
+def text_conv_dense(model):
+    """
+    conv_dense = bn + relu + conv2d
+    classifical dense nets
+    """
+    with tf.name_scope('conv1'):
+        num_in = 1 if not model.config['embedding_type'] ==\
+            'multiple_channels' else 2
+        with tf.name_scope('conv'):
+            W = model._weight_variable(
+                shape=[1, model.config['embedding_shape'][1],
+                       num_in, model.config['num_filters'] * 3])
+            conv1 = tf.nn.conv2d(
+                model.input_embedded, W, [1, 1, 1, 1], padding='VALID')
+    with tf.name_scope('block_conv'):
+        current = conv1
+
+        features = model.config['num_filters'] * 3
+        layers = 1
+        growth = 12
+        num_block = 1
+        model.dropout_keep_prob = tf.placeholder(
+            tf.float32, name="dropout_keep_prob")
+        for block in range(num_block - 1):
+            current, features = model._block_conv(
+                current, layers, features, growth,
+                model.is_training, model.dropout_keep_prob,
+                'block_conv' + str(block))
+            current = model._batch_activ_conv(
+                current, features,
+                features, 1,
+                model.is_training, model.dropout_keep_prob,
+                'block_conv_transition' + str(block))
+            current = model._avg_pool(current, 2)
+        current, features = model._block_conv(
+            current, layers, features, growth,
+            model.is_training, model.dropout_keep_prob,
+            'block_conv_end')
+        current = model._batch_activ_conv(
+            current, features,
+            features, 1, model.is_training,
+            model.dropout_keep_prob,
+            'block_conv_transition_end')
+        final_dim = features * current.get_shape().as_list()[1]
+        current = model._avg_pool(current, current.get_shape().as_list()[1])
+    final_dim = features
+    current = tf.reshape(current, [-1, final_dim])
+    model._output(current, final_dim, l2_loss=True)
+
+
+def text_inception_dense(model):
+    # input channels
+    num_in = 1 if not model.config['embedding_type'] ==\
+        'multiple_channels' else 2
+
+    # conv 1*1
+    with tf.name_scope('Inception'):
+        strides = [1, 1, 1, 1]
+        embedding_shape = model.config['embedding_shape']
+        with tf.name_scope('conv1'):
+            # filter
+            num_in = 1
+            num_filter = 2 ** 4
+            # filter size 1*1
+            filter_shape = [1, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            conv1 = tf.nn.conv2d(
+                model.input_embedded,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a = tf.nn.relu(tf.nn.bias_add(conv1, b_filter))
+        with tf.name_scope('conv3'):
+            num_filter = 2 ** 8
+            # filter size 1*1
+            filter_shape = [3, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            conv3 = tf.nn.conv2d(
+                model.input_embedded,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a3 = tf.nn.relu(tf.nn.bias_add(conv3, b_filter))
+        with tf.name_scope('conv5'):
+            num_filter = 2 ** 8
+            # filter size 1*1
+            filter_shape = [5, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            conv5 = tf.nn.conv2d(
+                model.input_embedded,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a5 = tf.nn.relu(tf.nn.bias_add(conv5, b_filter))
+        with tf.name_scope('conv7'):
+            num_filter = 2 ** 4
+            # filter size 1*1
+            filter_shape = [7, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            conv7 = tf.nn.conv2d(
+                model.input_embedded,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a7 = tf.nn.relu(tf.nn.bias_add(conv7, b_filter))
+        # max pooling
+        with tf.name_scope('max_pooling'):
+            num = model.input_embedded.shape[1].value
+            a_max_pooling = tf.nn.max_pool(
+                model.input_embedded,
+                ksize=[1, num, 1, 1],
+                strides=strides,
+                padding='VALID')
+
+        with tf.name_scope('concat'):
+            a = tf.nn.max_pool(
+                a,
+                ksize=[1, 7, 1, 1],
+                strides=strides,
+                padding='VALID')
+            a3 = tf.nn.max_pool(
+                a3,
+                ksize=[1, 5, 1, 1],
+                strides=strides,
+                padding='VALID')
+            a5 = tf.nn.max_pool(
+                a5,
+                ksize=[1, 3, 1, 1],
+                strides=strides,
+                padding='VALID')
+            a_concat = tf.concat([a, a3, a5, a7], axis=-1)
+            tmp = a_concat.shape[1].value
+            max_conv = tf.nn.max_pool(
+                a_concat,
+                ksize=[1, tmp, 1, 1],
+                strides=strides,
+                padding='VALID')
+            outputs = tf.concat(
+                [tf.squeeze(max_conv, axis=[1, 2]),
+                 tf.squeeze(a_max_pooling, axis=[1, 3])],
+                axis=-1)
+            num_outputs = outputs.shape[-1].value
+
+    # Add dropout
+    with tf.name_scope("dropout"):
+        model.dropout_keep_prob = tf.placeholder(
+            tf.float32, name="keep_prob")
+        h_drop = tf.nn.dropout(
+            outputs, model.dropout_keep_prob)
+
+    with tf.name_scope('pooling_block'):
+        features = num_outputs
+        current = h_drop
+        layers = 4
+        growth = 12
+        num_block = 1
+
+        for block in range(num_block):
+            current, features = model._block_pooling(
+                current, layers, features, growth,
+                model.is_training, model.dropout_keep_prob,
+                'block_pooling' + str(block))
+
+    # Final (unnormalized) scores and predictions
+    model._output(current, features)
@@ -0,0 +1,644 @@
+# -*- code:utf-8 -*-
+# inception结构
+import tensorflow as tf
+
+
+def text_inception(model):
+    # inception module的尝试版
+    # input channels
+    num_in = 1 if not model.config['embedding_type'] ==\
+        'multiple_channels' else 2
+
+    # conv 1*1
+    with tf.name_scope('Inception'):
+        strides = [1, 1, 1, 1]
+        embedding_shape = model.config['embedding_shape']
+        with tf.name_scope('conv1'):
+            # filter
+            num_in = 1
+            num_filter = 2 ** 4
+            # filter size 1*1
+            filter_shape = [1, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            conv1 = tf.nn.conv2d(
+                model.input_embedded,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a = tf.nn.relu(tf.nn.bias_add(conv1, b_filter))
+        with tf.name_scope('conv3'):
+            num_filter = 2 ** 8
+            # filter size 1*1
+            filter_shape = [3, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            conv3 = tf.nn.conv2d(
+                model.input_embedded,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a3 = tf.nn.relu(tf.nn.bias_add(conv3, b_filter))
+        with tf.name_scope('conv5'):
+            num_filter = 2 ** 8
+            # filter size 1*1
+            filter_shape = [5, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            conv5 = tf.nn.conv2d(
+                model.input_embedded,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a5 = tf.nn.relu(tf.nn.bias_add(conv5, b_filter))
+        with tf.name_scope('conv7'):
+            num_filter = 2 ** 4
+            # filter size 1*1
+            filter_shape = [7, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            conv7 = tf.nn.conv2d(
+                model.input_embedded,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a7 = tf.nn.relu(tf.nn.bias_add(conv7, b_filter))
+        # max pooling
+        with tf.name_scope('max_pooling'):
+            num = model.input_embedded.shape[1].value
+            a_max_pooling = tf.nn.max_pool(
+                model.input_embedded,
+                ksize=[1, num, 1, 1],
+                strides=strides,
+                padding='VALID')
+
+        with tf.name_scope('concat'):
+            a = tf.nn.max_pool(
+                a,
+                ksize=[1, 7, 1, 1],
+                strides=strides,
+                padding='VALID')
+            a3 = tf.nn.max_pool(
+                a3,
+                ksize=[1, 5, 1, 1],
+                strides=strides,
+                padding='VALID')
+            a5 = tf.nn.max_pool(
+                a5,
+                ksize=[1, 3, 1, 1],
+                strides=strides,
+                padding='VALID')
+            a_concat = tf.concat([a, a3, a5, a7], axis=-1)
+            tmp = a_concat.shape[1].value
+            max_conv = tf.nn.max_pool(
+                a_concat,
+                ksize=[1, tmp, 1, 1],
+                strides=strides,
+                padding='VALID')
+            outputs = tf.concat(
+                [tf.squeeze(max_conv, axis=[1, 2]),
+                 tf.squeeze(a_max_pooling, axis=[1, 3])],
+                axis=-1)
+            num_outputs = outputs.shape[-1].value
+
+    # Add dropout
+    with tf.name_scope("dropout"):
+        model.dropout_keep_prob = tf.placeholder(
+            tf.float32, name="keep_prob")
+        model.h_drop = tf.nn.dropout(
+            outputs, model.dropout_keep_prob)
+
+    # Final (unnormalized) scores and predictions
+    model._output(model.h_drop, num_outputs)
+
+
+def dpcnn(model):
+    # 使用Tong Zhang的Deep Pyramid卷积模型
+
+    with tf.name_scope('Inception'):
+        # conv 1*100
+        strides = [1, 1, 1, 1]
+        embedding_shape = model.config['embedding_shape']
+        # input channels
+        num_outputs = 1 if not model.config['embedding_type'] ==\
+            'multiple_channels' else 2
+        with tf.name_scope('conv1'):
+            pad_input = model.input_embedded
+            # filter
+            num_in = num_outputs
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [1, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            conv1 = tf.nn.conv2d(
+                pad_input,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a = tf.nn.relu(tf.nn.bias_add(conv1, b_filter))
+        with tf.name_scope('conv3'):
+            paddings = tf.constant([[0, 0], [1, 1], [0, 0], [0, 0]])
+            pad_input = tf.pad(
+                model.input_embedded, paddings, "CONSTANT")
+            num_in = num_outputs
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [3, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            conv3 = tf.nn.conv2d(
+                pad_input,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a3 = tf.nn.relu(tf.nn.bias_add(conv3, b_filter))
+        with tf.name_scope('conv5'):
+            paddings = tf.constant([[0, 0], [2, 2], [0, 0], [0, 0]])
+            pad_input = tf.pad(
+                model.input_embedded, paddings, "CONSTANT")
+            num_in = num_outputs
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [5, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            conv5 = tf.nn.conv2d(
+                pad_input,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a5 = tf.nn.relu(tf.nn.bias_add(conv5, b_filter))
+        with tf.name_scope('conv7'):
+            paddings = tf.constant([[0, 0], [3, 3], [0, 0], [0, 0]])
+            pad_input = tf.pad(
+                model.input_embedded, paddings, "CONSTANT")
+            num_in = num_outputs
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [7, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            conv7 = tf.nn.conv2d(
+                pad_input,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a7 = tf.nn.relu(tf.nn.bias_add(conv7, b_filter))
+        # max pooling
+        with tf.name_scope('max_pooling'):
+            paddings = tf.constant([[0, 0], [1, 1], [0, 0], [0, 0]])
+            pad_input = tf.pad(
+                model.input_embedded, paddings, "CONSTANT")
+            pad_input = tf.transpose(pad_input, [0, 1, 3, 2])
+            max_pooling = tf.nn.max_pool(
+                pad_input,
+                ksize=[1, 3, 1, 1],
+                strides=strides,
+                padding='VALID')
+            num_in = embedding_shape[1]
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [1, 1, num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            max_pooling = tf.nn.conv2d(
+                max_pooling,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            max_pooling = tf.nn.relu(
+                tf.nn.bias_add(max_pooling, b_filter))
+
+        with tf.name_scope('concat'):
+            outputs = tf.concat(
+                [a, a3, a5, a7, max_pooling],
+                axis=-1)
+            # short_path = outputs
+    # 拼接多个inception block
+    # outputs = model._inception(outputs, name='incepiton1')
+    # outputs += short_path
+
+    with tf.name_scope('flatten'):
+        outputs = tf.nn.max_pool(
+            outputs,
+            ksize=[1, outputs.shape[1].value, 1, 1],
+            strides=strides,
+            padding='VALID')
+        num_outputs = outputs.shape[-1].value
+        outputs = tf.reshape(
+            outputs,
+            [-1, num_outputs])
+    # Add dropout
+    with tf.name_scope("dropout"):
+        model.dropout_keep_prob = tf.placeholder(
+            tf.float32, name="keep_prob")
+        model.h_drop = tf.nn.dropout(
+            outputs, model.dropout_keep_prob)
+
+    # Final (unnormalized) scores and predictions
+    model._output(model.h_drop, num_outputs)
+
+
+def inception_dense_net(model):
+    # 使用Dense nete 模型
+    with tf.name_scope('Inception'):
+        # conv 1*100
+        strides = [1, 1, 1, 1]
+        embedding_shape = model.config['embedding_shape']
+        # input channels
+        num_outputs = 1 if not model.config['embedding_type'] ==\
+            'multiple_channels' else 2
+        with tf.name_scope('conv1'):
+            pad_input = model.input_embedded
+            # filter
+            num_in = num_outputs
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [1, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            a = tf.nn.conv2d(
+                pad_input,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a += b_filter
+        with tf.name_scope('conv3'):
+            paddings = tf.constant([[0, 0], [1, 1], [0, 0], [0, 0]])
+            pad_input = tf.pad(model.input_embedded, paddings, "CONSTANT")
+            num_in = num_outputs
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [3, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            a3 = tf.nn.conv2d(
+                pad_input,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a3 += b_filter
+        with tf.name_scope('conv5'):
+            paddings = tf.constant([[0, 0], [2, 2], [0, 0], [0, 0]])
+            pad_input = tf.pad(model.input_embedded, paddings, "CONSTANT")
+            num_in = num_outputs
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [5, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            a5 = tf.nn.conv2d(
+                pad_input,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a5 += b_filter
+        with tf.name_scope('conv7'):
+            paddings = tf.constant([[0, 0], [3, 3], [0, 0], [0, 0]])
+            pad_input = tf.pad(model.input_embedded, paddings, "CONSTANT")
+            num_in = num_outputs
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [7, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            a7 = tf.nn.conv2d(
+                pad_input,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a7 += b_filter
+        # max pooling
+        with tf.name_scope('max_pooling'):
+            paddings = tf.constant([[0, 0], [1, 1], [0, 0], [0, 0]])
+            pad_input = tf.pad(model.input_embedded, paddings, "CONSTANT")
+            pad_input = tf.transpose(pad_input, [0, 1, 3, 2])
+            max_pooling = tf.nn.max_pool(
+                pad_input,
+                ksize=[1, 3, 1, 1],
+                strides=strides,
+                padding='VALID')
+            num_in = embedding_shape[1]
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [1, 1, num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            max_pooling = tf.nn.conv2d(
+                max_pooling,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            max_pooling += b_filter
+        with tf.name_scope('concat'):
+            outputs = tf.concat(
+                [a, a3, a5, a7, max_pooling],
+                axis=-1)
+
+    with tf.name_scope("dropout"):
+        model.dropout_keep_prob = tf.placeholder(
+            tf.float32, name="keep_prob")
+
+    with tf.name_scope('inception_block'):
+        current = outputs
+        layers = 4
+        growth = 4
+        num_block = 1
+
+        for block in range(num_block):
+            with tf.name_scope('block' + str(block)):
+                if block:
+                    current = model._transition(current)
+                current = model._block_inception(
+                    current, layers, growth,
+                    model.is_training, model.dropout_keep_prob)
+
+    with tf.name_scope('flatten'):
+        outputs = tf.nn.max_pool(
+            current,
+            ksize=[1, current.shape[1].value, 1, 1],
+            strides=strides,
+            padding='VALID')
+        num_outputs = outputs.shape[-1].value
+        outputs = tf.reshape(
+            outputs,
+            [-1, num_outputs])
+        # Add dropout
+        model.h_drop = tf.nn.dropout(
+            outputs, model.dropout_keep_prob)
+
+    # Final (unnormalized) scores and predictions
+    model._output(model.h_drop, num_outputs)
+
+
+def inception_dense_net1(model):
+    # 仅使用 inception block结构
+    with tf.name_scope('Inception'):
+        # conv 1*100
+        strides = [1, 1, 1, 1]
+        embedding_shape = model.config['embedding_shape']
+        # input channels
+        num_outputs = 1 if not model.config['embedding_type'] ==\
+            'multiple_channels' else 2
+        with tf.name_scope('conv1'):
+            pad_input = model.input_embedded
+            # filter
+            num_in = num_outputs
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [1, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            a = tf.nn.conv2d(
+                pad_input,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a += b_filter
+        with tf.name_scope('conv3'):
+            paddings = tf.constant([[0, 0], [1, 1], [0, 0], [0, 0]])
+            pad_input = tf.pad(model.input_embedded, paddings, "CONSTANT")
+            num_in = num_outputs
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [3, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            a3 = tf.nn.conv2d(
+                pad_input,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a3 += b_filter
+        with tf.name_scope('conv5'):
+            paddings = tf.constant([[0, 0], [2, 2], [0, 0], [0, 0]])
+            pad_input = tf.pad(model.input_embedded, paddings, "CONSTANT")
+            num_in = num_outputs
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [5, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            a5 = tf.nn.conv2d(
+                pad_input,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a5 += b_filter
+        with tf.name_scope('conv7'):
+            paddings = tf.constant([[0, 0], [3, 3], [0, 0], [0, 0]])
+            pad_input = tf.pad(model.input_embedded, paddings, "CONSTANT")
+            num_in = num_outputs
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [7, embedding_shape[1], num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            a7 = tf.nn.conv2d(
+                pad_input,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a7 += b_filter
+        # max pooling
+        with tf.name_scope('max_pooling'):
+            paddings = tf.constant([[0, 0], [1, 1], [0, 0], [0, 0]])
+            pad_input = tf.pad(model.input_embedded, paddings, "CONSTANT")
+            pad_input = tf.transpose(pad_input, [0, 1, 3, 2])
+            max_pooling = tf.nn.max_pool(
+                pad_input,
+                ksize=[1, 3, 1, 1],
+                strides=strides,
+                padding='VALID')
+            num_in = embedding_shape[1]
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [1, 1, num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            max_pooling = tf.nn.conv2d(
+                max_pooling,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            max_pooling += b_filter
+        with tf.name_scope('concat'):
+            outputs = tf.concat(
+                [a, a3, a5, a7, max_pooling],
+                axis=-1)
+
+    with tf.name_scope("dropout"):
+        model.dropout_keep_prob = tf.placeholder(
+            tf.float32, name="keep_prob")
+
+    # with tf.name_scope('inception_block'):
+    #     current = outputs
+    #     layers = 1
+    #     growth = 2 ** 7
+    #     num_block = 1
+
+    #     for block in range(num_block):
+    #         current = model._block_inception(
+    #             current, layers, growth,
+    #             model.is_training, model.dropout_keep_prob,
+    #             'block_inception' + str(block))
+
+    with tf.name_scope('flatten'):
+        outputs = tf.nn.max_pool(
+            outputs,
+            ksize=[1, outputs.shape[1].value, 1, 1],
+            strides=strides,
+            padding='VALID')
+        num_outputs = outputs.shape[-1].value
+        outputs = tf.reshape(
+            outputs,
+            [-1, num_outputs])
+        # Add dropout
+        model.h_drop = tf.nn.dropout(
+            outputs, model.dropout_keep_prob)
+
+    # Final (unnormalized) scores and predictions
+    model._output(model.h_drop, num_outputs)
+
+
+def inception_dense_net1_transpose(model):
+    # 将通道位置放到最后一维，进行一维的inception式卷积
+    with tf.name_scope('Inception'):
+        # conv 1*100
+        strides = [1, 1, 1, 1]
+        embedding_shape = model.config['embedding_shape']
+        # input channels
+        num_outputs = embedding_shape[1]
+        input_embedded = tf.transpose(model.input_embedded, [0, 1, 3, 2])
+        with tf.name_scope('conv1'):
+            pad_input = input_embedded
+            # filter
+            num_in = num_outputs
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [1, 1, num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            a = tf.nn.conv2d(
+                pad_input,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a += b_filter
+        with tf.name_scope('conv3'):
+            paddings = tf.constant([[0, 0], [1, 1], [0, 0], [0, 0]])
+            pad_input = tf.pad(input_embedded, paddings, "CONSTANT")
+            num_in = num_outputs
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [3, 1, num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            a3 = tf.nn.conv2d(
+                pad_input,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a3 += b_filter
+        with tf.name_scope('conv5'):
+            paddings = tf.constant([[0, 0], [2, 2], [0, 0], [0, 0]])
+            pad_input = tf.pad(input_embedded, paddings, "CONSTANT")
+            num_in = num_outputs
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [5, 1, num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            a5 = tf.nn.conv2d(
+                pad_input,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a5 += b_filter
+        with tf.name_scope('conv7'):
+            paddings = tf.constant([[0, 0], [3, 3], [0, 0], [0, 0]])
+            pad_input = tf.pad(input_embedded, paddings, "CONSTANT")
+            num_in = num_outputs
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [7, 1, num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            a7 = tf.nn.conv2d(
+                pad_input,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            a7 += b_filter
+        # max pooling
+        with tf.name_scope('max_pooling'):
+            paddings = tf.constant([[0, 0], [1, 1], [0, 0], [0, 0]])
+            pad_input = tf.pad(input_embedded, paddings, "CONSTANT")
+            max_pooling = tf.nn.max_pool(
+                pad_input,
+                ksize=[1, 3, 1, 1],
+                strides=strides,
+                padding='VALID')
+            num_in = num_outputs
+            num_filter = 2 ** 7
+            # filter size 1*1
+            filter_shape = [1, 1, num_in, num_filter]
+            # filter weights matrix
+            W_filter = model._weight_variable(filter_shape)
+            b_filter = model._bias_variable([num_filter])
+            max_pooling = tf.nn.conv2d(
+                max_pooling,
+                W_filter,
+                strides=strides,
+                padding='VALID')
+            max_pooling += b_filter
+        with tf.name_scope('concat'):
+            outputs = tf.concat(
+                [a, a3, a5, a7, max_pooling],
+                axis=-1)
+
+    with tf.name_scope("dropout"):
+        model.dropout_keep_prob = tf.placeholder(
+            tf.float32, name="keep_prob")
+
+    # 先拼接后最大池化
+    with tf.name_scope('flatten'):
+        outputs = tf.nn.max_pool(
+            outputs,
+            ksize=[1, outputs.shape[1].value, 1, 1],
+            strides=strides,
+            padding='VALID')
+        num_outputs = outputs.shape[-1].value
+        outputs = tf.reshape(
+            outputs,
+            [-1, num_outputs])
+        # Add dropout
+        model.h_drop = tf.nn.dropout(
+            outputs, model.dropout_keep_prob)
+
+    # Final (unnormalized) scores and predictions
+    model._output(model.h_drop, num_outputs)
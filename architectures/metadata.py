@@ -0,0 +1,207 @@
+# -*- code:utf-8 -*-
+# 各模型的参数量和计算量估计，只依赖配置，不需要tensorflow
+# every estimator returns ([(params, multiply_adds), ...], num_features),
+# num_features being the input size of the output projection
+
+
+def _conv(k, width, c_in, c_out, length, bias=True):
+    # conv layer producing length positions
+    if length < 1:
+        raise ValueError('max_sent_length too short for a %d wide filter'
+                         % k)
+    params = k * width * c_in * c_out + (c_out if bias else 0)
+    return params, length * k * width * c_in * c_out
+
+
+def _fc(n_in, n_out):
+    return n_in * n_out + n_out, n_in * n_out
+
+
+def _bn(features):
+    # beta, gamma
+    return 2 * features, 0
+
+
+def _lstm(n_in, n_hidden, steps):
+    params = 4 * n_hidden * (n_in + n_hidden) + 4 * n_hidden
+    return params, steps * 4 * n_hidden * (n_in + n_hidden)
+
+
+def _channels(config):
+    return 2 if config['embedding_type'] == 'multiple_channels' else 1
+
+
+def _block_pooling(features, layers=4, growth=12):
+    # Model._block_pooling: bn + relu + fc, concatenated
+    block = []
+    for idx in range(layers):
+        block += [_bn(features), _fc(features, growth)]
+        features += growth
+    return block, features
+
+
+def _text_conv(config, channels):
+    # one VALID conv per filter size over the embedded text
+    length = config['max_sent_length']
+    width = config['embedding_shape'][1]
+    return [_conv(filter_size, width, channels, config['num_filters'],
+                  length - filter_size + 1)
+            for filter_size in config['filter_sizes']]
+
+
+def _inception_head(config):
+    # conv 1/3/5/7 over the embedding + max pooling branch, 5 * 128
+    length = config['max_sent_length']
+    width = config['embedding_shape'][1]
+    channels = _channels(config)
+    layers = [_conv(k, width, channels, 128, length) for k in (1, 3, 5, 7)]
+    layers.append(_conv(1, 1, width, 128, length * channels))
+    return layers, 5 * 128
+
+
+def _text_inception_head(config):
+    length = config['max_sent_length']
+    width = config['embedding_shape'][1]
+    layers = [_conv(1, width, 1, 16, length),
+              _conv(3, width, 1, 256, length - 2),
+              _conv(5, width, 1, 256, length - 4),
+              _conv(7, width, 1, 16, length - 6)]
+    # pooled filters + max pooled embedding
+    return layers, 16 + 256 + 256 + 16 + width
+
+
+def textcnn(config):
+    return _text_conv(config, _channels(config)),\
+        config['num_filters'] * len(config['filter_sizes'])
+
+
+def multi_layers_cnn(config):
+    filter_size = config['filter_sizes'][-1]
+    num_filters = config['num_filters']
+    length = config['max_sent_length'] - filter_size + 1
+    layers = [_conv(filter_size, config['embedding_shape'][1], 1,
+                    num_filters * 3, length)]
+    for c_in, c_out in ((3, 6), (6, 9)):
+        length -= filter_size - 1
+        layers.append(_conv(filter_size, 1, num_filters * c_in,
+                            num_filters * c_out, length))
+    layers.append(_conv(length, 1, num_filters * 9, num_filters * 9, 1))
+    return layers, num_filters * 9
+
+
+def hierarchical_cnn(config):
+    filter_size = config['filter_sizes'][0]
+    num_filters = config['num_filters']
+    length = config['max_sent_length'] - filter_size + 1
+    layers = [_conv(filter_size, config['embedding_shape'][1], 1,
+                    num_filters, length)]
+    for idx in range(2):
+        length -= filter_size - 1
+        layers.append(_conv(filter_size, 1, num_filters, num_filters, length))
+    return layers, num_filters * 3
+
+
+def text_dp_cnn(config):
+    features = config['num_filters'] * 3
+    length = config['max_sent_length']
+    layers = [_conv(1, config['embedding_shape'][1], _channels(config),
+                    features, length, bias=False)]
+    for block in range(5):
+        layers += [_conv(3, 1, features, features, length)] * 2
+        length //= 2
+    return layers, features
+
+
+def text_dense(config):
+    layers = _text_conv(config, _channels(config))
+    features = config['num_filters'] * len(config['filter_sizes'])
+    for block in range(2):
+        block_layers, features = _block_pooling(features)
+        layers += block_layers
+    return layers, features
+
+
+def text_conv_dense(config):
+    features = config['num_filters'] * 3
+    length = config['max_sent_length']
+    layers = [_conv(1, config['embedding_shape'][1], _channels(config),
+                    features, length, bias=False),
+              _bn(features),
+              _conv(3, 1, features, 12, length, bias=False)]
+    features += 12
+    layers += [_bn(features),
+               _conv(1, 1, features, features, length, bias=False)]
+    return layers, features
+
+
+def text_inception_dense(config):
+    layers, features = _text_inception_head(config)
+    block_layers, features = _block_pooling(features)
+    return layers + block_layers, features
+
+
+def text_inception(config):
+    return _text_inception_head(config)
+
+
+def dpcnn(config):
+    return _inception_head(config)
+
+
+def inception_dense_net(config):
+    layers, features = _inception_head(config)
+    length = config['max_sent_length']
+    # Model._block_inception: 4 layers, 5 branches of 4 filters
+    for idx in range(4):
+        layers += [_conv(k, 1, features, 4, length) for k in (1, 3, 5, 7)]
+        layers.append(_conv(1, 1, features, 4, length))
+        features += 5 * 4
+    return layers, features
+
+
+def inception_dense_net1(config):
+    return _inception_head(config)
+
+
+def inception_dense_net1_transpose(config):
+    # embedding dimension as channels, conv along the text
+    positions = config['max_sent_length'] * _channels(config)
+    width = config['embedding_shape'][1]
+    layers = [_conv(k, 1, width, 128, positions) for k in (1, 3, 5, 7)]
+    layers.append(_conv(1, 1, width, 128, positions))
+    return layers, 5 * 128
+
+
+def text_cnn_lstm(config):
+    # conv outputs are fed channel by channel, a step per filter
+    layers = _text_conv(config, 1)
+    n_hidden = config['num_filters'] * len(config['filter_sizes'])
+    n_in = config['max_sent_length'] - config['filter_sizes'][-1] + 1
+    layers.append(_lstm(n_in, n_hidden, n_hidden))
+    return layers, n_hidden
+
+
+def text_bilstm(config):
+    n_hidden = config['n_hidden']
+    layers = [_lstm(config['embedding_shape'][1], n_hidden,
+                    config['max_sent_length'])] * 2
+    return layers, 2 * n_hidden
+
+
+def textlstm(config):
+    # max over the hidden units, one feature per token
+    layers = [_lstm(config['embedding_shape'][1], config['n_hidden'],
+                    config['max_sent_length'])]
+    return layers, config['max_sent_length']
+
+
+def summarize(config, layers, num_features):
+    layers = layers + [_fc(num_features, config['num_classes'])]
+    n_words, embedding_dim = config['embedding_shape']
+    return {
+        'params': sum(params for params, _ in layers),
+        'embedding_params': n_words * embedding_dim * _channels(config),
+        # 2 FLOPs per multiply-add
+        'flops_per_token': 2.0 * sum(macs for _, macs in layers) /
+        config['max_sent_length']
+    }
@@ -0,0 +1,114 @@
+# -*- code:utf-8 -*-
+# LSTM结构
+import tensorflow as tf
+from functools import reduce
+
+
+def text_cnn_lstm(model):
+    """
+
+
+    经典CNN+LSTM
+    """
+    filter_sizes = model.config['filter_sizes']
+    embedding_size = model.config['embedding_shape'][1]
+    num_filters = model.config['num_filters']
+    # Create a convolution + maxpool layer for each filter size
+    pooled_outputs = []
+    for i, filter_size in enumerate(filter_sizes):
+        with tf.name_scope("conv-maxpool-L%s" % filter_size):
+            # Convolution Layer
+            filter_shape = [filter_size, embedding_size, 1, num_filters]
+            W = tf.Variable(tf.truncated_normal(
+                filter_shape, stddev=0.1), name="W")
+            conv = tf.nn.conv2d(
+                model.input_embedded,
+                W,
+                strides=[1, 1, 1, 1],
+                padding="VALID",
+                name="conv")
+            pooled_outputs.append(conv)
+    num_features = pooled_outputs[-1].get_shape().as_list()[1]
+    num_channels = len(pooled_outputs)
+    with tf.name_scope("LSTM"):
+        input_x = [tf.squeeze(x, 2) for x in pooled_outputs]
+        input_x = reduce(lambda x, y: tf.concat(
+            [x[:, :num_features, :],
+             y[:, :num_features, :]], axis=-1), input_x)
+        input_x = tf.unstack(input_x, axis=2)
+        lstm = tf.contrib.rnn.BasicLSTMCell(num_filters * num_channels)
+        outputs, states = tf.contrib.rnn.static_rnn(
+            lstm, input_x, dtype=tf.float32)
+        model.lstm_out = outputs[-1]
+    # Add dropout
+    with tf.name_scope("dropout"):
+        model.dropout_keep_prob = tf.placeholder(
+            tf.float32, name="dropout_keep_prob")
+        model.h_drop = tf.nn.dropout(
+            model.lstm_out, model.dropout_keep_prob)
+
+    # Final (unnormalized) scores and predictions
+    model._output(model.h_drop, num_filters * num_channels, l2_loss=True)
+
+
+def text_bilstm(model):
+    """
+
+    经典BiLSTM
+    """
+    n_hidden = model.config['n_hidden']
+    batch_size = model.config['batch_size']
+    with tf.name_scope("LSTM"):
+        model.dropout_keep_prob = tf.placeholder(
+            tf.float32, name="dropout_keep_prob")
+        input_x = tf.squeeze(model.input_embedded, -1)
+        lstm_fw = tf.contrib.rnn.BasicLSTMCell(n_hidden)
+        lstm_bw = tf.contrib.rnn.BasicLSTMCell(n_hidden)
+        lstm_fw_init = lstm_fw.zero_state(batch_size, tf.float32)
+        lstm_bw_init = lstm_bw.zero_state(batch_size, tf.float32)
+        lstm_fw_drop = tf.contrib.rnn.DropoutWrapper(
+            lstm_fw, output_keep_prob=model.dropout_keep_prob)
+        lstm_bw_drop = tf.contrib.rnn.DropoutWrapper(
+            lstm_bw, output_keep_prob=model.dropout_keep_prob)
+        outputs, _ = tf.nn.bidirectional_dynamic_rnn(
+            lstm_fw_drop, lstm_bw_drop,
+            input_x, dtype=tf.float32,
+            initial_state_fw=lstm_fw_init,
+            initial_state_bw=lstm_bw_init)
+        outputs = tf.concat(outputs, axis=-1)
+        # lstm_output = model._attention(outputs)
+        lstm_output = tf.squeeze(outputs[:, -1, :])
+        # lstm_max = tf.squeeze(tf.reduce_max(outputs, axis=-2))
+        # lstm_output = tf.concat([lstm_last, lstm_max], axis=-1)
+
+    # Final (unnormalized) scores and predictions
+    n_in = lstm_output.shape[-1].value
+    model._output(lstm_output, n_in)
+
+
+def textlstm(model):
+    """
+
+
+    经典BasicLSTM
+    """
+    n_hidden = model.config['n_hidden']
+    batch_size = model.config['batch_size']
+    with tf.name_scope("LSTM"):
+        model.dropout_keep_prob = tf.placeholder(
+            tf.float32, name="dropout_keep_prob")
+        input_x = tf.squeeze(model.input_embedded, -1)
+        lstm = tf.contrib.rnn.BasicLSTMCell(n_hidden)
+        lstm_init = lstm.zero_state(batch_size, tf.float32)
+        lstm_drop = tf.contrib.rnn.DropoutWrapper(
+            lstm, output_keep_prob=model.dropout_keep_prob)
+        outputs, _ = tf.nn.dynamic_rnn(
+            lstm_drop, input_x, dtype=tf.float32,
+            initial_state=lstm_init)
+        # lstm_output = tf.squeeze(outputs[:, -1, :])
+        lstm_output = tf.squeeze(tf.reduce_max(outputs, axis=-1))
+        # lstm_output = tf.concat([lstm_last, lstm_max], axis=-1)
+
+    # Final (unnormalized) scores and predictions
+    n_in = lstm_output.shape[-1].value
+    model._output(lstm_output, n_in)
@@ -0,0 +1,78 @@
+# -*- code:utf-8 -*-
+# 训练步耗时与类别数的关系：full softmax 对比 sampled softmax / nce
+import time
+import numpy as np
+import tensorflow as tf
+
+from models import Model
+
+tf.flags.DEFINE_string("model_type", "textcnn", "model to benchmark")
+tf.flags.DEFINE_string("num_classes", "100,1000,5000,20000",
+                       "Comma-separated numbers of classes")
+tf.flags.DEFINE_string("softmax", "full,sampled,nce",
+                       "Comma-separated softmax of the training steps")
+tf.flags.DEFINE_integer("num_sampled", 512, "negative classes")
+tf.flags.DEFINE_integer("batch_size", 100, "Batch Size (default: 100)")
+tf.flags.DEFINE_integer("max_sent_length", 300, "document length")
+tf.flags.DEFINE_integer("vocabulary_size", 20000, "embedding rows")
+tf.flags.DEFINE_integer("embedding_dim", 100, "embedding dimension")
+tf.flags.DEFINE_integer("steps", 20, "timed training steps")
+tf.flags.DEFINE_integer("warmup_steps", 3, "untimed training steps")
+FLAGS = tf.flags.FLAGS
+
+
+def step_time(softmax, num_classes):
+    """
+    mean seconds of one training step on random batches
+    """
+    config_model = {
+        'num_filters': 128,
+        'filter_sizes': [3, 4, 5],
+        'n_hidden': 128,
+        'embedding_type': 'rand',
+        'l2_reg_lambda': 0.0,
+        'learning_rate': 1e-4,
+        'max_sent_length': FLAGS.max_sent_length,
+        'num_classes': num_classes,
+        'embedding_shape': (FLAGS.vocabulary_size, FLAGS.embedding_dim),
+        'train_phase': True,
+        'sparse_labels': True,
+        'softmax': softmax,
+        'num_sampled': FLAGS.num_sampled
+    }
+    with tf.Graph().as_default():
+        model = Model(FLAGS.model_type, config_model)
+        with tf.Session() as sess:
+            sess.run(tf.global_variables_initializer())
+            sess.run(tf.local_variables_initializer())
+            feed_dict = {
+                model.input_x: np.random.randint(
+                    FLAGS.vocabulary_size,
+                    size=(FLAGS.batch_size, FLAGS.max_sent_length)),
+                model.input_y: np.random.randint(
+                    num_classes, size=FLAGS.batch_size),
+                model.dropout_keep_prob: 0.5,
+                model.is_training: True
+            }
+            # what the training scripts fetch besides the summaries
+            fetches = [model.train_op, model.cost, model.train_score]
+            for _ in range(FLAGS.warmup_steps):
+                sess.run(fetches, feed_dict)
+            start = time.time()
+            for _ in range(FLAGS.steps):
+                sess.run(fetches, feed_dict)
+            return (time.time() - start) / FLAGS.steps
+
+
+def main(_):
+    softmaxes = FLAGS.softmax.split(',')
+    print('num_classes' + ''.join('%12s' % s for s in softmaxes) +
+          '   (ms/step)')
+    for num_classes in map(int, FLAGS.num_classes.split(',')):
+        times = [step_time(softmax, num_classes) for softmax in softmaxes]
+        print('%11d' % num_classes +
+              ''.join('%12.1f' % (t * 1000) for t in times))
+
+
+if __name__ == '__main__':
+    tf.app.run()
@@ -0,0 +1,258 @@
+# -*- code:utf-8 -*-
+import os
+import json
+import numpy as np
+import pandas as pd
+
+CORPUS_VERSION = 1
+
+
+def split_offsets(n_rows, n_splits=11):
+    # [begin, end) rows of each chronological split,
+    # same boundaries as the split csv files
+    bug_part_size = int((n_rows - 1) / n_splits) + 1
+    splits = []
+    for i in range(n_splits):
+        begin_index = i * bug_part_size
+        end_index = min((i + 1) * bug_part_size, n_rows - 1)
+        begin_index = min(begin_index, max(n_rows - 1, 0))
+        splits.append([begin_index, max(begin_index, end_index)])
+    return splits
+
+
+def split_index(data_file):
+    # 3 or '.../3.csv' -> 3
+    if isinstance(data_file, (int, np.integer)):
+        return int(data_file)
+    return int(os.path.splitext(os.path.basename(data_file))[0])
+
+
+def _save(path, array):
+    # replace path atomically, readers keep their old memory map
+    tmp_file = path[:-len('.npy')] + '.tmp.npy'
+    np.save(tmp_file, array)
+    os.replace(tmp_file, path)
+
+
+def _append_strings(path, values, n_rows, block_size=65536):
+    # utf8 bytes of every row back to back + int64 row offsets,
+    # bytes past row n_rows (an interrupted append) are dropped
+    offsets = [np.load(path + '_offsets.npy')[:n_rows + 1]]
+    with open(path + '.bin', 'r+b') as f:
+        end = int(offsets[0][-1])
+        f.truncate(end)
+        f.seek(end)
+        for begin in range(0, len(values), block_size):
+            encoded = [value.encode('utf8')
+                       for value in values[begin:begin + block_size]]
+            offsets.append(
+                np.cumsum([len(value) for value in encoded]) + end)
+            if len(encoded):
+                end = int(offsets[-1][-1])
+            f.write(b''.join(encoded))
+    _save(path + '_offsets.npy', np.concatenate(offsets).astype(np.int64))
+
+
+def _write_strings(path, values):
+    open(path + '.bin', 'wb').close()
+    np.save(path + '_offsets.npy', np.zeros(1, dtype=np.int64))
+    _append_strings(path, values, 0)
+
+
+def _write_meta(save_dir, meta):
+    meta_file = os.path.join(save_dir, 'meta.json')
+    with open(meta_file + '.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.replace(meta_file + '.tmp', meta_file)
+
+
+def write_corpus(save_dir, frame, n_splits=11, time_column='when',
+                 label_column='fixer', id_column='id'):
+    """
+    write frame as a time sorted columnar corpus:
+    time column as datetime64, label column as int32 codes,
+    other columns as utf8 bytes + offsets, splits as row offsets
+    """
+    if not os.path.exists(save_dir):
+        os.makedirs(save_dir)
+    meta_file = os.path.join(save_dir, 'meta.json')
+    # meta.json is written last, a partial store is never opened
+    if os.path.exists(meta_file):
+        os.remove(meta_file)
+    frame = frame.sort_values(time_column, kind='mergesort')
+    columns = []
+    classes = []
+    for name in frame.columns:
+        path = os.path.join(save_dir, str(name))
+        if name == time_column:
+            np.save(path + '.npy', pd.to_datetime(
+                frame[name]).values.astype('datetime64[s]'))
+            columns.append([name, 'time'])
+        elif name == label_column:
+            codes, uniques = pd.factorize(
+                frame[name].fillna('').astype(str), sort=True)
+            np.save(path + '_codes.npy', codes.astype(np.int32))
+            classes = list(uniques)
+            columns.append([name, 'label'])
+        else:
+            _write_strings(path, frame[name].fillna('').astype(str).tolist())
+            columns.append([name, 'text'])
+    meta = {'version': CORPUS_VERSION,
+            'n_rows': len(frame),
+            'columns': columns,
+            'time_column': time_column,
+            'label_column': label_column,
+            'id_column': id_column,
+            'classes': classes,
+            'splits': split_offsets(len(frame), n_splits)}
+    _write_meta(save_dir, meta)
+
+
+def append_corpus(save_dir, frame):
+    """
+    append the rows whose id is not in the corpus yet, in time order,
+    and move the split boundaries; returns the number of new rows
+    """
+    store = CorpusStore(save_dir)
+    missing = [name for name in store.columns if name not in frame.columns]
+    if missing:
+        raise ValueError('rows appended to %s miss the columns %s' % (
+            save_dir, ', '.join(missing)))
+    id_column = store.id_column
+    n_rows = store.n_rows
+    known = set(store.column(id_column, 0, n_rows))
+    frame = frame[~frame[id_column].astype(str).isin(known)]
+    frame = frame.drop_duplicates(id_column)
+    if not len(frame):
+        return 0
+    time_column = store.time_column
+    frame = frame.copy()
+    frame[time_column] = pd.to_datetime(frame[time_column])
+    frame = frame.sort_values(time_column, kind='mergesort')
+    n_splits = len(store.splits)
+    if n_rows and frame[time_column].values[0] <\
+            store.column(time_column, n_rows - 1, n_rows)[0]:
+        # bugs older than the last stored one, rewrite in time order
+        old = store.frame(0, n_rows)
+        write_corpus(save_dir, pd.concat([old, frame[old.columns]]),
+                     n_splits, time_column, store.label_column, id_column)
+        return len(frame)
+
+    classes = list(store.classes)
+    class_index = dict(zip(classes, range(len(classes))))
+    for name in store.columns:
+        kind = store.kinds[name]
+        path = os.path.join(save_dir, str(name))
+        if kind == 'time':
+            _save(path + '.npy', np.concatenate([
+                np.load(path + '.npy')[:n_rows],
+                frame[name].values.astype('datetime64[s]')]))
+        elif kind == 'label':
+            # codes of stored rows stay, new classes go at the end
+            codes = [class_index.setdefault(label, len(class_index))
+                     for label in frame[name].fillna('').astype(str)]
+            _save(path + '_codes.npy', np.concatenate([
+                np.load(path + '_codes.npy')[:n_rows],
+                np.array(codes, dtype=np.int32)]))
+        else:
+            _append_strings(
+                path, frame[name].fillna('').astype(str).tolist(), n_rows)
+    classes = sorted(class_index, key=class_index.get)
+    meta = {'version': CORPUS_VERSION,
+            'n_rows': n_rows + len(frame),
+            'columns': [[name, store.kinds[name]] for name in store.columns],
+            'time_column': time_column,
+            'label_column': store.label_column,
+            'id_column': id_column,
+            'classes': classes,
+            'splits': split_offsets(n_rows + len(frame), n_splits)}
+    _write_meta(save_dir, meta)
+    return len(frame)
+
+
+class CorpusStore(object):
+    """
+    read only view of a corpus written by write_corpus,
+    columns are memory mapped and decoded per row range
+    """
+
+    def __init__(self, save_dir):
+        self.save_dir = save_dir
+        with open(os.path.join(save_dir, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta['version'] != CORPUS_VERSION:
+            raise ValueError('corpus %s has version %s, expected %s' % (
+                save_dir, meta['version'], CORPUS_VERSION))
+        self.n_rows = meta['n_rows']
+        self.columns = [name for name, kind in meta['columns']]
+        self.kinds = dict(meta['columns'])
+        self.time_column = meta['time_column']
+        self.label_column = meta['label_column']
+        # stores written before the id column was recorded used 'id'
+        self.id_column = meta.get('id_column', 'id')
+        self.classes = np.array(meta['classes'], dtype=object)
+        self.splits = meta['splits']
+        self._arrays = {}
+
+    def __len__(self):
+        return self.n_rows
+
+    def _array(self, name):
+        if name not in self._arrays:
+            path = os.path.join(self.save_dir, name)
+            if name.endswith('.bin'):
+                if os.path.getsize(path) == 0:
+                    array = np.zeros(0, dtype=np.uint8)
+                else:
+                    array = np.memmap(path, dtype=np.uint8, mode='r')
+            else:
+                array = np.load(path, mmap_mode='r')
+            self._arrays[name] = array
+        return self._arrays[name]
+
+    def rows(self, splits):
+        # merged [begin, end) row ranges of the given splits
+        ranges = []
+        for i in splits:
+            begin, end = self.splits[split_index(i)]
+            if ranges and ranges[-1][1] == begin:
+                ranges[-1][1] = end
+            else:
+                ranges.append([begin, end])
+        return ranges
+
+    def column(self, name, begin, end):
+        kind = self.kinds[name]
+        if kind == 'time':
+            return np.array(self._array(name + '.npy')[begin:end])
+        elif kind == 'label':
+            return self.classes[self._array(name + '_codes.npy')[begin:end]]
+        if end <= begin:
+            return []
+        offsets = np.array(self._array(name + '_offsets.npy')[begin:end + 1])
+        data = self._array(name + '.bin')
+        buffer = data[offsets[0]:offsets[-1]].tobytes()
+        offsets -= offsets[0]
+        return [buffer[offsets[i]:offsets[i + 1]].decode('utf8')
+                for i in range(end - begin)]
+
+    def frame(self, begin, end, columns=None):
+        columns = columns or self.columns
+        return pd.DataFrame(
+            dict((name, self.column(name, begin, end)) for name in columns),
+            columns=columns, index=pd.RangeIndex(begin, end))
+
+    def window(self, splits, columns=None):
+        # rows of the given chronological splits
+        frames = [self.frame(begin, end, columns)
+                  for begin, end in self.rows(splits)]
+        if not frames:
+            return self.frame(0, 0, columns)
+        return pd.concat(frames) if len(frames) > 1 else frames[0]
+
+
+def open_store(save_dir):
+    # None when no corpus has been written to save_dir
+    if not os.path.exists(os.path.join(save_dir, 'meta.json')):
+        return None
+    return CorpusStore(save_dir)
@@ -4,20 +4,24 @@ import numpy as np
 import os
 import re
 import json
+import time
 import string
 import nltk
+from multiprocessing import Pool, cpu_count
 from gensim.models import Word2Vec
+from gensim.models.word2vec import LineSentence
 from collections import Counter
 from tensorflow.contrib import learn
-from gensim.models import KeyedVectors
 from sklearn.preprocessing import LabelBinarizer
 from sklearn.metrics import accuracy_score, recall_score
 from sklearn.metrics import precision_score, f1_score
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.feature_selection import chi2, mutual_info_classif
-from sklearn.feature_selection import SelectKBest, SelectPercentile
 
 import prepocessing_bugs
+import embedding_store
+import corpus_store
+from token_cache import TokenCache, cache_namespace
 
 
 def classification_score(y_true, y_prediction):
@@ -64,13 +68,30 @@ def classification_score(y_true, y_prediction):
                      f1_score_weighted])
 
 
-def load_files(data_files, encode='latin2', validation=False):
+def load_store_window(store, splits):
+    # text and labels of chronological splits of a CorpusStore
+    window = store.window(splits, ['text', store.label_column])
+    return window.text, window[store.label_column]
+
+
+def load_files(data_files, encode='latin2', validation=False, store=None):
     # 使用同一种数据源进行训练和测试
+    # store: CorpusStore, data_files then only name the splits
     # 读取数据
-    if validation:
+    if store is not None:
+        splits = [corpus_store.split_index(file) for file in data_files]
+        if validation:
+            x_train, y_train = load_store_window(store, splits[:-2])
+            x_dev, y_dev = load_store_window(store, splits[-2:-1])
+        else:
+            x_train, y_train = load_store_window(store, splits[:-1])
+        x_test, y_test = load_store_window(store, splits[-1:])
+    elif validation:
         train_list = data_files[:-2]
         train = pd.concat([pd.read_csv(file, encoding=encode)
                            for file in train_list])
+        x_train = train.text
+        y_train = train.fixer
 
         dev_file = data_files[-2]
         dev_data = pd.read_csv(dev_file, encoding=encode)
@@ -80,12 +101,13 @@ def load_files(data_files, encode='latin2', validation=False):
         train_list = data_files[:-1]
         train = pd.concat([pd.read_csv(file, encoding=encode)
                            for file in train_list])
-    x_train = train.text
-    y_train = train.fixer
-    test_file = data_files[-1]
-    test = pd.read_csv(test_file, encoding=encode)
-    x_test = test.text
-    y_test = test.fixer
+        x_train = train.text
+        y_train = train.fixer
+    if store is None:
+        test_file = data_files[-1]
+        test = pd.read_csv(test_file, encoding=encode)
+        x_test = test.text
+        y_test = test.fixer
 
     if validation:
         return x_train, y_train.values, x_dev, y_dev, x_test, y_test
@@ -93,40 +115,125 @@ def load_files(data_files, encode='latin2', validation=False):
         return x_train, y_train.values, x_test, y_test
 
 
-def load_train_test_files(train_files, test_file, encode='utf8'):
+def load_train_test_files(train_files, test_file, encode='utf8',
+                          train_store=None, test_store=None):
     # 使用不同数据源进行训练和测试
+    # train_store, test_store: CorpusStore of each data source
     # 读取数据
-    train = pd.concat([pd.read_csv(file, encoding=encode)
-                       for file in train_files])
-    x_train = train.text
-    y_train = train.fixer
-    test = pd.read_csv(test_file, encoding=encode)
-    x_test = test.text
-    y_test = test.fixer
+    if train_store is not None:
+        x_train, y_train = load_store_window(
+            train_store, [corpus_store.split_index(file)
+                          for file in train_files])
+    else:
+        train = pd.concat([pd.read_csv(file, encoding=encode)
+                           for file in train_files])
+        x_train = train.text
+        y_train = train.fixer
+    if test_store is not None:
+        x_test, y_test = load_store_window(
+            test_store, [corpus_store.split_index(test_file)])
+    else:
+        test = pd.read_csv(test_file, encoding=encode)
+        x_test = test.text
+        y_test = test.fixer
 
     return x_train, y_train.values, x_test, y_test
 
 
-def features_selection(x_train, y_train, featurs_selection, percent):
+class FeatureScorer(object):
+    """
+    fits the vectorizer and scores the terms of one training set once,
+    hands out the selected features for any percentile
+    """
+
+    def __init__(self, featurs_selection, statistics=None):
+        # statistics: precomputed (class_df_list, term_set, term_class_df_mat)
+        # of x_train for WLLR, IG and MI
+        self.featurs_selection = featurs_selection
+        self.statistics = statistics
+        self.scores = None
+        self.ranking = None
+
+    def fit(self, x_train, y_train):
+        self.x_train = x_train
+        self.y_train = y_train
+        self.vectorizer = TfidfVectorizer()
+        self.vectors_train = self.vectorizer.fit_transform(x_train)
+        self.features_names = self.vectorizer.get_feature_names()
+        self.scores = None
+        self.ranking = None
+        return self
+
+    @property
+    def n_features(self):
+        return len(self.features_names)
+
+    def _score(self):
+        # scores are computed on the first percentile < 1.0
+        if self.featurs_selection in ['chi2', 'mutual_info_classif']:
+            scores = eval(self.featurs_selection)(
+                self.vectors_train, self.y_train)
+            if isinstance(scores, (list, tuple)):
+                scores = scores[0]
+            # same nan handling as SelectPercentile
+            scores = np.asarray(scores, dtype=np.float64)
+            scores[np.isnan(scores)] = np.finfo(scores.dtype).min
+            self.scores = scores
+        elif self.featurs_selection in ['WLLR', 'IG', 'MI']:
+            # ranking of all terms, best first
+            if self.statistics is None:
+                self.ranking = prepocessing_bugs.feature_selection(
+                    [doc.split() for doc in self.x_train],
+                    self.y_train, self.featurs_selection, 1.0)
+            else:
+                class_df_list, term_set, term_class_df_mat = self.statistics
+                self.ranking = prepocessing_bugs.feature_selection_stats(
+                    class_df_list, term_set, term_class_df_mat,
+                    self.featurs_selection, 1.0)
+        else:
+            raise ValueError(
+                'unknown features selection: %s' % self.featurs_selection)
+
+    def support(self, percentile):
+        # mask of SelectPercentile(percentile=percentile) on the cached scores
+        scores = self.scores
+        if percentile == 100:
+            return np.ones(len(scores), dtype=bool)
+        elif percentile == 0:
+            return np.zeros(len(scores), dtype=bool)
+        threshold = np.percentile(scores, 100 - percentile)
+        mask = scores > threshold
+        ties = np.where(scores == threshold)[0]
+        if len(ties):
+            max_feats = int(len(scores) * percentile / 100)
+            kept_ties = ties[:max_feats - mask.sum()]
+            mask[kept_ties] = True
+        return mask
+
+    def select(self, percent):
+        if percent == 1.0:
+            return self.features_names
+        if self.scores is None and self.ranking is None:
+            self._score()
+        if self.ranking is not None:
+            return self.ranking[:int(len(self.ranking) * percent)]
+        return [self.features_names[k] for k in
+                np.where(self.support(int(percent * 100)))[0]]
+
+
+def features_selection(x_train, y_train, featurs_selection, percent,
+                       statistics=None, scorer=None):
+    # statistics: precomputed (class_df_list, term_set, term_class_df_mat)
+    # of x_train for WLLR, IG and MI
+    # scorer: FeatureScorer fitted on x_train, reused across percentiles
     # 选择特征
-    vectorizer = TfidfVectorizer()
-    vectors_train = vectorizer.fit_transform(x_train)
-    features_names = vectorizer.get_feature_names()
+    if scorer is None:
+        scorer = FeatureScorer(featurs_selection, statistics).fit(
+            x_train, y_train)
     if percent == 1.0:
-        return features_names
+        return scorer.select(percent)
     # num_features_selected = int(vectors_train.shape[1] * 0.05)
-    if featurs_selection in ['chi2', 'mutual_info_classif']:
-        selection = SelectPercentile(
-            eval(featurs_selection), percentile=int(percent * 100))
-        selection.fit(vectors_train, y_train)
-        features_names_selected =\
-            [features_names[k]
-             for k in selection.get_support(indices=True)]
-
-    elif featurs_selection in ['WLLR', 'IG', 'MI']:
-        features_names_selected = prepocessing_bugs.feature_selection(
-            [doc.split() for doc in x_train],
-            y_train, featurs_selection, percent)
+    features_names_selected = scorer.select(percent)
 
     print('sklearn select features: %d' % len(features_names_selected))
     print(features_names_selected[:10])
@@ -171,123 +278,271 @@ def precessing(item):
     return current_data
 
 
+def precessing_tokens(item):
+    # precessing returns a lazy filter, workers have to send back a list
+    return list(precessing(item))
+
+
+def iter_batches(iterable, batch_size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+PRECESSING_VERSION = 1
+
+
+def precessing_key(item):
+    # (bug id, content) of a json bug item for the token cache
+    bug_id = item.get('id', item.get('bug_id', ''))
+    return bug_id, item['issue_title'] + '\n' + item['description']
+
+
+def precessing_pool(items, workers=None, chunk_size=256,
+                    cache=None, with_items=False):
+    # run precessing on a process pool, tokens come back in input order
+    # items are sent in batches so only a bounded number is in flight
+    # cached token streams are returned without running nltk again
+    if workers is None:
+        workers = cpu_count()
+    namespace = cache_namespace('precessing', PRECESSING_VERSION,
+                                reg_pattern=reg_pattern)
+    pool = Pool(workers) if workers > 1 else None
+    try:
+        for batch in iter_batches(items, max(workers, 1) * chunk_size * 4):
+            if cache is not None:
+                entries = [precessing_key(item) for item in batch]
+                results = cache.get_many(entries, namespace)
+            else:
+                results = [None] * len(batch)
+            missing = [j for j, tokens in enumerate(results)
+                       if tokens is None]
+            if missing:
+                todo = [batch[j] for j in missing]
+                if pool is None:
+                    done = [precessing_tokens(item) for item in todo]
+                else:
+                    done = pool.map(precessing_tokens, todo, chunk_size)
+                for j, tokens in zip(missing, done):
+                    results[j] = tokens
+                if cache is not None:
+                    cache.put_many([entries[j] for j in missing],
+                                   namespace, done)
+            for item, tokens in zip(batch, results):
+                yield (item, tokens) if with_items else tokens
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+JSON_SKIP_RE = re.compile(r'[\s,]*')
+
+
+def iter_json_items(json_file, strict=False,
+                    batch_size=None, buffer_size=1 << 20):
+    # read a json array of bug objects item by item
+    # only the current buffer is kept in memory, not the whole dump
+    if batch_size:
+        for batch in iter_batches(
+                iter_json_items(json_file, strict, None, buffer_size),
+                batch_size):
+            yield batch
+        return
+    decoder = json.JSONDecoder(strict=strict)
+    with open(json_file) as data_file:
+        buf = data_file.read(buffer_size).lstrip()
+        if not buf.startswith('['):
+            raise ValueError('%s is not a json array' % json_file)
+        pos = 1
+        eof = False
+        while True:
+            pos = JSON_SKIP_RE.match(buf, pos).end()
+            if buf.startswith(']', pos):
+                return
+            try:
+                item, pos = decoder.raw_decode(buf, pos)
+            except ValueError:
+                # the item is cut by the end of the buffer
+                if eof:
+                    raise
+                chunk = data_file.read(buffer_size)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+            yield item
+
+
+def write_token_file(json_file, token_file, workers=None, chunk_size=256,
+                     cache=None, buffer_size=1 << 20):
+    # tokenize the bug dump in one streaming pass,
+    # one line of space separated tokens per bug
+    tmp_file = token_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf8', buffering=buffer_size) as f:
+        for tokens in precessing_pool(iter_json_items(json_file),
+                                      workers, chunk_size, cache):
+            f.write(' '.join(tokens) + '\n')
+    os.replace(tmp_file, token_file)
+    return token_file
+
+
+class WordVocabulary(object):
+    """
+    word2vec vocabulary, word -> id in a dict and id -> word in an array
+    id 0 is reserved for the unknown word
+    """
+
+    def __init__(self, words, unknown='UNK'):
+        self.words = np.array([unknown] + list(words), dtype=object)
+        self.word2id = {}
+        for idx, word in enumerate(self.words):
+            # keep the first id like list.index did
+            self.word2id.setdefault(word, idx)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.word2id
+
+    def get(self, word, default=None):
+        return self.word2id.get(word, default)
+
+    def filter(self, tokens):
+        # remove words outside the vocabulary
+        word2id = self.word2id
+        return [word for word in tokens if word in word2id]
+
+    def encode(self, tokens, max_length=None):
+        # ids of the known words, at most max_length of them
+        word2id = self.word2id
+        if max_length is None:
+            return [word2id[word] for word in tokens if word in word2id]
+        word_ids = []
+        for word in tokens:
+            idx = word2id.get(word)
+            if idx is not None:
+                word_ids.append(idx)
+                if len(word_ids) == max_length:
+                    break
+        return word_ids
+
+
 def precessing_word2vec(
         data_dir,
         data_set,
         min_word_frequency_word2vec=5,
         embed_size_word2vec=200,
-        context_window_word2vec=5):
+        context_window_word2vec=5,
+        workers=None, chunk_size=256, cache_file=None):
     # mybluemix word2vec training
     open_bugs_json = data_dir + data_set + '/deep_data.json'
-    with open(open_bugs_json) as data_file:
-        data = json.load(data_file, strict=False)
-    all_data = []
-    for item in data:
-        current_data = precessing(item)
-        current_data = filter(None, current_data)
-        all_data.append(list(current_data))
+    cache = TokenCache(cache_file) if cache_file else None
+    # word2vec reads the corpus once per epoch + once for the vocabulary,
+    # the dump is tokenized once into a line per bug instead
+    token_file = write_token_file(
+        open_bugs_json, data_dir + data_set + '/deep_data_tokens.txt',
+        workers, chunk_size, cache)
     # Learn the word2vec model and extract vocabulary
     wordvec_model = Word2Vec(
-        all_data, min_count=min_word_frequency_word2vec,
+        LineSentence(token_file), min_count=min_word_frequency_word2vec,
         size=embed_size_word2vec, window=context_window_word2vec)
     wordvec_model.save_word2vec_format(
         fname=data_dir + data_set + '.bin', binary=True)
 
 
+def encode_corpus(documents, vocabulary, max_sentence_len=50,
+                  min_sentence_length=15, block_size=4096):
+    # encode every (tokens, owner) pair once into an int32 id matrix
+    # documents shorter than min_sentence_length known words are dropped
+    blocks = []
+    block = np.zeros((block_size, max_sentence_len), dtype=np.int32)
+    row = 0
+    lengths = []
+    positions = []
+    kept_owners = []
+    total_length = 0
+    for position, (tokens, owner) in enumerate(documents):
+        total_length += 1
+        word_ids = vocabulary.encode(tokens)
+        if len(word_ids) < min_sentence_length:
+            continue
+        # the last column always stays 0
+        word_ids = word_ids[:max_sentence_len - 1]
+        block[row, :len(word_ids)] = word_ids
+        row += 1
+        if row == block_size:
+            blocks.append(block)
+            block = np.zeros_like(block)
+            row = 0
+        lengths.append(len(word_ids))
+        positions.append(position)
+        kept_owners.append(owner)
+    blocks.append(block[:row])
+    x = np.concatenate(blocks)
+    owner_set, owner_ids = np.unique(
+        np.array(kept_owners, dtype=object).astype(str),
+        return_inverse=True)
+    return x, np.array(lengths, dtype=np.int32),\
+        owner_ids.astype(np.int32), owner_set,\
+        np.array(positions, dtype=np.int64), total_length
+
+
+def split_folds(positions, owner_ids, num_owners, total_length, numCV=10):
+    # chronological folds as row ranges of the encoded corpus
+    # train rows are always [0, train_end), test rows are indexes
+    split_length = int((total_length - 1) / (numCV + 1)) + 1
+    for i in range(1, numCV + 1):
+        train_end = np.searchsorted(positions, i * split_length - 1)
+        test_begin = np.searchsorted(positions, i * split_length)
+        test_end = np.searchsorted(positions, (i + 1) * split_length - 1)
+        # Remove data from test set that is not there in train set
+        train_owner = np.zeros(num_owners, dtype=bool)
+        train_owner[owner_ids[:train_end]] = True
+        test_rows = test_begin + np.flatnonzero(
+            train_owner[owner_ids[test_begin:test_end]])
+        yield i, train_end, test_rows
+
+
 def preprocessing_json(
         data_dir, data_set, file,
         numCV=10, max_sentence_len=50,
         min_sentence_length=15, batch_size=32,
-        embed_size_word2vec=200):
+        embed_size_word2vec=200, export_csv=False,
+        workers=None, chunk_size=256, cache_file=None):
     # splits json for numCV
     closed_bugs_json = data_dir + data_set + \
         '/train_test_json/' + file + '.json'
-    with open(closed_bugs_json) as data_file:
-        data = json.load(data_file, strict=False)
-    all_data = []
-    all_owner = []
-    for item in data:
-        current_data = precessing(item)
-        all_data.append(list(current_data))
-        all_owner.append(item['owner'])
-    # load any vectors from the word2vec
+    # load the vocabulary of the word2vec store
     embedding_file = data_dir + data_set + '/' + data_set + '.bin'
-    print("Load word2vec file {}\n".format(embedding_file))
-    word_vectors = KeyedVectors.load_word2vec_format(
-        embedding_file, binary=True)
-    vocabulary = list(word_vectors.vocab.keys())
-    vocabulary.insert(0, 'UNK')
-    totalLength = len(all_data)
-    splitLength = int((totalLength - 1) / (numCV + 1)) + 1
-    for i in range(1, numCV + 1):
-        # Split cross validation set
-        train_data = all_data[:i * splitLength - 1]
-        test_data = all_data[i * splitLength:(i + 1) * splitLength - 1]
-        train_owner = all_owner[:i * splitLength - 1]
-        test_owner = all_owner[i * splitLength:(i + 1) * splitLength - 1]
-
-        # Remove words outside the vocabulary
-        updated_train_data = []
-        updated_train_owner = []
-        final_test_data = []
-        final_test_owner = []
-        for j, item in enumerate(train_data):
-            current_train_filter = [
-                word for word in item if word in vocabulary]
-            if len(current_train_filter) >= min_sentence_length:
-                updated_train_data.append(current_train_filter)
-                updated_train_owner.append(train_owner[j])
-
-        for j, item in enumerate(test_data):
-            current_test_filter = [word for word in item if word in vocabulary]
-            if len(current_test_filter) >= min_sentence_length:
-                final_test_data.append(current_test_filter)
-                final_test_owner.append(test_owner[j])
-
-        # Remove data from test set that is not there in train set
-        train_owner_unique = set(updated_train_owner)
-        test_owner_unique = set(final_test_owner)
-        unwanted_owner = list(test_owner_unique - train_owner_unique)
-        updated_test_data = []
-        updated_test_owner = []
-        for j in range(len(final_test_owner)):
-            if final_test_owner[j] not in unwanted_owner:
-                updated_test_data.append(final_test_data[j])
-                updated_test_owner.append(final_test_owner[j])
-
-        # Create train and test data for deep learning + softmax
-        X_train = np.empty(
-            shape=[len(updated_train_data), max_sentence_len],
-            dtype='float32')
-        Y_train = updated_train_owner
-        for j, curr_row in enumerate(updated_train_data):
-            sequence_cnt = 0
-            for item in curr_row:
-                if item in vocabulary:
-                    X_train[j, sequence_cnt] = vocabulary.index(item)
-                    sequence_cnt = sequence_cnt + 1
-                    if sequence_cnt == max_sentence_len - 1:
-                        break
-            for k in range(sequence_cnt, max_sentence_len):
-                X_train[j, k] = np.zeros((1,))
-
-        X_test = np.empty(
-            shape=[len(updated_test_data), max_sentence_len],
-            dtype='float32')
-        Y_test = updated_test_owner
-        for j, curr_row in enumerate(updated_test_data):
-            sequence_cnt = 0
-            for item in curr_row:
-                if item in vocabulary:
-                    X_test[j, sequence_cnt] = vocabulary.index(item)
-                    sequence_cnt = sequence_cnt + 1
-                    if sequence_cnt == max_sentence_len - 1:
-                        break
-            for k in range(sequence_cnt, max_sentence_len):
-                X_test[j, k] = np.zeros((1,))
-        save_dir = data_dir + data_set + '/train_test_json/' + file + '/'
-        if not os.path.exists(save_dir):
-            os.mkdir(save_dir)
+    # built once and shared by all folds
+    vocabulary = WordVocabulary(embedding_store.load_words(embedding_file))
+    # stream, tokenize, filter and encode once, every fold is a view on it
+    cache = TokenCache(cache_file) if cache_file else None
+    all_data = ((tokens, item['owner']) for item, tokens in precessing_pool(
+        iter_json_items(closed_bugs_json), workers, chunk_size,
+        cache, with_items=True))
+    x_all, lengths, owner_ids, owner_set, positions, totalLength =\
+        encode_corpus(all_data, vocabulary,
+                      max_sentence_len, min_sentence_length)
+    save_dir = data_dir + data_set + '/train_test_json/' + file + '/'
+    if not os.path.exists(save_dir):
+        os.mkdir(save_dir)
+    folds = list(split_folds(
+        positions, owner_ids, len(owner_set), totalLength, numCV))
+    save_fold_store(save_dir, x_all, lengths, owner_ids, owner_set, folds)
+    if not export_csv:
+        return
+    for i, train_end, test_rows in folds:
+        X_train = x_all[:train_end]
+        Y_train = owner_set[owner_ids[:train_end]]
+        X_test = x_all[test_rows]
+        Y_test = owner_set[owner_ids[test_rows]]
         print(len(X_train))
         saved_path = save_dir + str(i) + '_x_train.csv'
         X_train = pd.DataFrame(X_train)
@@ -303,39 +558,82 @@ def preprocessing_json(
         Y_test.to_csv(saved_path, index=False, header=True)
 
 
+FOLD_STORE_VERSION = 1
+
+
+def save_fold_store(save_dir, x_all, lengths, owner_ids, owner_set, folds):
+    # binary fold store: the encoded corpus is saved once as .npy files,
+    # folds only keep the train prefix length and the test row indexes
+    if os.path.exists(save_dir + 'corpus_meta.json'):
+        os.remove(save_dir + 'corpus_meta.json')
+    np.save(save_dir + 'corpus_x.npy', x_all.astype(np.int32))
+    np.save(save_dir + 'corpus_y.npy', owner_ids.astype(np.int32))
+    np.save(save_dir + 'corpus_length.npy', lengths.astype(np.int32))
+    meta = {
+        'version': FOLD_STORE_VERSION,
+        'num_rows': int(x_all.shape[0]),
+        'max_sentence_len': int(x_all.shape[1]),
+        'owners': [str(owner) for owner in owner_set],
+        'folds': {}
+    }
+    for i, train_end, test_rows in folds:
+        test_file = str(i) + '_test_rows.npy'
+        np.save(save_dir + test_file, test_rows.astype(np.int64))
+        meta['folds'][str(i)] = {
+            'train_end': int(train_end), 'test_rows': test_file}
+        print('fold %d: train %d, test %d' % (i, train_end, len(test_rows)))
+    # the header is written last, a store without it is incomplete
+    with open(save_dir + 'corpus_meta.json', 'w') as f:
+        json.dump(meta, f)
+
+
+def load_fold_store(save_dir, index, mmap_mode='r'):
+    # open a fold without parsing, train x is a view on the memmap
+    with open(save_dir + 'corpus_meta.json') as f:
+        meta = json.load(f)
+    if meta['version'] != FOLD_STORE_VERSION:
+        raise ValueError('unsupported fold store version: %s' %
+                         meta['version'])
+    fold = meta['folds'][str(index)]
+    owner_set = np.array(meta['owners'], dtype=object)
+    x_all = np.load(save_dir + 'corpus_x.npy', mmap_mode=mmap_mode)
+    y_all = np.load(save_dir + 'corpus_y.npy', mmap_mode=mmap_mode)
+    test_rows = np.load(save_dir + fold['test_rows'])
+    train_end = fold['train_end']
+    # labels keep the column shape of the csv files
+    x_train = x_all[:train_end]
+    y_train = owner_set[y_all[:train_end]].reshape(-1, 1)
+    x_test = x_all[test_rows]
+    y_test = owner_set[y_all[test_rows]].reshape(-1, 1)
+    return x_train, y_train, x_test, y_test
+
+
 def load_train_test(data_dir, data_set, file, index, class_file,
                     embed_size_word2vec=200, encode='utf8'):
     # mybluemix load train test by index
-    x_train_file = data_dir + data_set + '/train_test_json/' + \
-        file + '/' + str(index) + '_x_train.csv'
-    x_train = pd.read_csv(x_train_file, encoding=encode)
-    y_train_file = data_dir + data_set + '/train_test_json/' + \
-        file + '/' + str(index) + '_y_train.csv'
-    y_train = pd.read_csv(y_train_file, encoding=encode)
-    x_test_file = data_dir + data_set + '/train_test_json/' + \
-        file + '/' + str(index) + '_x_test.csv'
-    x_test = pd.read_csv(x_test_file, encoding=encode)
-    y_test_file = data_dir + data_set + '/train_test_json/' + \
-        file + '/' + str(index) + '_y_test.csv'
-    y_test = pd.read_csv(y_test_file, encoding=encode)
-    # load any vectors from the word2vec
+    save_dir = data_dir + data_set + '/train_test_json/' + file + '/'
+    if os.path.exists(save_dir + 'corpus_meta.json'):
+        x_train, y_train, x_test, y_test = load_fold_store(save_dir, index)
+    else:
+        # csv files exported by preprocessing_json
+        x_train = pd.read_csv(
+            save_dir + str(index) + '_x_train.csv', encoding=encode).values
+        y_train = pd.read_csv(
+            save_dir + str(index) + '_y_train.csv', encoding=encode).values
+        x_test = pd.read_csv(
+            save_dir + str(index) + '_x_test.csv', encoding=encode).values
+        y_test = pd.read_csv(
+            save_dir + str(index) + '_y_test.csv', encoding=encode).values
+    # load any vectors from the word2vec, row i is the vector of word id i
     embedding_file = data_dir + data_set + '/' + data_set + '.bin'
-    print("Load word2vec file {}\n".format(embedding_file))
-    word_vectors = KeyedVectors.load_word2vec_format(
-        embedding_file, binary=True)
-    vocabulary = list(word_vectors.vocab.keys())
-    vocabulary.insert(0, 'UNK')
-    # initial matrix with random uniform
-    embedding = np.random.uniform(
-        -0.25,
-        0.25,
-        (len(word_vectors.vocab), embed_size_word2vec))
-    for idx, word in enumerate(word_vectors.vocab):
-        embedding[idx] = word_vectors[word]
+    vocabulary = WordVocabulary(embedding_store.load_words(embedding_file))
+    embedding = embedding_store.embedding_matrix(
+        vocabulary.word2id, embedding_file, embed_size_word2vec,
+        n_words=len(vocabulary))
     lb = LabelBinarizer()
     lb.fit(y_train)
     np.savetxt(class_file, lb.classes_, fmt="%s")
-    return x_train.values, y_train.values, x_test.values, y_test.values, embedding, lb
+    return x_train, y_train, x_test, y_test, embedding, lb
 
 
 def tokenizer(iterator):
@@ -350,14 +648,75 @@ def hand(raw_documents, vocabulary):
         yield word_ids
 
 
-def pad(documents, document_length):
-    for document in documents:
-        len_doc = len(document)
-        if len_doc < document_length:
-            yield np.pad(
-                document, (0, document_length - len_doc), 'constant')
-        else:
-            yield document[: document_length]
+def vocabulary_mapping(vocabulary):
+    # plain dict snapshot of a frozen CategoricalVocabulary
+    return dict(vocabulary._mapping)
+
+
+def tokenize_encode(raw_documents, mapping, batch_size=1024):
+    # tokenize and encode batches of documents with one dict lookup per
+    # token, yields flat int32 ids and the number of ids per document
+    # unknown tokens (None) and <UNK> (0) are dropped like in hand
+    findall = TOKENIZER_RE.findall
+    get = mapping.get
+    for batch in iter_batches(raw_documents, batch_size):
+        word_ids = []
+        lengths = []
+        for document in batch:
+            document_ids = [idx for idx in map(get, findall(document))
+                            if idx]
+            lengths.append(len(document_ids))
+            word_ids.extend(document_ids)
+        yield np.array(word_ids, dtype=np.int32),\
+            np.array(lengths, dtype=np.int32)
+
+
+def encode_documents(raw_documents, vocabulary,
+                     document_length=None, quantile=0.8):
+    # word ids written straight into a [n_docs, document_length] int32
+    # matrix, padded with 0; document_length defaults to the quantile
+    # of the document lengths
+    word_ids = []
+    lengths = []
+    for batch_ids, batch_lengths in tokenize_encode(
+            raw_documents, vocabulary_mapping(vocabulary)):
+        word_ids.append(batch_ids)
+        lengths.append(batch_lengths)
+    word_ids = np.concatenate(word_ids) if word_ids else\
+        np.zeros(0, dtype=np.int32)
+    lengths = np.concatenate(lengths) if lengths else\
+        np.zeros(0, dtype=np.int32)
+    if document_length is None:
+        document_length = int(np.percentile(lengths, quantile * 100))
+    x = np.zeros((len(lengths), document_length), dtype=np.int32)
+    # scatter the first document_length ids of every document
+    starts = np.cumsum(lengths) - lengths
+    lengths = np.minimum(lengths, document_length)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    columns = np.arange(lengths.sum()) -\
+        np.repeat(np.cumsum(lengths) - lengths, lengths)
+    x[rows, columns] = word_ids[np.repeat(starts, lengths) + columns]
+    return x, lengths, document_length
+
+
+def encoding_throughput(raw_documents, vocabulary, repeat=3):
+    # docs/sec of the hand generator against encode_documents
+    # e.g. on the text column of the eclipse split files
+    raw_documents = list(raw_documents)
+    timings = {}
+    for name, run in [
+            ('hand', lambda: list(hand(raw_documents, vocabulary))),
+            ('tokenize_encode',
+             lambda: encode_documents(raw_documents, vocabulary))]:
+        best = None
+        for _ in range(repeat):
+            start = time.time()
+            run()
+            elapsed = time.time() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = len(raw_documents) / max(best, 1e-9)
+        print('%s: %.1f docs/sec' % (name, timings[name]))
+    return timings
 
 
 def transform_data_hand(
@@ -372,31 +731,14 @@ def transform_data_hand(
     for feature in features_names_selected:
         vocabulary.add(feature)
     vocabulary.freeze()
-    x_train = np.array(list(hand(x_train, vocabulary)))
     # 处理文本数据
-    document_length_df = pd.DataFrame([len(xx) for xx in x_train])
-    document_length = int(document_length_df.quantile(0.8))
-
-    x_train = pad(x_train, document_length)
-    x_test = np.array(list(hand(x_test, vocabulary)))
-    x_test = pad(x_test, document_length)
+    x_train, _, document_length = encode_documents(x_train, vocabulary)
+    x_test, _, _ = encode_documents(x_test, vocabulary, document_length)
     if validation:
-        x_dev = np.array(list(hand(x_dev, vocabulary)))
-        x_dev = pad(x_dev, document_length)
-    # initial matrix with random uniform
-    embedding = np.random.uniform(
-        -0.25,
-        0.25,
-        (len(vocabulary), embedding_dim))
+        x_dev, _, _ = encode_documents(x_dev, vocabulary, document_length)
     # load any vectors from the word2vec
-    print("Load word2vec file {}\n".format(embedding_file))
-
-    word_vectors = KeyedVectors.load_word2vec_format(
-        embedding_file, binary=True)
-    for word in word_vectors.vocab:
-        idx = vocabulary.get(word)
-        if idx != 0:
-            embedding[idx] = word_vectors[word]
+    embedding = embedding_store.embedding_matrix(
+        vocabulary_mapping(vocabulary), embedding_file, embedding_dim)
     lb = LabelBinarizer()
     lb.fit(y_train)
     np.savetxt(class_file, lb.classes_, fmt="%s")
@@ -436,20 +778,10 @@ def transform_data(
     if validation:
         x_dev = np.array(list(vocabulary_processor.transform(x_dev)))
 
-    # initial matrix with random uniform
-    embedding = np.random.uniform(
-        -0.25,
-        0.25,
-        (len(vocabulary_processor.vocabulary_), embedding_dim))
     # load any vectors from the word2vec
-    print("Load word2vec file {}\n".format(embedding_file))
-
-    word_vectors = KeyedVectors.load_word2vec_format(
-        embedding_file, binary=True)
-    for word in word_vectors.vocab:
-        idx = vocabulary_processor.vocabulary_.get(word)
-        if idx != 0:
-            embedding[idx] = word_vectors[word]
+    embedding = embedding_store.embedding_matrix(
+        vocabulary_mapping(vocabulary_processor.vocabulary_),
+        embedding_file, embedding_dim)
     lb = LabelBinarizer()
     lb.fit(y_train)
     np.savetxt(class_file, lb.classes_, fmt="%s")
@@ -459,10 +791,28 @@ def transform_data(
     return x_train, y_train, x_test, y_test, embedding, lb
 
 
+def label_ids(labelBinarizer, labels):
+    # class index of every label in labelBinarizer.classes_,
+    # -1 for labels it does not know (an all zero one-hot row)
+    classes = labelBinarizer.classes_
+    labels = np.asarray(labels)
+    if labels.ndim > 1:
+        labels = labels[:, 0]
+    ids = np.searchsorted(classes, labels)
+    ids[ids >= len(classes)] = 0
+    ids[classes[ids] != labels] = -1
+    return ids.astype(np.int32)
+
+
 def batch_generator(
         data, labels, labelBinarizer,
-        batch_size, num_epochs=1, shuffle=False):
+        batch_size, num_epochs=1, shuffle=False, sparse=False):
     """
+    yields (x_batch, y_batch, labels_batch): int32 ids, one-hot labels
+    (int32 class ids with sparse, -1 for unknown labels)
+    and the raw labels of the batch, the last batch of an epoch is filled
+    up with reshuffled rows. x_batch and y_batch are reused buffers,
+    they are only valid until the next batch
 
     :param data:
     :param batch_size:
@@ -471,40 +821,48 @@ def batch_generator(
     :return:
     """
 
+    data = np.ascontiguousarray(data, dtype=np.int32)
+    labels = np.asarray(labels)
     # 处理label
-    labels_code = labelBinarizer.transform(labels)
-    #
-    data = np.array(list(zip(data, labels_code)))
+    ids = label_ids(labelBinarizer, labels)
+    num_classes = len(labelBinarizer.classes_)
     data_size = len(data)
+    x_buffer = np.empty((batch_size,) + data.shape[1:], dtype=np.int32)
+    ids_buffer = np.empty(batch_size, dtype=np.int32)
+    if not sparse:
+        y_buffer = np.zeros((batch_size, num_classes), dtype=np.int64)
+
+    def take(indices):
+        size = len(indices)
+        x_batch = x_buffer[:size]
+        np.take(data, indices, axis=0, out=x_batch)
+        np.take(ids, indices, out=ids_buffer[:size])
+        if sparse:
+            return x_batch, ids_buffer[:size], labels[indices]
+        y_batch = y_buffer[:size]
+        y_batch.fill(0)
+        known = ids_buffer[:size] >= 0
+        y_batch[np.arange(size)[known], ids_buffer[:size][known]] = 1
+        return x_batch, y_batch, labels[indices]
+
     num_batches_per_epoch = int((data_size - 1) / batch_size) + 1
     for epoch in range(num_epochs):
         # Shuffle the data at each epoch
         if shuffle:
-            shuffle_indices = np.random.permutation(np.arange(data_size))
-            shuffled_data = data[shuffle_indices]
-            labels = labels[shuffle_indices]
+            order = np.random.permutation(data_size)
         else:
-            shuffled_data = data
+            order = np.arange(data_size)
         for batch_num in range(num_batches_per_epoch):
             start_index = batch_num * batch_size
             end_index = (batch_num + 1) * batch_size
             # end_index = min((batch_num + 1) * batch_size, data_size)
             if end_index < data_size:
-                yield shuffled_data[start_index:
-                                    end_index], labels[start_index: end_index]
+                yield take(order[start_index:end_index])
             else:
-                rest_part = shuffled_data[start_index:]
-                rest_labels = labels[start_index: end_index]
-                shuffle_indices = np.random.permutation(np.arange(data_size))
-                shuffled_data = shuffled_data[shuffle_indices]
-                labels = labels[shuffle_indices]
-                new_part = shuffled_data[:batch_size -
-                                         (data_size - start_index)]
-                new_labels = labels[:batch_size -
-                                    (data_size - start_index)]
-                yield np.concatenate((rest_part, new_part),
-                                     axis=0), np.concatenate(
-                    (rest_labels, new_labels), axis=0)
+                rest_part = order[start_index:]
+                order = order[np.random.permutation(data_size)]
+                new_part = order[:batch_size - (data_size - start_index)]
+                yield take(np.concatenate((rest_part, new_part)))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,132 @@
+# -*- code:utf-8 -*-
+import os
+import json
+import hashlib
+import numpy as np
+
+STORE_VERSION = 1
+
+
+def store_dir(embedding_file):
+    return embedding_file + '.store/'
+
+
+def _source_stamp(embedding_file):
+    stat = os.stat(embedding_file)
+    return {'file': os.path.abspath(embedding_file),
+            'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+
+def convert_word2vec(embedding_file, binary=True):
+    # one time conversion of a word2vec file into
+    # words.txt + vectors.npy (float32, memory-mappable)
+    from gensim.models import KeyedVectors
+    print("Convert word2vec file {}\n".format(embedding_file))
+    word_vectors = KeyedVectors.load_word2vec_format(
+        embedding_file, binary=binary)
+    save_dir = store_dir(embedding_file)
+    if not os.path.exists(save_dir):
+        os.makedirs(save_dir)
+    words = list(word_vectors.index2word)
+    with open(save_dir + 'words.txt', 'w', encoding='utf8') as f:
+        for word in words:
+            f.write(word + '\n')
+    np.save(save_dir + 'vectors.npy',
+            np.asarray(word_vectors.vectors, dtype=np.float32))
+    meta = {'version': STORE_VERSION,
+            'source': _source_stamp(embedding_file),
+            'shape': [len(words), int(word_vectors.vector_size)]}
+    with open(save_dir + 'meta.json', 'w') as f:
+        json.dump(meta, f)
+
+
+def _store_meta(embedding_file):
+    meta_file = store_dir(embedding_file) + 'meta.json'
+    if not os.path.exists(meta_file):
+        return None
+    with open(meta_file) as f:
+        meta = json.load(f)
+    if meta['version'] != STORE_VERSION or\
+            meta['source'] != _source_stamp(embedding_file):
+        return None
+    return meta
+
+
+def load_words(embedding_file, binary=True):
+    # words of the store in row order, streamed from words.txt,
+    # converts the file on first use
+    if _store_meta(embedding_file) is None:
+        convert_word2vec(embedding_file, binary)
+    with open(store_dir(embedding_file) + 'words.txt',
+              encoding='utf8') as f:
+        for line in f:
+            yield line.rstrip('\n')
+
+
+def load_vectors(embedding_file, binary=True):
+    if _store_meta(embedding_file) is None:
+        convert_word2vec(embedding_file, binary)
+    return np.load(store_dir(embedding_file) + 'vectors.npy', mmap_mode='r')
+
+
+def _vocabulary_hash(mapping):
+    words = sorted(mapping.items(), key=lambda x: (x[1], x[0]))
+    digest = hashlib.sha1()
+    for word, idx in words:
+        digest.update(('%s\t%d\n' % (word, idx)).encode('utf8'))
+    return digest.hexdigest()
+
+
+def _aligned_vectors(mapping, embedding_file, binary):
+    # (ids, word2vec vectors of those ids) of the words of mapping found
+    # in the store, except id 0; cached by (embedding file, vocabulary hash)
+    key = hashlib.sha1(json.dumps(
+        [_source_stamp(embedding_file),
+         _vocabulary_hash(mapping)]).encode('utf8')).hexdigest()
+    cache_file = store_dir(embedding_file) + 'aligned/' + key + '.npz'
+    if os.path.exists(cache_file):
+        print("Load cached embedding {}\n".format(cache_file))
+        with np.load(cache_file) as aligned:
+            return aligned['indexes'], aligned['vectors']
+
+    print("Load word2vec store {}\n".format(store_dir(embedding_file)))
+    vectors = load_vectors(embedding_file, binary)
+    rows = []
+    indexes = []
+    for row, word in enumerate(load_words(embedding_file, binary)):
+        idx = mapping.get(word)
+        if idx:
+            rows.append(row)
+            indexes.append(idx)
+    indexes = np.asarray(indexes, dtype=np.int64)
+    # rows in store order read the memmap sequentially
+    vectors = np.asarray(vectors[rows], dtype=np.float32)
+
+    if not os.path.exists(os.path.dirname(cache_file)):
+        os.makedirs(os.path.dirname(cache_file))
+    tmp_file = cache_file[:-len('.npz')] + '.tmp.npz'
+    np.savez(tmp_file, indexes=indexes, vectors=vectors)
+    os.replace(tmp_file, cache_file)
+    return indexes, vectors
+
+
+def embedding_matrix(mapping, embedding_file, embedding_dim,
+                     n_words=None, binary=True, seed=None):
+    # [n_words, embedding_dim] matrix aligned with mapping (word -> idx):
+    # random uniform rows, word2vec vectors for known words except idx 0.
+    # only the word2vec rows are cached, the random rows are drawn on
+    # every call, from np.random or from seed when given
+    if n_words is None:
+        n_words = len(mapping)
+    if _store_meta(embedding_file) is None:
+        convert_word2vec(embedding_file, binary)
+    indexes, vectors = _aligned_vectors(mapping, embedding_file, binary)
+    if vectors.shape[1] != embedding_dim:
+        raise ValueError('embedding_dim %d does not match %s (%d)' % (
+            embedding_dim, embedding_file, vectors.shape[1]))
+    random_state = np.random.RandomState(seed) if seed is not None\
+        else np.random
+    # initial matrix with random uniform
+    embedding = random_state.uniform(-0.25, 0.25, (n_words, embedding_dim))
+    embedding[indexes] = vectors
+    return embedding
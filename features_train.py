@@ -4,7 +4,10 @@ import os
 import numpy as np
 import datetime
 import data_utls
-from models import Model
+import architectures
+import corpus_store
+import prepocessing_bugs
+from sweep import SweepRunner
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 
 # Parameters
@@ -66,6 +69,24 @@ tf.flags.DEFINE_string(
 tf.flags.DEFINE_float(
     "percentile", 0.5,
     "features selection percentile (default: 0.5)")
+tf.flags.DEFINE_string(
+    "input_pipeline", "feed_dict",
+    "feed_dict or dataset: in-graph batches with prefetch")
+tf.flags.DEFINE_boolean(
+    "sparse_labels", True,
+    "int32 class ids instead of one-hot labels")
+tf.flags.DEFINE_string(
+    "softmax", "full",
+    "full, sampled or nce: softmax of the training steps")
+tf.flags.DEFINE_integer(
+    "num_sampled", 512,
+    "negative classes of sampled or nce softmax (default: 512)")
+tf.flags.DEFINE_integer(
+    "length_bucket", 1,
+    "pad the documents of the percentile sweep to a multiple of it so "
+    "that runs share graphs; padding changes the pooling windows and the "
+    "last lstm step, so results are no longer comparable with unpadded "
+    "runs (default: 1, exact lengths)")
 FLAGS = tf.flags.FLAGS
 
 
@@ -74,23 +95,26 @@ def train_step(cnn, train_summary_writer, sess, x_batch_train, y_batch_train):
     A single training step
     """
     feed_dict = {
-        cnn.input_x: x_batch_train,
-        cnn.input_y: y_batch_train,
         cnn.dropout_keep_prob: FLAGS.dropout_keep_prob,
         cnn.is_training: True
     }
+    # batches of the dataset pipeline are not fed
+    if x_batch_train is not None:
+        feed_dict[cnn.input_x] = x_batch_train
+        feed_dict[cnn.input_y] = y_batch_train
+    # accuracy with the full softmax, the negative cost with the sampled
+    # one, whose training steps never compute the full logits
     _, step_train, summaries,\
         loss, acc_at_1 =\
         sess.run([cnn.train_op, cnn.global_step,
-                  cnn.train_summary_op, cnn.cost, cnn.accuracy_at_1],
+                  cnn.train_summary_op, cnn.cost, cnn.train_score],
                  feed_dict)
     if step_train % FLAGS.print_loss == 0:
         time_str = datetime.datetime.now().isoformat()
         print(
-            "{}: step {}, loss {:g}, acc_1 {:g}".format(time_str,
-                                                        step_train,
-                                                        loss,
-                                                        acc_at_1))
+            "{}: step {}, loss {:g}, {} {:g}".format(
+                time_str, step_train, loss,
+                'acc_1' if FLAGS.softmax == 'full' else 'score', acc_at_1))
     train_summary_writer.add_summary(summaries, step_train)
     return acc_at_1
 
@@ -149,14 +173,8 @@ def main(_):
 
     embedding_file = FLAGS.data_dir + 'GoogleNews-vectors-negative300.bin'
 
-    model_types = ["textcnn", "multi_layers_cnn",
-                   "hierarchical_cnn", "textlstm",
-                   "text_bilstm", "text_cnn_lstm",
-                   "text_dense", "text_conv_dense",
-                   "text_dp_cnn", "text_inception",
-                   "text_inception_dense"]
     model_type = "inception_dense_net1_transpose"
-    assert model_type in model_types
+    architectures.check_model_type(model_type)
 
     FLAGS.checkpointDir = FLAGS.checkpointDir + model_type
     train_data = "eclipse/song_no_select/"
@@ -167,20 +185,37 @@ def main(_):
     train_index = 1
     class_file = data_results + "class_" + str(train_index) + ".csv"
     data_files = [data_dir + str(i) + '.csv' for i in range(train_index + 1)]
+    # splits are read from the corpus store when it exists
+    store = corpus_store.open_store(data_dir + 'corpus/')
     x_train, y_train, x_dev, y_dev = data_utls.load_files(
-        data_files, validation=False)
+        data_files, validation=False, store=store)
     percentiles = [0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
     # featurs_selections = ['chi2', 'mutual_info_classif', 'WLLR', 'IG', 'MI']
     featurs_selections = ['chi2']
+    # term-class statistics of the training splits, cached per split
+    statistics = None
+    if set(featurs_selections) & set(['WLLR', 'IG', 'MI']):
+        statistics = prepocessing_bugs.window_statistics(
+            data_files[:-1], encoding='latin2', store=store)
+    # one graph per input shape for the whole sweep
+    runner = SweepRunner(
+        tf.ConfigProto(
+            allow_soft_placement=FLAGS.allow_soft_placement,
+            log_device_placement=FLAGS.log_device_placement),
+        FLAGS.length_bucket, max_to_keep=FLAGS.num_checkpoints)
     for featurs_selection in featurs_selections:
         data_dir = data_results + '/' + featurs_selection + '/'
         if not tf.gfile.Exists(data_dir):
             tf.gfile.MakeDirs(data_dir)
+        # one vectorizer fit and scoring for the whole percentile sweep
+        scorer = data_utls.FeatureScorer(featurs_selection, statistics).fit(
+            x_train, y_train)
         for percentile in percentiles:
             FLAGS.features_selection = featurs_selection
             FLAGS.percentile = percentile
             features_names_selected = data_utls.features_selection(
-                x_train, y_train, FLAGS.features_selection, FLAGS.percentile)
+                x_train, y_train, FLAGS.features_selection, FLAGS.percentile,
+                statistics, scorer)
             x_train_t, y_train_t, x_test, y_test,\
                 document_length, embedding, lb =\
                 data_utls.transform_data_hand(
@@ -201,10 +236,22 @@ def main(_):
                 'max_sent_length': document_length,
                 'num_classes': len(lb.classes_),
                 'embedding_shape': embedding.shape,
-                'train_phase': True
+                'train_phase': True,
+                'input_pipeline': FLAGS.input_pipeline,
+                'sparse_labels': FLAGS.sparse_labels,
+                'softmax': FLAGS.softmax,
+                'num_sampled': FLAGS.num_sampled
             }
+            # size of the model before its graph is built
+            print("{}: {}".format(
+                model_type, architectures.info(model_type, config_model)))
+            # vocabularies of the sweep fit in an embedding of
+            # every feature + the unknown word
             train(x_train_t, y_train_t, x_test, y_test, lb, embedding,
-                  model_type, data_dir, train_index, config_model)
+                  model_type, data_dir, train_index, config_model,
+                  runner, scorer.n_features + 1)
+    print(runner.report())
+    runner.close()
 
 
 def train(
@@ -212,21 +259,16 @@ def train(
         x_dev, y_dev, lb,
         embedding, model_type,
         data_results, train_index,
-        config_model):
-    tf.reset_default_graph()
-    with tf.Graph().as_default():
-        session_conf = tf.ConfigProto(
-            allow_soft_placement=FLAGS.allow_soft_placement,
-            log_device_placement=FLAGS.log_device_placement)
-
-        sess = tf.Session(config=session_conf)
+        config_model, runner, capacity=None):
+    # variables are initialized and the embedding loaded by the runner
+    cnn, sess, saver = runner.run(
+        model_type, config_model, embedding, capacity)
+    x_train = runner.pad(x_train, cnn)
+    x_dev = runner.pad(x_dev, cnn)
+    with sess.graph.as_default():
         with sess.as_default():
-            cnn = Model(model_type=model_type, config_model=config_model)
             # Checkpoint directory. TensorFlow assumes this directory
             # already exists so we need to create it
-            saver = tf.train.Saver(
-                var_list=tf.trainable_variables(),
-                max_to_keep=FLAGS.num_checkpoints)
             checkpoint_dir = os.path.abspath(
                 os.path.join(FLAGS.checkpointDir, "checkpoints"))
             checkpoint_prefix = os.path.join(checkpoint_dir, "model")
@@ -234,38 +276,34 @@ def train(
                 print("Restoring Variables from Checkpoint")
                 saver.restore(sess,
                               tf.train.latest_checkpoint(checkpoint_dir))
-                if FLAGS.embedding_type == 'static':
-                    sess.run(tf.assign(cnn.embedding, embedding))
             else:
                 if tf.gfile.Exists(FLAGS.checkpointDir):
                     tf.gfile.DeleteRecursively(FLAGS.checkpointDir)
                     tf.gfile.MakeDirs(FLAGS.checkpointDir)
                 print("Creating Checkpoint file for restoring")
                 os.makedirs(checkpoint_dir)
-                # Initialize all variables
-                sess.run(tf.global_variables_initializer())
-                sess.run(tf.local_variables_initializer())
-                if FLAGS.embedding_type in ['static', 'non_static',
-                                            'multiple_channels']:
-                    sess.run(tf.assign(cnn.embedding, embedding))
-                    if FLAGS.embedding_type == 'multiple_channels':
-                        sess.run(tf.assign(cnn.another_embedding, embedding))
             train_summary_dir = os.path.abspath(
                 os.path.join(FLAGS.checkpointDir, "summaries", "train"))
             train_summary_writer = tf.summary.FileWriter(
                 train_summary_dir, sess.graph)
 
             # Generate batches
-            batches = data_utls.batch_generator(
-                x_train, y_train, lb,
-                FLAGS.batch_size, FLAGS.num_epochs,
-                shuffle=True)
+            if FLAGS.input_pipeline == 'dataset':
+                # batches are assembled and prefetched in the graph
+                num_steps = cnn.init_dataset(
+                    sess, x_train, data_utls.label_ids(lb, y_train),
+                    FLAGS.batch_size, FLAGS.num_epochs, shuffle=True)
+                batches = ((None, None, None) for _ in range(num_steps))
+            else:
+                batches = data_utls.batch_generator(
+                    x_train, y_train, lb,
+                    FLAGS.batch_size, FLAGS.num_epochs,
+                    shuffle=True, sparse=FLAGS.sparse_labels)
             # Training loop. For each batch...
-            best_accuracy = 0.0
+            best_accuracy = 0.0 if FLAGS.softmax == 'full' else -np.inf
             last_improvement_step = 0
             numer_iter = int((len(y_train) - 1) / FLAGS.batch_size) + 1
-            for batch, _ in batches:
-                x_batch, y_batch = zip(*batch)
+            for x_batch, y_batch, _ in batches:
                 accuracy = train_step(
                     cnn, train_summary_writer, sess, x_batch, y_batch)
                 current_step = tf.train.global_step(sess, cnn.global_step)
@@ -291,14 +329,14 @@ def train(
                 test_summary_dir, sess.graph)
             print("\n Testing:")
             dev_batches = data_utls.batch_generator(
-                x_dev, y_dev, lb, 1)
+                x_dev, y_dev, lb, 1,
+                sparse=FLAGS.sparse_labels)
             step = 0
             top_k_values = []
             top_k_indices = []
             labels = []
-            for dev_batch, label in dev_batches:
+            for x_dev_batch, y_dev_batch, label in dev_batches:
                 step += 1
-                x_dev_batch, y_dev_batch = zip(*dev_batch)
                 top_k_value, top_k_indice, loss, recall, precision = test_step(
                     cnn, sess, x_dev_batch, y_dev_batch, step,
                     writer=test_summary_writer)
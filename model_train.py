@@ -4,7 +4,9 @@ import os
 import numpy as np
 import datetime
 import data_utls
-from models import Model
+import architectures
+import corpus_store
+from sweep import SweepRunner
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 
 # Parameters
@@ -66,6 +68,18 @@ tf.flags.DEFINE_string(
 tf.flags.DEFINE_float(
     "percentile", 1.0,
     "features selection percentile (default: 0.3)")
+tf.flags.DEFINE_string(
+    "input_pipeline", "feed_dict",
+    "feed_dict or dataset: in-graph batches with prefetch")
+tf.flags.DEFINE_boolean(
+    "sparse_labels", True,
+    "int32 class ids instead of one-hot labels")
+tf.flags.DEFINE_string(
+    "softmax", "full",
+    "full, sampled or nce: softmax of the training steps")
+tf.flags.DEFINE_integer(
+    "num_sampled", 512,
+    "negative classes of sampled or nce softmax (default: 512)")
 FLAGS = tf.flags.FLAGS
 
 
@@ -74,23 +88,26 @@ def train_step(cnn, train_summary_writer, sess, x_batch_train, y_batch_train):
     A single training step
     """
     feed_dict = {
-        cnn.input_x: x_batch_train,
-        cnn.input_y: y_batch_train,
         cnn.dropout_keep_prob: FLAGS.dropout_keep_prob,
         cnn.is_training: True
     }
+    # batches of the dataset pipeline are not fed
+    if x_batch_train is not None:
+        feed_dict[cnn.input_x] = x_batch_train
+        feed_dict[cnn.input_y] = y_batch_train
+    # accuracy with the full softmax, the negative cost with the sampled
+    # one, whose training steps never compute the full logits
     _, step_train, summaries,\
         loss, acc_at_1 =\
         sess.run([cnn.train_op, cnn.global_step,
-                  cnn.train_summary_op, cnn.cost, cnn.accuracy_at_1],
+                  cnn.train_summary_op, cnn.cost, cnn.train_score],
                  feed_dict)
     if step_train % FLAGS.print_loss == 0:
         time_str = datetime.datetime.now().isoformat()
         print(
-            "{}: step {}, loss {:g}, acc_1 {:g}".format(time_str,
-                                                        step_train,
-                                                        loss,
-                                                        acc_at_1))
+            "{}: step {}, loss {:g}, {} {:g}".format(
+                time_str, step_train, loss,
+                'acc_1' if FLAGS.softmax == 'full' else 'score', acc_at_1))
     train_summary_writer.add_summary(summaries, step_train)
     return acc_at_1
 
@@ -157,34 +174,46 @@ def main(_):
                    "text_inception_dense"]
     model_types = ["text_dp_cnn"]
     # model_types = ["text_conv_dense"]
+    # unknown model types fail before any data is loaded
+    for model_type in model_types:
+        architectures.check_model_type(model_type)
     train_indexes = range(1, 2)
     # song_no_select_summary_description song_no_select
     train_data = "eclipse/"
     # test_data = 'eclipse/song_no_select_summary_description/'
     data_dir = FLAGS.data_dir + train_data
     checkpointDir = FLAGS.checkpointDir
+    # one graph per model type and input shape for the whole sweep
+    runner = SweepRunner(
+        tf.ConfigProto(
+            allow_soft_placement=FLAGS.allow_soft_placement,
+            log_device_placement=FLAGS.log_device_placement),
+        max_to_keep=FLAGS.num_checkpoints)
     for train_index in train_indexes:
-        for model_type in model_types:
-            data_files = [data_dir +
-                          str(i) + '.csv' for i in range(train_index + 1)]
-            if not tf.gfile.Exists(data_dir + "results/"):
-                tf.gfile.MakeDirs(data_dir + "results/")
-            class_file = data_dir + "results/class_" +\
-                str(train_index) + ".csv"
-            x_train, y_train, x_dev, y_dev = data_utls.load_files(
-                data_files, validation=False)
+        # the data of a train index is shared by all model types
+        data_files = [data_dir +
+                      str(i) + '.csv' for i in range(train_index + 1)]
+        if not tf.gfile.Exists(data_dir + "results/"):
+            tf.gfile.MakeDirs(data_dir + "results/")
+        class_file = data_dir + "results/class_" +\
+            str(train_index) + ".csv"
+        # splits are read from the corpus store when it exists
+        x_train, y_train, x_dev, y_dev = data_utls.load_files(
+            data_files, validation=False,
+            store=corpus_store.open_store(data_dir + 'corpus/'))
 
-            features_names_selected = data_utls.features_selection(
-                x_train, y_train, FLAGS.features_selection, FLAGS.percentile)
-            x_train, y_train, x_dev, y_dev, document_length, embedding, lb =\
-                data_utls.transform_data_hand(
-                    x_train, y_train, x_dev, y_dev, class_file,
-                    features_names_selected,
-                    FLAGS.embedding_dim, embedding_file)
-            num_batches_per_epoch = int(
-                (18182 * (train_index + 1) - 1) / FLAGS.batch_size) + 1
-            decay_steps = int(num_batches_per_epoch *
-                              FLAGS.num_epochs * 0.1)
+        features_names_selected = data_utls.features_selection(
+            x_train, y_train, FLAGS.features_selection, FLAGS.percentile)
+        x_train, y_train, x_dev, y_dev, document_length, embedding, lb =\
+            data_utls.transform_data_hand(
+                x_train, y_train, x_dev, y_dev, class_file,
+                features_names_selected,
+                FLAGS.embedding_dim, embedding_file)
+        num_batches_per_epoch = int(
+            (18182 * (train_index + 1) - 1) / FLAGS.batch_size) + 1
+        decay_steps = int(num_batches_per_epoch *
+                          FLAGS.num_epochs * 0.1)
+        for model_type in model_types:
             config_model = {
                 'num_filters': FLAGS.num_filters,
                 'filter_sizes': list(map(int, FLAGS.filter_sizes.split(","))),
@@ -198,35 +227,38 @@ def main(_):
                 'train_phase': True,
                 'batch_size': FLAGS.batch_size,
                 'decay_steps': decay_steps,
-                'decay_rate': FLAGS.decay_rate
+                'decay_rate': FLAGS.decay_rate,
+                'input_pipeline': FLAGS.input_pipeline,
+                'sparse_labels': FLAGS.sparse_labels,
+                'softmax': FLAGS.softmax,
+                'num_sampled': FLAGS.num_sampled
             }
+            # size of the model before its graph is built
+            print("{}: {}".format(
+                model_type, architectures.info(model_type, config_model)))
             data_results = data_dir + "results/" + model_type + "/"
             FLAGS.checkpointDir = checkpointDir + model_type
             if not tf.gfile.Exists(data_results):
                 tf.gfile.MakeDirs(data_results)
             train(x_train, y_train, x_dev, y_dev,
                   lb, model_type, config_model,
-                  embedding, data_results, train_index)
+                  embedding, data_results, train_index, runner)
+    print(runner.report())
+    runner.close()
 
 
 def train(
         x_train, y_train, x_dev, y_dev,
         lb, model_type, config_model,
-        embedding, data_results, train_index):
-    tf.reset_default_graph()
-    with tf.Graph().as_default():
-        session_conf = tf.ConfigProto(
-            allow_soft_placement=FLAGS.allow_soft_placement,
-            log_device_placement=FLAGS.log_device_placement)
-
-        sess = tf.Session(config=session_conf)
+        embedding, data_results, train_index, runner):
+    # variables are initialized and the embedding loaded by the runner
+    cnn, sess, saver = runner.run(model_type, config_model, embedding)
+    x_train = runner.pad(x_train, cnn)
+    x_dev = runner.pad(x_dev, cnn)
+    with sess.graph.as_default():
         with sess.as_default():
-            cnn = Model(model_type=model_type, config_model=config_model)
             # Checkpoint directory. TensorFlow assumes this directory
             # already exists so we need to create it
-            saver = tf.train.Saver(
-                var_list=tf.trainable_variables(),
-                max_to_keep=FLAGS.num_checkpoints)
             checkpoint_dir = os.path.abspath(
                 os.path.join(FLAGS.checkpointDir, "checkpoints"))
             checkpoint_prefix = os.path.join(checkpoint_dir, "model")
@@ -234,38 +266,34 @@ def train(
                 print("Restoring Variables from Checkpoint")
                 saver.restore(sess,
                               tf.train.latest_checkpoint(checkpoint_dir))
-                if FLAGS.embedding_type == 'static':
-                    sess.run(tf.assign(cnn.embedding, embedding))
             else:
                 if tf.gfile.Exists(FLAGS.checkpointDir):
                     tf.gfile.DeleteRecursively(FLAGS.checkpointDir)
                     tf.gfile.MakeDirs(FLAGS.checkpointDir)
                 print("Creating Checkpoint file for restoring")
                 os.makedirs(checkpoint_dir)
-                # Initialize all variables
-                sess.run(tf.global_variables_initializer())
-                sess.run(tf.local_variables_initializer())
-                if FLAGS.embedding_type in ['static', 'non_static',
-                                            'multiple_channels']:
-                    sess.run(tf.assign(cnn.embedding, embedding))
-                    if FLAGS.embedding_type == 'multiple_channels':
-                        sess.run(tf.assign(cnn.another_embedding, embedding))
             train_summary_dir = os.path.abspath(
                 os.path.join(FLAGS.checkpointDir, "summaries", "train"))
             train_summary_writer = tf.summary.FileWriter(
                 train_summary_dir, sess.graph)
 
             # Generate batches
-            batches = data_utls.batch_generator(
-                x_train, y_train, lb,
-                FLAGS.batch_size, FLAGS.num_epochs,
-                shuffle=True)
+            if FLAGS.input_pipeline == 'dataset':
+                # batches are assembled and prefetched in the graph
+                num_steps = cnn.init_dataset(
+                    sess, x_train, data_utls.label_ids(lb, y_train),
+                    FLAGS.batch_size, FLAGS.num_epochs, shuffle=True)
+                batches = ((None, None, None) for _ in range(num_steps))
+            else:
+                batches = data_utls.batch_generator(
+                    x_train, y_train, lb,
+                    FLAGS.batch_size, FLAGS.num_epochs,
+                    shuffle=True, sparse=FLAGS.sparse_labels)
             # Training loop. For each batch...
-            best_accuracy = 0.0
+            best_accuracy = 0.0 if FLAGS.softmax == 'full' else -np.inf
             last_improvement_step = 0
             numer_iter = int((len(y_train) - 1) / FLAGS.batch_size) + 1
-            for batch, _ in batches:
-                x_batch, y_batch = zip(*batch)
+            for x_batch, y_batch, _ in batches:
                 accuracy = train_step(
                     cnn, train_summary_writer, sess, x_batch, y_batch)
                 current_step = tf.train.global_step(sess, cnn.global_step)
@@ -293,14 +321,14 @@ def train(
                 test_summary_dir, sess.graph)
             print("\n Testing:")
             dev_batches = data_utls.batch_generator(
-                x_dev, y_dev, lb, FLAGS.batch_size)
+                x_dev, y_dev, lb, FLAGS.batch_size,
+                sparse=FLAGS.sparse_labels)
             step = 0
             top_k_values = []
             top_k_indices = []
             labels = []
-            for dev_batch, label in dev_batches:
+            for x_dev_batch, y_dev_batch, label in dev_batches:
                 step += 1
-                x_dev_batch, y_dev_batch = zip(*dev_batch)
                 top_k_value, top_k_indice, loss, recall, precision = test_step(
                     cnn, sess, x_dev_batch, y_dev_batch, step,
                     writer=test_summary_writer)
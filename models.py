@@ -1,6 +1,7 @@
 # -*- code:utf-8 -*-
+import numpy as np
 import tensorflow as tf
-from functools import reduce
+import architectures
 
 
 class Model(object):
@@ -14,714 +15,45 @@ class Model(object):
 
         intit
         """
-        self.model_type = 'self._' + model_type + '()'
+        self.model_type = model_type
         self.config = config_model
+        # unknown model types fail before any op is created
+        build = architectures.get_builder(model_type)
 
         self.l2_loss = tf.constant(0.0)
         self.is_training = tf.placeholder(tf.bool, name="is_training")
 
         self.learning_rate = self.config['learning_rate']
 
-        with tf.name_scope('Embedding'):
-            self._embedding()
-
-        with tf.name_scope('Convolution'):
-            eval(self.model_type)
-
-        with tf.name_scope('Cost'):
-            self._cost()
-
-        with tf.name_scope('Train'):
-            self._train()
-
-        with tf.name_scope('Evalution'):
-            self._evaluation()
-
-        with tf.name_scope('Summaries'):
-            self._summary()
-
-    def _inception_dense_net1_transpose(self):
-        # 将通道位置放到最后一维，进行一维的inception式卷积
-        with tf.name_scope('Inception'):
-            # conv 1*100
-            strides = [1, 1, 1, 1]
-            embedding_shape = self.config['embedding_shape']
-            # input channels
-            num_outputs = embedding_shape[1]
-            input_embedded = tf.transpose(self.input_embedded, [0, 1, 3, 2])
-            with tf.name_scope('conv1'):
-                pad_input = input_embedded
-                # filter
-                num_in = num_outputs
-                num_filter = 2 ** 7
-                # filter size 1*1
-                filter_shape = [1, 1, num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                a = tf.nn.conv2d(
-                    pad_input,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a += b_filter
-            with tf.name_scope('conv3'):
-                paddings = tf.constant([[0, 0], [1, 1], [0, 0], [0, 0]])
-                pad_input = tf.pad(input_embedded, paddings, "CONSTANT")
-                num_in = num_outputs
-                num_filter = 2 ** 7
-                # filter size 1*1
-                filter_shape = [3, 1, num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                a3 = tf.nn.conv2d(
-                    pad_input,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a3 += b_filter
-            with tf.name_scope('conv5'):
-                paddings = tf.constant([[0, 0], [2, 2], [0, 0], [0, 0]])
-                pad_input = tf.pad(input_embedded, paddings, "CONSTANT")
-                num_in = num_outputs
-                num_filter = 2 ** 7
-                # filter size 1*1
-                filter_shape = [5, 1, num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                a5 = tf.nn.conv2d(
-                    pad_input,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a5 += b_filter
-            with tf.name_scope('conv7'):
-                paddings = tf.constant([[0, 0], [3, 3], [0, 0], [0, 0]])
-                pad_input = tf.pad(input_embedded, paddings, "CONSTANT")
-                num_in = num_outputs
-                num_filter = 2 ** 7
-                # filter size 1*1
-                filter_shape = [7, 1, num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                a7 = tf.nn.conv2d(
-                    pad_input,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a7 += b_filter
-            # max pooling
-            with tf.name_scope('max_pooling'):
-                paddings = tf.constant([[0, 0], [1, 1], [0, 0], [0, 0]])
-                pad_input = tf.pad(input_embedded, paddings, "CONSTANT")
-                max_pooling = tf.nn.max_pool(
-                    pad_input,
-                    ksize=[1, 3, 1, 1],
-                    strides=strides,
-                    padding='VALID')
-                num_in = num_outputs
-                num_filter = 2 ** 7
-                # filter size 1*1
-                filter_shape = [1, 1, num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                max_pooling = tf.nn.conv2d(
-                    max_pooling,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                max_pooling += b_filter
-            with tf.name_scope('concat'):
-                outputs = tf.concat(
-                    [a, a3, a5, a7, max_pooling],
-                    axis=-1)
-
-        with tf.name_scope("dropout"):
-            self.dropout_keep_prob = tf.placeholder(
-                tf.float32, name="keep_prob")
-
-        # 先拼接后最大池化
-        with tf.name_scope('flatten'):
-            outputs = tf.nn.max_pool(
-                outputs,
-                ksize=[1, outputs.shape[1].value, 1, 1],
-                strides=strides,
-                padding='VALID')
-            num_outputs = outputs.shape[-1].value
-            outputs = tf.reshape(
-                outputs,
-                [-1, num_outputs])
-            # Add dropout
-            self.h_drop = tf.nn.dropout(
-                outputs, self.dropout_keep_prob)
-
-        # Final (unnormalized) scores and predictions
-        with tf.name_scope("output"):
-            W = tf.get_variable(
-                "W",
-                shape=[num_outputs, self.config['num_classes']],
-                initializer=tf.contrib.layers.xavier_initializer())
-            b = tf.Variable(tf.constant(
-                0.1, shape=[self.config['num_classes']]), name="b")
-            self.logits = tf.nn.xw_plus_b(self.h_drop, W, b, name="scores")
-
-    def _dpcnn(self):
-            # 使用Tong Zhang的Deep Pyramid卷积模型
-
-            with tf.name_scope('Inception'):
-                # conv 1*100
-                strides = [1, 1, 1, 1]
-                embedding_shape = self.config['embedding_shape']
-                # input channels
-                num_outputs = 1 if not self.config['embedding_type'] ==\
-                    'multiple_channels' else 2
-                with tf.name_scope('conv1'):
-                    pad_input = self.input_embedded
-                    # filter
-                    num_in = num_outputs
-                    num_filter = 2 ** 7
-                    # filter size 1*1
-                    filter_shape = [1, embedding_shape[1], num_in, num_filter]
-                    # filter weights matrix
-                    W_filter = self._weight_variable(filter_shape)
-                    b_filter = self._bias_variable([num_filter])
-                    conv1 = tf.nn.conv2d(
-                        pad_input,
-                        W_filter,
-                        strides=strides,
-                        padding='VALID')
-                    a = tf.nn.relu(tf.nn.bias_add(conv1, b_filter))
-                with tf.name_scope('conv3'):
-                    paddings = tf.constant([[0, 0], [1, 1], [0, 0], [0, 0]])
-                    pad_input = tf.pad(
-                        self.input_embedded, paddings, "CONSTANT")
-                    num_in = num_outputs
-                    num_filter = 2 ** 7
-                    # filter size 1*1
-                    filter_shape = [3, embedding_shape[1], num_in, num_filter]
-                    # filter weights matrix
-                    W_filter = self._weight_variable(filter_shape)
-                    b_filter = self._bias_variable([num_filter])
-                    conv3 = tf.nn.conv2d(
-                        pad_input,
-                        W_filter,
-                        strides=strides,
-                        padding='VALID')
-                    a3 = tf.nn.relu(tf.nn.bias_add(conv3, b_filter))
-                with tf.name_scope('conv5'):
-                    paddings = tf.constant([[0, 0], [2, 2], [0, 0], [0, 0]])
-                    pad_input = tf.pad(
-                        self.input_embedded, paddings, "CONSTANT")
-                    num_in = num_outputs
-                    num_filter = 2 ** 7
-                    # filter size 1*1
-                    filter_shape = [5, embedding_shape[1], num_in, num_filter]
-                    # filter weights matrix
-                    W_filter = self._weight_variable(filter_shape)
-                    b_filter = self._bias_variable([num_filter])
-                    conv5 = tf.nn.conv2d(
-                        pad_input,
-                        W_filter,
-                        strides=strides,
-                        padding='VALID')
-                    a5 = tf.nn.relu(tf.nn.bias_add(conv5, b_filter))
-                with tf.name_scope('conv7'):
-                    paddings = tf.constant([[0, 0], [3, 3], [0, 0], [0, 0]])
-                    pad_input = tf.pad(
-                        self.input_embedded, paddings, "CONSTANT")
-                    num_in = num_outputs
-                    num_filter = 2 ** 7
-                    # filter size 1*1
-                    filter_shape = [7, embedding_shape[1], num_in, num_filter]
-                    # filter weights matrix
-                    W_filter = self._weight_variable(filter_shape)
-                    b_filter = self._bias_variable([num_filter])
-                    conv7 = tf.nn.conv2d(
-                        pad_input,
-                        W_filter,
-                        strides=strides,
-                        padding='VALID')
-                    a7 = tf.nn.relu(tf.nn.bias_add(conv7, b_filter))
-                # max pooling
-                with tf.name_scope('max_pooling'):
-                    paddings = tf.constant([[0, 0], [1, 1], [0, 0], [0, 0]])
-                    pad_input = tf.pad(
-                        self.input_embedded, paddings, "CONSTANT")
-                    pad_input = tf.transpose(pad_input, [0, 1, 3, 2])
-                    max_pooling = tf.nn.max_pool(
-                        pad_input,
-                        ksize=[1, 3, 1, 1],
-                        strides=strides,
-                        padding='VALID')
-                    num_in = embedding_shape[1]
-                    num_filter = 2 ** 7
-                    # filter size 1*1
-                    filter_shape = [1, 1, num_in, num_filter]
-                    # filter weights matrix
-                    W_filter = self._weight_variable(filter_shape)
-                    b_filter = self._bias_variable([num_filter])
-                    max_pooling = tf.nn.conv2d(
-                        max_pooling,
-                        W_filter,
-                        strides=strides,
-                        padding='VALID')
-                    max_pooling = tf.nn.relu(
-                        tf.nn.bias_add(max_pooling, b_filter))
-
-                with tf.name_scope('concat'):
-                    outputs = tf.concat(
-                        [a, a3, a5, a7, max_pooling],
-                        axis=-1)
-                    # short_path = outputs
-            # 拼接多个inception block
-            # outputs = self._inception(outputs, name='incepiton1')
-            # outputs += short_path
-
-            with tf.name_scope('flatten'):
-                outputs = tf.nn.max_pool(
-                    outputs,
-                    ksize=[1, outputs.shape[1].value, 1, 1],
-                    strides=strides,
-                    padding='VALID')
-                num_outputs = outputs.shape[-1].value
-                outputs = tf.reshape(
-                    outputs,
-                    [-1, num_outputs])
-            # Add dropout
-            with tf.name_scope("dropout"):
-                self.dropout_keep_prob = tf.placeholder(
-                    tf.float32, name="keep_prob")
-                self.h_drop = tf.nn.dropout(
-                    outputs, self.dropout_keep_prob)
-
-            # Final (unnormalized) scores and predictions
-            with tf.name_scope("output"):
-                W = tf.get_variable(
-                    "W",
-                    shape=[num_outputs, self.config['num_classes']],
-                    initializer=tf.contrib.layers.xavier_initializer())
-                b = tf.Variable(tf.constant(
-                    0.1, shape=[self.config['num_classes']]), name="b")
-                self.logits = tf.nn.xw_plus_b(self.h_drop, W, b, name="scores")
-
-    def _inception_dense_net(self):
-        # 使用Dense nete 模型
-        with tf.name_scope('Inception'):
-            # conv 1*100
-            strides = [1, 1, 1, 1]
-            embedding_shape = self.config['embedding_shape']
-            # input channels
-            num_outputs = 1 if not self.config['embedding_type'] ==\
-                'multiple_channels' else 2
-            with tf.name_scope('conv1'):
-                pad_input = self.input_embedded
-                # filter
-                num_in = num_outputs
-                num_filter = 2 ** 7
-                # filter size 1*1
-                filter_shape = [1, embedding_shape[1], num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                a = tf.nn.conv2d(
-                    pad_input,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a += b_filter
-            with tf.name_scope('conv3'):
-                paddings = tf.constant([[0, 0], [1, 1], [0, 0], [0, 0]])
-                pad_input = tf.pad(self.input_embedded, paddings, "CONSTANT")
-                num_in = num_outputs
-                num_filter = 2 ** 7
-                # filter size 1*1
-                filter_shape = [3, embedding_shape[1], num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                a3 = tf.nn.conv2d(
-                    pad_input,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a3 += b_filter
-            with tf.name_scope('conv5'):
-                paddings = tf.constant([[0, 0], [2, 2], [0, 0], [0, 0]])
-                pad_input = tf.pad(self.input_embedded, paddings, "CONSTANT")
-                num_in = num_outputs
-                num_filter = 2 ** 7
-                # filter size 1*1
-                filter_shape = [5, embedding_shape[1], num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                a5 = tf.nn.conv2d(
-                    pad_input,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a5 += b_filter
-            with tf.name_scope('conv7'):
-                paddings = tf.constant([[0, 0], [3, 3], [0, 0], [0, 0]])
-                pad_input = tf.pad(self.input_embedded, paddings, "CONSTANT")
-                num_in = num_outputs
-                num_filter = 2 ** 7
-                # filter size 1*1
-                filter_shape = [7, embedding_shape[1], num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                a7 = tf.nn.conv2d(
-                    pad_input,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a7 += b_filter
-            # max pooling
-            with tf.name_scope('max_pooling'):
-                paddings = tf.constant([[0, 0], [1, 1], [0, 0], [0, 0]])
-                pad_input = tf.pad(self.input_embedded, paddings, "CONSTANT")
-                pad_input = tf.transpose(pad_input, [0, 1, 3, 2])
-                max_pooling = tf.nn.max_pool(
-                    pad_input,
-                    ksize=[1, 3, 1, 1],
-                    strides=strides,
-                    padding='VALID')
-                num_in = embedding_shape[1]
-                num_filter = 2 ** 7
-                # filter size 1*1
-                filter_shape = [1, 1, num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                max_pooling = tf.nn.conv2d(
-                    max_pooling,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                max_pooling += b_filter
-            with tf.name_scope('concat'):
-                outputs = tf.concat(
-                    [a, a3, a5, a7, max_pooling],
-                    axis=-1)
-
-        with tf.name_scope("dropout"):
-            self.dropout_keep_prob = tf.placeholder(
-                tf.float32, name="keep_prob")
-
-        with tf.name_scope('inception_block'):
-            current = outputs
-            layers = 4
-            growth = 4
-            num_block = 1
-
-            for block in range(num_block):
-                with tf.name_scope('block' + str(block)):
-                    if block:
-                        current = self._transition(current)
-                    current = self._block_inception(
-                        current, layers, growth,
-                        self.is_training, self.dropout_keep_prob)
-
-        with tf.name_scope('flatten'):
-            outputs = tf.nn.max_pool(
-                current,
-                ksize=[1, current.shape[1].value, 1, 1],
-                strides=strides,
-                padding='VALID')
-            num_outputs = outputs.shape[-1].value
-            outputs = tf.reshape(
-                outputs,
-                [-1, num_outputs])
-            # Add dropout
-            self.h_drop = tf.nn.dropout(
-                outputs, self.dropout_keep_prob)
-
-        # Final (unnormalized) scores and predictions
-        with tf.name_scope("output"):
-            W = tf.get_variable(
-                "W",
-                shape=[num_outputs, self.config['num_classes']],
-                initializer=tf.contrib.layers.xavier_initializer())
-            b = tf.Variable(tf.constant(
-                0.1, shape=[self.config['num_classes']]), name="b")
-            self.logits = tf.nn.xw_plus_b(self.h_drop, W, b, name="scores")
-
-    def _inception_dense_net1(self):
-        # 仅使用 inception block结构
-        with tf.name_scope('Inception'):
-            # conv 1*100
-            strides = [1, 1, 1, 1]
-            embedding_shape = self.config['embedding_shape']
-            # input channels
-            num_outputs = 1 if not self.config['embedding_type'] ==\
-                'multiple_channels' else 2
-            with tf.name_scope('conv1'):
-                pad_input = self.input_embedded
-                # filter
-                num_in = num_outputs
-                num_filter = 2 ** 7
-                # filter size 1*1
-                filter_shape = [1, embedding_shape[1], num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                a = tf.nn.conv2d(
-                    pad_input,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a += b_filter
-            with tf.name_scope('conv3'):
-                paddings = tf.constant([[0, 0], [1, 1], [0, 0], [0, 0]])
-                pad_input = tf.pad(self.input_embedded, paddings, "CONSTANT")
-                num_in = num_outputs
-                num_filter = 2 ** 7
-                # filter size 1*1
-                filter_shape = [3, embedding_shape[1], num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                a3 = tf.nn.conv2d(
-                    pad_input,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a3 += b_filter
-            with tf.name_scope('conv5'):
-                paddings = tf.constant([[0, 0], [2, 2], [0, 0], [0, 0]])
-                pad_input = tf.pad(self.input_embedded, paddings, "CONSTANT")
-                num_in = num_outputs
-                num_filter = 2 ** 7
-                # filter size 1*1
-                filter_shape = [5, embedding_shape[1], num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                a5 = tf.nn.conv2d(
-                    pad_input,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a5 += b_filter
-            with tf.name_scope('conv7'):
-                paddings = tf.constant([[0, 0], [3, 3], [0, 0], [0, 0]])
-                pad_input = tf.pad(self.input_embedded, paddings, "CONSTANT")
-                num_in = num_outputs
-                num_filter = 2 ** 7
-                # filter size 1*1
-                filter_shape = [7, embedding_shape[1], num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                a7 = tf.nn.conv2d(
-                    pad_input,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a7 += b_filter
-            # max pooling
-            with tf.name_scope('max_pooling'):
-                paddings = tf.constant([[0, 0], [1, 1], [0, 0], [0, 0]])
-                pad_input = tf.pad(self.input_embedded, paddings, "CONSTANT")
-                pad_input = tf.transpose(pad_input, [0, 1, 3, 2])
-                max_pooling = tf.nn.max_pool(
-                    pad_input,
-                    ksize=[1, 3, 1, 1],
-                    strides=strides,
-                    padding='VALID')
-                num_in = embedding_shape[1]
-                num_filter = 2 ** 7
-                # filter size 1*1
-                filter_shape = [1, 1, num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                max_pooling = tf.nn.conv2d(
-                    max_pooling,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                max_pooling += b_filter
-            with tf.name_scope('concat'):
-                outputs = tf.concat(
-                    [a, a3, a5, a7, max_pooling],
-                    axis=-1)
-
-        with tf.name_scope("dropout"):
-            self.dropout_keep_prob = tf.placeholder(
-                tf.float32, name="keep_prob")
-
-        # with tf.name_scope('inception_block'):
-        #     current = outputs
-        #     layers = 1
-        #     growth = 2 ** 7
-        #     num_block = 1
-
-        #     for block in range(num_block):
-        #         current = self._block_inception(
-        #             current, layers, growth,
-        #             self.is_training, self.dropout_keep_prob,
-        #             'block_inception' + str(block))
-
-        with tf.name_scope('flatten'):
-            outputs = tf.nn.max_pool(
-                outputs,
-                ksize=[1, outputs.shape[1].value, 1, 1],
-                strides=strides,
-                padding='VALID')
-            num_outputs = outputs.shape[-1].value
-            outputs = tf.reshape(
-                outputs,
-                [-1, num_outputs])
-            # Add dropout
-            self.h_drop = tf.nn.dropout(
-                outputs, self.dropout_keep_prob)
-
-        # Final (unnormalized) scores and predictions
-        with tf.name_scope("output"):
-            W = tf.get_variable(
-                "W",
-                shape=[num_outputs, self.config['num_classes']],
-                initializer=tf.contrib.layers.xavier_initializer())
-            b = tf.Variable(tf.constant(
-                0.1, shape=[self.config['num_classes']]), name="b")
-            self.logits = tf.nn.xw_plus_b(self.h_drop, W, b, name="scores")
+        # 'feed_dict' or 'dataset'
+        self.input_pipeline = self.config.get('input_pipeline', 'feed_dict')
+        # int32 class ids instead of one-hot labels
+        self.sparse_labels = self.config.get('sparse_labels', False)
+        # 'full', or 'sampled' / 'nce' softmax in training steps
+        self.softmax = self.config.get('softmax', 'full')
+        if self.softmax not in ('full', 'sampled', 'nce'):
+            raise ValueError('unknown softmax %s' % self.softmax)
+        if self.input_pipeline == 'dataset':
+            with tf.name_scope('Input'):
+                self._dataset()
 
-    def _text_inception_dense(self):
-        # input channels
-        num_in = 1 if not self.config['embedding_type'] ==\
-            'multiple_channels' else 2
-
-        # conv 1*1
-        with tf.name_scope('Inception'):
-            strides = [1, 1, 1, 1]
-            embedding_shape = self.config['embedding_shape']
-            with tf.name_scope('conv1'):
-                # filter
-                num_in = 1
-                num_filter = 2 ** 4
-                # filter size 1*1
-                filter_shape = [1, embedding_shape[1], num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                conv1 = tf.nn.conv2d(
-                    self.input_embedded,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a = tf.nn.relu(tf.nn.bias_add(conv1, b_filter))
-            with tf.name_scope('conv3'):
-                num_filter = 2 ** 8
-                # filter size 1*1
-                filter_shape = [3, embedding_shape[1], num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                conv3 = tf.nn.conv2d(
-                    self.input_embedded,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a3 = tf.nn.relu(tf.nn.bias_add(conv3, b_filter))
-            with tf.name_scope('conv5'):
-                num_filter = 2 ** 8
-                # filter size 1*1
-                filter_shape = [5, embedding_shape[1], num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                conv5 = tf.nn.conv2d(
-                    self.input_embedded,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a5 = tf.nn.relu(tf.nn.bias_add(conv5, b_filter))
-            with tf.name_scope('conv7'):
-                num_filter = 2 ** 4
-                # filter size 1*1
-                filter_shape = [7, embedding_shape[1], num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                conv7 = tf.nn.conv2d(
-                    self.input_embedded,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a7 = tf.nn.relu(tf.nn.bias_add(conv7, b_filter))
-            # max pooling
-            with tf.name_scope('max_pooling'):
-                num = self.input_embedded.shape[1].value
-                a_max_pooling = tf.nn.max_pool(
-                    self.input_embedded,
-                    ksize=[1, num, 1, 1],
-                    strides=strides,
-                    padding='VALID')
+        with tf.name_scope('Embedding'):
+            self._embedding()
 
-            with tf.name_scope('concat'):
-                a = tf.nn.max_pool(
-                    a,
-                    ksize=[1, 7, 1, 1],
-                    strides=strides,
-                    padding='VALID')
-                a3 = tf.nn.max_pool(
-                    a3,
-                    ksize=[1, 5, 1, 1],
-                    strides=strides,
-                    padding='VALID')
-                a5 = tf.nn.max_pool(
-                    a5,
-                    ksize=[1, 3, 1, 1],
-                    strides=strides,
-                    padding='VALID')
-                a_concat = tf.concat([a, a3, a5, a7], axis=-1)
-                tmp = a_concat.shape[1].value
-                max_conv = tf.nn.max_pool(
-                    a_concat,
-                    ksize=[1, tmp, 1, 1],
-                    strides=strides,
-                    padding='VALID')
-                outputs = tf.concat(
-                    [tf.squeeze(max_conv, axis=[1, 2]),
-                     tf.squeeze(a_max_pooling, axis=[1, 3])],
-                    axis=-1)
-                num_outputs = outputs.shape[-1].value
+        with tf.name_scope('Convolution'):
+            build(self)
 
-        # Add dropout
-        with tf.name_scope("dropout"):
-            self.dropout_keep_prob = tf.placeholder(
-                tf.float32, name="keep_prob")
-            h_drop = tf.nn.dropout(
-                outputs, self.dropout_keep_prob)
+        with tf.name_scope('Cost'):
+            self._cost()
 
-        with tf.name_scope('pooling_block'):
-            features = num_outputs
-            current = h_drop
-            layers = 4
-            growth = 12
-            num_block = 1
+        with tf.name_scope('Train'):
+            self._train()
 
-            for block in range(num_block):
-                current, features = self._block_pooling(
-                    current, layers, features, growth,
-                    self.is_training, self.dropout_keep_prob,
-                    'block_pooling' + str(block))
+        with tf.name_scope('Evalution'):
+            self._evaluation()
 
-        # Final (unnormalized) scores and predictions
-        with tf.name_scope("output"):
-            W = tf.get_variable(
-                "W",
-                shape=[features, self.config['num_classes']],
-                initializer=tf.contrib.layers.xavier_initializer())
-            b = tf.Variable(tf.constant(
-                0.1, shape=[self.config['num_classes']]), name="b")
-            self.logits = tf.nn.xw_plus_b(current, W, b, name="scores")
+        with tf.name_scope('Summaries'):
+            self._summary()
 
     def _inception(self, outputs, name,
                    num_filter=2**7,
@@ -835,130 +167,62 @@ class Model(object):
                     axis=-1)
             return outputs
 
-    def _text_inception(self):
-        # inception module的尝试版
-        # input channels
-        num_in = 1 if not self.config['embedding_type'] ==\
-            'multiple_channels' else 2
-
-        # conv 1*1
-        with tf.name_scope('Inception'):
-            strides = [1, 1, 1, 1]
-            embedding_shape = self.config['embedding_shape']
-            with tf.name_scope('conv1'):
-                # filter
-                num_in = 1
-                num_filter = 2 ** 4
-                # filter size 1*1
-                filter_shape = [1, embedding_shape[1], num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                conv1 = tf.nn.conv2d(
-                    self.input_embedded,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a = tf.nn.relu(tf.nn.bias_add(conv1, b_filter))
-            with tf.name_scope('conv3'):
-                num_filter = 2 ** 8
-                # filter size 1*1
-                filter_shape = [3, embedding_shape[1], num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                conv3 = tf.nn.conv2d(
-                    self.input_embedded,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a3 = tf.nn.relu(tf.nn.bias_add(conv3, b_filter))
-            with tf.name_scope('conv5'):
-                num_filter = 2 ** 8
-                # filter size 1*1
-                filter_shape = [5, embedding_shape[1], num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                conv5 = tf.nn.conv2d(
-                    self.input_embedded,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a5 = tf.nn.relu(tf.nn.bias_add(conv5, b_filter))
-            with tf.name_scope('conv7'):
-                num_filter = 2 ** 4
-                # filter size 1*1
-                filter_shape = [7, embedding_shape[1], num_in, num_filter]
-                # filter weights matrix
-                W_filter = self._weight_variable(filter_shape)
-                b_filter = self._bias_variable([num_filter])
-                conv7 = tf.nn.conv2d(
-                    self.input_embedded,
-                    W_filter,
-                    strides=strides,
-                    padding='VALID')
-                a7 = tf.nn.relu(tf.nn.bias_add(conv7, b_filter))
-            # max pooling
-            with tf.name_scope('max_pooling'):
-                num = self.input_embedded.shape[1].value
-                a_max_pooling = tf.nn.max_pool(
-                    self.input_embedded,
-                    ksize=[1, num, 1, 1],
-                    strides=strides,
-                    padding='VALID')
-
-            with tf.name_scope('concat'):
-                a = tf.nn.max_pool(
-                    a,
-                    ksize=[1, 7, 1, 1],
-                    strides=strides,
-                    padding='VALID')
-                a3 = tf.nn.max_pool(
-                    a3,
-                    ksize=[1, 5, 1, 1],
-                    strides=strides,
-                    padding='VALID')
-                a5 = tf.nn.max_pool(
-                    a5,
-                    ksize=[1, 3, 1, 1],
-                    strides=strides,
-                    padding='VALID')
-                a_concat = tf.concat([a, a3, a5, a7], axis=-1)
-                tmp = a_concat.shape[1].value
-                max_conv = tf.nn.max_pool(
-                    a_concat,
-                    ksize=[1, tmp, 1, 1],
-                    strides=strides,
-                    padding='VALID')
-                outputs = tf.concat(
-                    [tf.squeeze(max_conv, axis=[1, 2]),
-                     tf.squeeze(a_max_pooling, axis=[1, 3])],
-                    axis=-1)
-                num_outputs = outputs.shape[-1].value
-
-        # Add dropout
-        with tf.name_scope("dropout"):
-            self.dropout_keep_prob = tf.placeholder(
-                tf.float32, name="keep_prob")
-            self.h_drop = tf.nn.dropout(
-                outputs, self.dropout_keep_prob)
+    def _dataset(self):
+        # in-graph batches over the id matrix and the label ids,
+        # the data is fed once per run to the iterator initializer
+        self.data_x = tf.placeholder(
+            tf.int32, [None, self.config['max_sent_length']], name='data_x')
+        self.data_y = tf.placeholder(tf.int32, [None], name='data_y')
+        self.data_batch_size = tf.placeholder(
+            tf.int64, [], name='data_batch_size')
+        self.data_num_epochs = tf.placeholder_with_default(
+            tf.constant(1, tf.int64), [], name='data_num_epochs')
+        # 1 keeps the order
+        self.data_shuffle_buffer = tf.placeholder_with_default(
+            tf.constant(1, tf.int64), [], name='data_shuffle_buffer')
+        num_classes = self.config['num_classes']
 
-        # Final (unnormalized) scores and predictions
-        with tf.name_scope("output"):
-            W = tf.get_variable(
-                "W",
-                shape=[num_outputs, self.config['num_classes']],
-                initializer=tf.contrib.layers.xavier_initializer())
-            b = tf.Variable(tf.constant(
-                0.1, shape=[self.config['num_classes']]), name="b")
-            self.logits = tf.nn.xw_plus_b(self.h_drop, W, b, name="scores")
+        def one_hot(x, y):
+            # unknown labels (-1) become all zero rows
+            return x, tf.one_hot(y, num_classes, dtype=tf.int64)
+
+        dataset = tf.data.Dataset.from_tensor_slices(
+            (self.data_x, self.data_y))
+        dataset = dataset.shuffle(self.data_shuffle_buffer)
+        dataset = dataset.repeat(self.data_num_epochs)
+        dataset = dataset.batch(self.data_batch_size)
+        if not self.sparse_labels:
+            dataset = dataset.map(
+                one_hot,
+                num_parallel_calls=self.config.get('num_parallel_calls', 4))
+        dataset = dataset.prefetch(self.config.get('prefetch_batches', 2))
+        self.data_iterator = dataset.make_initializable_iterator()
+        self.next_x, self.next_y = self.data_iterator.get_next()
+
+    def init_dataset(self, sess, x, y_ids, batch_size, num_epochs=1,
+                     shuffle=False):
+        # (re)start the input pipeline, returns the number of batches
+        feed_dict = {
+            self.data_x: x,
+            self.data_y: y_ids,
+            self.data_batch_size: batch_size,
+            self.data_num_epochs: num_epochs,
+            self.data_shuffle_buffer: len(x) if shuffle else 1
+        }
+        sess.run(self.data_iterator.initializer, feed_dict)
+        return int((len(x) * num_epochs - 1) / batch_size) + 1
 
     def _embedding(self):
-        self.input_x = tf.placeholder(
-            dtype=tf.int32,
-            shape=[None, self.config['max_sent_length']],
-            name='input_x')
+        if self.input_pipeline == 'dataset':
+            # fed batches still override the pipeline
+            self.input_x = tf.placeholder_with_default(
+                self.next_x, [None, self.config['max_sent_length']],
+                name='input_x')
+        else:
+            self.input_x = tf.placeholder(
+                dtype=tf.int32,
+                shape=[None, self.config['max_sent_length']],
+                name='input_x')
         with tf.device('/cpu:0'):
             if not self.config['embedding_type'] == 'multiple_channels':
                 if self.config['embedding_type'] == 'static':
@@ -1004,548 +268,20 @@ class Model(object):
                 another_expaned_embedded = tf.expand_dims(another_embedded, -1)
                 self.input_embedded = tf.concat(
                     [expaned_embedded, another_expaned_embedded], 3)
-
-    def _text_dense(self):
-        # block_pooling = bn+relu+fc
-
-        # Create a convolution + maxpool layer for each filter size
-        pooled_outputs = []
-        num_in = 1 if not self.config['embedding_type'] ==\
-            'multiple_channels' else 2
-        # normed_input = self._batch_norm_layer(
-        #     self.input_embedded, self.is_training, 'embedded_input')
-        for i, filter_size in enumerate(self.config['filter_sizes']):
-            with tf.name_scope("conv-maxpool-%s" % filter_size):
-                # Convolution Layer
-                filter_shape = [filter_size,
-                                self.config['embedding_shape'][1],
-                                num_in, self.config['num_filters']]
-                W = tf.Variable(tf.truncated_normal(
-                    filter_shape, stddev=0.1), name="W")
-                b = tf.Variable(tf.constant(
-                    0.1, shape=[self.config['num_filters']]), name="b")
-                conv = tf.nn.conv2d(
-                    self.input_embedded,
-                    W,
-                    strides=[1, 1, 1, 1],
-                    padding="VALID",
-                    name="conv")
-                # Apply nonlinearity
-                h = tf.nn.relu(tf.nn.bias_add(conv, b), name="relu")
-                # Maxpooling over the outputs
-                pooled = tf.nn.max_pool(
-                    h,
-                    ksize=[1, self.config['max_sent_length'] -
-                           filter_size + 1, 1, 1],
-                    strides=[1, 1, 1, 1],
-                    padding='VALID',
-                    name="pool")
-                pooled_outputs.append(pooled)
-
-        # Combine all the pooled features
-        h = tf.concat(pooled_outputs, axis=-1)
-        num_filters_total = h.get_shape().as_list()[-1]
-        current = tf.reshape(h, [-1, num_filters_total])
-        self.dropout_keep_prob = tf.placeholder(
-            tf.float32, name="dropout_keep_prob")
-        current = tf.nn.dropout(current, self.dropout_keep_prob)
-        with tf.name_scope('pooling_block'):
-            features = num_filters_total
-            layers = 4
-            growth = 12
-            num_block = 2
-
-            for block in range(num_block):
-                current, features = self._block_pooling(
-                    current, layers, features, growth,
-                    self.is_training, self.dropout_keep_prob,
-                    'block_pooling' + str(block))
-
-        with tf.name_scope("output"):
-            W = tf.get_variable(
-                "W",
-                shape=[features, self.config['num_classes']],
-                initializer=tf.contrib.layers.xavier_initializer())
-            b = tf.Variable(tf.constant(
-                0.1, shape=[self.config['num_classes']]), name="b")
-            self.logits = tf.nn.xw_plus_b(
-                current, W, b, name="scores")
-
-    def _text_conv_dense(self):
-        """
-        conv_dense = bn + relu + conv2d
-        classifical dense nets
-        """
-        with tf.name_scope('conv1'):
-            num_in = 1 if not self.config['embedding_type'] ==\
-                'multiple_channels' else 2
-            with tf.name_scope('conv'):
-                W = self._weight_variable(
-                    shape=[1, self.config['embedding_shape'][1],
-                           num_in, self.config['num_filters'] * 3])
-                conv1 = tf.nn.conv2d(
-                    self.input_embedded, W, [1, 1, 1, 1], padding='VALID')
-        with tf.name_scope('block_conv'):
-            current = conv1
-
-            features = self.config['num_filters'] * 3
-            layers = 1
-            growth = 12
-            num_block = 1
-            self.dropout_keep_prob = tf.placeholder(
-                tf.float32, name="dropout_keep_prob")
-            for block in range(num_block - 1):
-                current, features = self._block_conv(
-                    current, layers, features, growth,
-                    self.is_training, self.dropout_keep_prob,
-                    'block_conv' + str(block))
-                current = self._batch_activ_conv(
-                    current, features,
-                    features, 1,
-                    self.is_training, self.dropout_keep_prob,
-                    'block_conv_transition' + str(block))
-                current = self._avg_pool(current, 2)
-            current, features = self._block_conv(
-                current, layers, features, growth,
-                self.is_training, self.dropout_keep_prob,
-                'block_conv_end')
-            current = self._batch_activ_conv(
-                current, features,
-                features, 1, self.is_training,
-                self.dropout_keep_prob,
-                'block_conv_transition_end')
-            final_dim = features * current.get_shape().as_list()[1]
-            current = self._avg_pool(current, current.get_shape().as_list()[1])
-        with tf.name_scope("output"):
-            final_dim = features
-            current = tf.reshape(current, [-1, final_dim])
-            W = tf.get_variable(
-                "W",
-                shape=[final_dim, self.config['num_classes']],
-                initializer=tf.contrib.layers.xavier_initializer())
-            b = tf.Variable(tf.constant(
-                0.1, shape=[self.config['num_classes']]), name="b")
-            self.l2_loss += tf.nn.l2_loss(W)
-            self.l2_loss += tf.nn.l2_loss(b)
-            self.logits = tf.nn.xw_plus_b(current, W, b, name="scores")
-
-    def _text_cnn_lstm(self):
-        """
-
-
-        经典CNN+LSTM
-        """
-        filter_sizes = self.config['filter_sizes']
-        embedding_size = self.config['embedding_shape'][1]
-        num_filters = self.config['num_filters']
-        num_classes = self.config['num_classes']
-        # Create a convolution + maxpool layer for each filter size
-        pooled_outputs = []
-        for i, filter_size in enumerate(filter_sizes):
-            with tf.name_scope("conv-maxpool-L%s" % filter_size):
-                # Convolution Layer
-                filter_shape = [filter_size, embedding_size, 1, num_filters]
-                W = tf.Variable(tf.truncated_normal(
-                    filter_shape, stddev=0.1), name="W")
-                b = tf.Variable(tf.constant(
-                    0.1, shape=[num_filters]), name="b")
-                conv = tf.nn.conv2d(
-                    self.input_embedded,
-                    W,
-                    strides=[1, 1, 1, 1],
-                    padding="VALID",
-                    name="conv")
-                pooled_outputs.append(conv)
-        num_features = pooled_outputs[-1].get_shape().as_list()[1]
-        num_channels = len(pooled_outputs)
-        with tf.name_scope("LSTM"):
-            input_x = [tf.squeeze(x, 2) for x in pooled_outputs]
-            input_x = reduce(lambda x, y: tf.concat(
-                [x[:, :num_features, :],
-                 y[:, :num_features, :]], axis=-1), input_x)
-            input_x = tf.unstack(input_x, axis=2)
-            lstm = tf.contrib.rnn.BasicLSTMCell(num_filters * num_channels)
-            outputs, states = tf.contrib.rnn.static_rnn(
-                lstm, input_x, dtype=tf.float32)
-            self.lstm_out = outputs[-1]
-        # Add dropout
-        with tf.name_scope("dropout"):
-            self.dropout_keep_prob = tf.placeholder(
-                tf.float32, name="dropout_keep_prob")
-            self.h_drop = tf.nn.dropout(
-                self.lstm_out, self.dropout_keep_prob)
-
-        # Final (unnormalized) scores and predictions
-        with tf.name_scope("output"):
-            W = tf.get_variable(
-                "W",
-                shape=[num_filters * num_channels, num_classes],
-                initializer=tf.contrib.layers.xavier_initializer())
-            b = tf.Variable(tf.constant(0.1, shape=[num_classes]), name="b")
-            self.l2_loss += tf.nn.l2_loss(W)
-            self.l2_loss += tf.nn.l2_loss(b)
-            self.logits = tf.nn.xw_plus_b(self.h_drop, W, b, name="scores")
-
-    def _text_bilstm(self):
-        """
-
-        经典BiLSTM
-        """
-        n_hidden = self.config['n_hidden']
-        num_classes = self.config['num_classes']
-        batch_size = self.config['batch_size']
-        with tf.name_scope("LSTM"):
-            self.dropout_keep_prob = tf.placeholder(
-                tf.float32, name="dropout_keep_prob")
-            input_x = tf.squeeze(self.input_embedded, -1)
-            lstm_fw = tf.contrib.rnn.BasicLSTMCell(n_hidden)
-            lstm_bw = tf.contrib.rnn.BasicLSTMCell(n_hidden)
-            lstm_fw_init = lstm_fw.zero_state(batch_size, tf.float32)
-            lstm_bw_init = lstm_bw.zero_state(batch_size, tf.float32)
-            lstm_fw_drop = tf.contrib.rnn.DropoutWrapper(
-                lstm_fw, output_keep_prob=self.dropout_keep_prob)
-            lstm_bw_drop = tf.contrib.rnn.DropoutWrapper(
-                lstm_bw, output_keep_prob=self.dropout_keep_prob)
-            outputs, _ = tf.nn.bidirectional_dynamic_rnn(
-                lstm_fw_drop, lstm_bw_drop,
-                input_x, dtype=tf.float32,
-                initial_state_fw=lstm_fw_init,
-                initial_state_bw=lstm_bw_init)
-            outputs = tf.concat(outputs, axis=-1)
-            # lstm_output = self._attention(outputs)
-            lstm_output = tf.squeeze(outputs[:, -1, :])
-            # lstm_max = tf.squeeze(tf.reduce_max(outputs, axis=-2))
-            # lstm_output = tf.concat([lstm_last, lstm_max], axis=-1)
-
-        # Final (unnormalized) scores and predictions
-        with tf.name_scope("output"):
-            n_in = lstm_output.shape[-1].value
-            W = tf.get_variable(
-                "W",
-                shape=[n_in, num_classes],
-                initializer=tf.contrib.layers.xavier_initializer())
-            b = tf.Variable(tf.constant(0.1, shape=[num_classes]), name="b")
-            self.logits = tf.nn.xw_plus_b(lstm_output, W, b, name="scores")
-
-    def _textlstm(self):
-        """
-
-
-        经典BasicLSTM
-        """
-        n_hidden = self.config['n_hidden']
-        num_classes = self.config['num_classes']
-        batch_size = self.config['batch_size']
-        with tf.name_scope("LSTM"):
-            self.dropout_keep_prob = tf.placeholder(
-                tf.float32, name="dropout_keep_prob")
-            input_x = tf.squeeze(self.input_embedded, -1)
-            lstm = tf.contrib.rnn.BasicLSTMCell(n_hidden)
-            lstm_init = lstm.zero_state(batch_size, tf.float32)
-            lstm_drop = tf.contrib.rnn.DropoutWrapper(
-                lstm, output_keep_prob=self.dropout_keep_prob)
-            outputs, _ = tf.nn.dynamic_rnn(
-                lstm_drop, input_x, dtype=tf.float32,
-                initial_state=lstm_init)
-            # lstm_output = tf.squeeze(outputs[:, -1, :])
-            lstm_output = tf.squeeze(tf.reduce_max(outputs, axis=-1))
-            # lstm_output = tf.concat([lstm_last, lstm_max], axis=-1)
-
-        # Final (unnormalized) scores and predictions
-        with tf.name_scope("output"):
-            n_in = lstm_output.shape[-1].value
-            W = tf.get_variable(
-                "W",
-                shape=[n_in, num_classes],
-                initializer=tf.contrib.layers.xavier_initializer())
-            b = tf.Variable(tf.constant(0.1, shape=[num_classes]), name="b")
-            self.logits = tf.nn.xw_plus_b(lstm_output, W, b, name="scores")
-
-    def _text_dp_cnn(self):
-        # 多层CNN结构
-        with tf.name_scope('conv1'):
-            num_in = 1 if not self.config['embedding_type'] ==\
-                'multiple_channels' else 2
-            with tf.name_scope('conv'):
-                W = self._weight_variable(
-                    shape=[1, self.config['embedding_shape'][1],
-                           num_in, self.config['num_filters'] * 3])
-                conv1 = tf.nn.conv2d(
-                    self.input_embedded, W, [1, 1, 1, 1], padding='VALID')
-        self.dropout_keep_prob = tf.placeholder(
-            tf.float32, name="dropout_keep_prob")
-        with tf.name_scope('dp'):
-            features = self.config['num_filters'] * 3
-            current = conv1
-            layers = 2
-            blocks = 5
-            for block in range(blocks):
-                current = self._block_dp(
-                    current, layers,
-                    features, features, self.is_training,
-                    self.dropout_keep_prob, str(block))
-                current = self._avg_pool(current, 2)
-
-        final_dim = features * current.get_shape().as_list()[1]
-        current = self._avg_pool(current, current.get_shape().as_list()[1])
-        with tf.name_scope("output"):
-            final_dim = features
-            current = tf.reshape(current, [-1, final_dim])
-            W = tf.get_variable(
-                "W",
-                shape=[final_dim, self.config['num_classes']],
-                initializer=tf.contrib.layers.xavier_initializer())
-            b = tf.Variable(tf.constant(
-                0.1, shape=[self.config['num_classes']]), name="b")
-            self.l2_loss += tf.nn.l2_loss(W)
-            self.l2_loss += tf.nn.l2_loss(b)
-            self.logits = tf.nn.xw_plus_b(current, W, b, name="scores")
-
-    def _hierarchical_cnn(self):
-        """
-
-
-        多层cnn结构，每层加pool层进行输出
-        """
-        with tf.name_scope("m-conv"):
-
-            filter_size = self.config['filter_sizes'][0]
-            num_filters = self.config['num_filters']
-            embedding_size = self.config['embedding_shape'][1]
-            num_classes = self.config['num_classes']
-            # Convolution Layer
-            filter_shape = [filter_size, embedding_size, 1, num_filters]
-            W = tf.Variable(tf.truncated_normal(
-                filter_shape, stddev=0.1), name="W")
-            b = tf.Variable(tf.constant(
-                0.1, shape=[num_filters]), name="b")
-            conv = tf.nn.conv2d(
-                self.input_embedded,
-                W,
-                strides=[1, 1, 1, 1],
-                padding="VALID",
-                name="conv")
-            # Apply nonlinearity
-            h = tf.nn.relu(tf.nn.bias_add(conv, b), name="relu")
-            pool1 = tf.nn.max_pool(
-                h,
-                ksize=[1, h.get_shape().as_list()[1], 1, 1],
-                strides=[1, 1, 1, 1],
-                padding='VALID',
-                name="pool")
-            filter_shape = [filter_size, 1, num_filters, num_filters]
-            W = tf.Variable(tf.truncated_normal(
-                filter_shape, stddev=0.1), name="W")
-            b = tf.Variable(tf.constant(
-                0.1, shape=[num_filters]), name="b")
-            conv = tf.nn.conv2d(
-                conv,
-                W,
-                strides=[1, 1, 1, 1],
-                padding="VALID",
-                name="conv")
-            # Apply nonlinearity
-            h = tf.nn.relu(tf.nn.bias_add(conv, b), name="relu")
-            pool2 = tf.nn.max_pool(
-                h,
-                ksize=[1, h.get_shape().as_list()[1], 1, 1],
-                strides=[1, 1, 1, 1],
-                padding='VALID',
-                name="pool")
-            filter_shape = [filter_size, 1, num_filters, num_filters]
-            W = tf.Variable(tf.truncated_normal(
-                filter_shape, stddev=0.1), name="W")
-            b = tf.Variable(tf.constant(
-                0.1, shape=[num_filters]), name="b")
-            conv = tf.nn.conv2d(
-                conv,
-                W,
-                strides=[1, 1, 1, 1],
-                padding="VALID",
-                name="conv")
-            # Apply nonlinearity
-            h = tf.nn.relu(tf.nn.bias_add(conv, b), name="relu")
-            # Maxpooling over the outputs
-            pool3 = tf.nn.max_pool(
-                h,
-                ksize=[1, h.get_shape().as_list()[1], 1, 1],
-                strides=[1, 1, 1, 1],
-                padding='VALID',
-                name="pool")
-            pooled_outputs = [pool1, pool2, pool3]
-            pool = tf.concat(pooled_outputs, 3)
-            self.h_pool = tf.reshape(pool, [-1, num_filters * 3])
-
-        # Add dropout
-        with tf.name_scope("dropout"):
-            self.dropout_keep_prob = tf.placeholder(
-                tf.float32, name="dropout_keep_prob")
-            self.h_drop = tf.nn.dropout(
-                self.h_pool, self.dropout_keep_prob)
-
-        # Final (unnormalized) scores and predictions
-        with tf.name_scope("output"):
-            W = tf.get_variable(
-                "W",
-                shape=[num_filters * 3, num_classes],
-                initializer=tf.contrib.layers.xavier_initializer())
-            b = tf.Variable(tf.constant(0.1, shape=[num_classes]), name="b")
-            self.l2_loss += tf.nn.l2_loss(W)
-            self.l2_loss += tf.nn.l2_loss(b)
-            self.logits = tf.nn.xw_plus_b(self.h_drop, W, b, name="scores")
-
-    def _multi_layers_cnn(self):
-        """
-
-        三层CNN叠加模型
-        """
-        filter_size = self.config['filter_sizes'][-1]
-        filter_shape = [filter_size, self.config['embedding_shape']
-                        [1], 1, self.config['num_filters'] * 3]
-        W = tf.Variable(tf.truncated_normal(
-            filter_shape, stddev=0.1), name="W")
-        b = tf.Variable(tf.constant(
-            0.1, shape=[self.config['num_filters'] * 3]), name="b")
-        conv = tf.nn.conv2d(
-            self.input_embedded,
-            W,
-            strides=[1, 1, 1, 1],
-            padding="VALID",
-            name="conv")
-        # Apply nonlinearity
-        h = tf.nn.relu(tf.nn.bias_add(conv, b), name="relu")
-        filter_shape = [filter_size, 1,
-                        self.config['num_filters'] * 3,
-                        self.config['num_filters'] * 6]
-        W = tf.Variable(tf.truncated_normal(
-            filter_shape, stddev=0.1), name="W")
-        b = tf.Variable(tf.constant(
-            0.1, shape=[self.config['num_filters'] * 6]), name="b")
-        conv = tf.nn.conv2d(
-            conv,
-            W,
-            strides=[1, 1, 1, 1],
-            padding="VALID",
-            name="conv")
-        # Apply nonlinearity
-        h = tf.nn.relu(tf.nn.bias_add(conv, b), name="relu")
-        filter_shape = [filter_size, 1,
-                        self.config['num_filters'] * 6,
-                        self.config['num_filters'] * 9]
-        W = tf.Variable(tf.truncated_normal(
-            filter_shape, stddev=0.1), name="W")
-        b = tf.Variable(tf.constant(
-            0.1, shape=[self.config['num_filters'] * 9]), name="b")
-        conv = tf.nn.conv2d(
-            conv,
-            W,
-            strides=[1, 1, 1, 1],
-            padding="VALID",
-            name="conv")
-        # Apply nonlinearity
-        h = tf.nn.relu(tf.nn.bias_add(conv, b), name="relu")
-        filter_shape = [h.shape[1].value, 1,
-                        self.config['num_filters'] * 9,
-                        self.config['num_filters'] * 9]
-        W = tf.Variable(tf.truncated_normal(
-            filter_shape, stddev=0.1), name="W")
-        b = tf.Variable(tf.constant(
-            0.1, shape=[self.config['num_filters'] * 9]), name="b")
-        conv = tf.nn.conv2d(
-            conv,
-            W,
-            strides=[1, 1, 1, 1],
-            padding="VALID",
-            name="conv")
-        # Apply nonlinearity
-        h = tf.nn.relu(tf.nn.bias_add(conv, b), name="relu")
-        # # Maxpooling over the outputs
-        # pooled = tf.nn.max_pool(
-        #     h,
-        #     ksize=[1, h.get_shape().as_list()[1], 1, 1],
-        #     strides=[1, 1, 1, 1],
-        #     padding='VALID',
-        #     name="pool")
-        # self.h_pool = tf.reshape(
-        # pooled, [-1, self.config['num_filters'] * 9])
-        h = tf.squeeze(h)
-        # Add dropout
-        with tf.name_scope("dropout"):
-            self.dropout_keep_prob = tf.placeholder(
-                tf.float32, name="dropout_keep_prob")
-            self.h_drop = tf.nn.dropout(
-                h, self.dropout_keep_prob)
-
-        # Final (unnormalized) scores and predictions
-        with tf.name_scope("output"):
-            W = tf.get_variable(
-                "W",
-                shape=[self.config['num_filters'] * 9,
-                       self.config['num_classes']],
-                initializer=tf.contrib.layers.xavier_initializer())
-            b = tf.Variable(tf.constant(
-                0.1, shape=[self.config['num_classes']]), name="b")
-            self.l2_loss += tf.nn.l2_loss(W)
-            self.l2_loss += tf.nn.l2_loss(b)
-            self.logits = tf.nn.xw_plus_b(self.h_drop, W, b, name="scores")
-
-    def _textcnn(self):
-        # Create a convolution + maxpool layer for each filter size
-        pooled_outputs = []
-        num_in = 1 if not self.config['embedding_type'] ==\
-            'multiple_channels' else 2
-        # normed_input = self._batch_norm_layer(
-        #     self.input_embedded, self.is_training, 'bn_embedding')
-        for i, filter_size in enumerate(self.config['filter_sizes']):
-            with tf.name_scope("conv-maxpool-%s" % filter_size):
-                # Convolution Layer
-                filter_shape = [filter_size,
-                                self.config['embedding_shape'][1],
-                                num_in, self.config['num_filters']]
-                W = tf.Variable(tf.truncated_normal(
-                    filter_shape, stddev=0.1), name="W")
-                b = tf.Variable(tf.constant(
-                    0.1, shape=[self.config['num_filters']]), name="b")
-                conv = tf.nn.conv2d(
-                    self.input_embedded,
-                    W,
-                    strides=[1, 1, 1, 1],
-                    padding="VALID",
-                    name="conv")
-                # Apply nonlinearity
-                h = tf.nn.relu(tf.nn.bias_add(conv, b), name="relu")
-                # Maxpooling over the outputs
-                pooled = tf.nn.max_pool(
-                    h,
-                    ksize=[1, self.config['max_sent_length'] -
-                           filter_size + 1, 1, 1],
-                    strides=[1, 1, 1, 1],
-                    padding='VALID',
-                    name="pool")
-                pooled_outputs.append(pooled)
-
-        # Combine all the pooled features
-        num_filters_total = self.config['num_filters'] *\
-            len(self.config['filter_sizes'])
-        self.h_pool = tf.concat(pooled_outputs, 3)
-        self.h_pool_flat = tf.reshape(self.h_pool, [-1, num_filters_total])
-
-        # Add dropout
-        with tf.name_scope("dropout"):
-            self.dropout_keep_prob = tf.placeholder(
-                tf.float32, name="dropout_keep_prob")
-            self.h_drop = tf.nn.dropout(
-                self.h_pool_flat, self.dropout_keep_prob)
-
-        # Final (unnormalized) scores and predictions
-        with tf.name_scope("output"):
-            W = tf.get_variable(
-                "W",
-                shape=[num_filters_total, self.config['num_classes']],
-                initializer=tf.contrib.layers.xavier_initializer())
-            b = tf.Variable(tf.constant(
-                0.1, shape=[self.config['num_classes']]), name="b")
-            self.logits = tf.nn.xw_plus_b(self.h_drop, W, b, name="scores")
+        # pretrained vectors are fed, not stored as graph constants
+        self.embedding_value = tf.placeholder(
+            tf.float32, [None, self.config['embedding_shape'][1]],
+            name='embedding_value')
+        self.embedding_init = [tf.assign(self.embedding, self.embedding_value)]
+        if self.config['embedding_type'] == 'multiple_channels':
+            self.embedding_init.append(
+                tf.assign(self.another_embedding, self.embedding_value))
+
+    def load_embedding(self, sess, embedding):
+        # rows past len(embedding), spare capacity of the variable, are zero
+        value = np.zeros(self.config['embedding_shape'], dtype=np.float32)
+        value[:len(embedding)] = embedding
+        sess.run(self.embedding_init, {self.embedding_value: value})
 
     def _down_sampling(self, outputs, name):
         # 降采样函数
@@ -1740,16 +476,107 @@ class Model(object):
                 x, mean, var, beta, gamma, 1e-3)
         return normed
 
+    def _output(self, features, num_in, l2_loss=False):
+        # Final (unnormalized) scores and predictions,
+        # the output projection shared by every architecture
+        with tf.name_scope("output"):
+            # one row per class, sampled softmax and nce gather the rows
+            # of the sampled classes and update only those
+            W = tf.get_variable(
+                "W",
+                shape=[self.config['num_classes'], num_in],
+                initializer=tf.contrib.layers.xavier_initializer())
+            b = tf.Variable(tf.constant(
+                0.1, shape=[self.config['num_classes']]), name="b")
+            if l2_loss:
+                self.l2_loss += tf.nn.l2_loss(W)
+                self.l2_loss += tf.nn.l2_loss(b)
+            self.features = features
+            self.output_W = W
+            self.output_b = b
+            # only computed when fetched: evaluation, and the training
+            # steps of the full softmax
+            self.logits = self._full_logits(name="scores")
+
+    def _full_logits(self, name=None):
+        return tf.nn.bias_add(
+            tf.matmul(self.features, self.output_W, transpose_b=True),
+            self.output_b, name=name)
+
+    def _sampled_losses(self, labels):
+        # sampled softmax or nce over the output projection,
+        # the full softmax is left to evaluation
+        num_classes = self.config['num_classes']
+        num_sampled = min(self.config.get('num_sampled', 512), num_classes)
+        labels = tf.reshape(tf.cast(labels, tf.int64), [-1, 1])
+        if self.softmax == 'nce':
+            return tf.nn.nce_loss(
+                weights=self.output_W,
+                biases=self.output_b,
+                labels=labels,
+                inputs=self.features,
+                num_sampled=num_sampled,
+                num_classes=num_classes)
+        return tf.nn.sampled_softmax_loss(
+            weights=self.output_W,
+            biases=self.output_b,
+            labels=labels,
+            inputs=self.features,
+            num_sampled=num_sampled,
+            num_classes=num_classes)
+
     def _cost(self):
-        self.input_y = tf.placeholder(
-            tf.int64, [None, self.config['num_classes']], name="input_y")
-        losses = tf.nn.softmax_cross_entropy_with_logits(
-            logits=self.logits, labels=self.input_y)
-        l2_loss = tf.add_n(
-            [tf.nn.l2_loss(v) for v in tf.trainable_variables()
-             if 'bias' not in v.name])
-        self.cost = tf.reduce_mean(losses) +\
-            self.config['l2_reg_lambda'] * l2_loss
+        if self.sparse_labels:
+            # class ids, -1 for labels unknown to the model
+            y_shape = [None]
+            y_dtype = tf.int32
+        else:
+            y_shape = [None, self.config['num_classes']]
+            y_dtype = tf.int64
+        if self.input_pipeline == 'dataset':
+            self.input_y = tf.placeholder_with_default(
+                self.next_y, y_shape, name="input_y")
+        else:
+            self.input_y = tf.placeholder(y_dtype, y_shape, name="input_y")
+        if self.sparse_labels:
+            labels = tf.maximum(self.input_y, 0)
+            # unknown labels cost nothing, like their all zero one-hot rows
+            known = tf.cast(self.input_y >= 0, tf.float32)
+
+            def full_losses():
+                return tf.nn.sparse_softmax_cross_entropy_with_logits(
+                    logits=logits(), labels=labels)
+        else:
+            labels = tf.argmax(self.input_y, 1)
+            known = tf.cast(tf.reduce_sum(self.input_y, 1), tf.float32)
+
+            def full_losses():
+                return tf.nn.softmax_cross_entropy_with_logits(
+                    logits=logits(), labels=self.input_y)
+        if self.softmax == 'full':
+            def logits():
+                return self.logits
+            losses = full_losses()
+        else:
+            def logits():
+                # built inside the evaluation branch, a tensor from
+                # outside the cond would run in training steps as well;
+                # no gradient, a dense one through the cond would
+                # densify the sparse gradient of output_W
+                return tf.stop_gradient(self._full_logits())
+            # the sampled branch only runs in training steps
+            losses = tf.cond(
+                self.is_training,
+                lambda: self._sampled_losses(labels),
+                full_losses)
+        if self.sparse_labels or self.softmax != 'full':
+            losses *= known
+        self.cost = tf.reduce_mean(losses)
+        if self.config['l2_reg_lambda']:
+            l2_loss = tf.add_n(
+                [tf.nn.l2_loss(v) for v in tf.trainable_variables()
+                 if 'bias' not in v.name])
+            self.cost += self.config['l2_reg_lambda'] * l2_loss
 
     def _train(self):
         self.global_step = tf.Variable(
@@ -1766,13 +593,23 @@ class Model(object):
 
     def _evaluation(self):
         with tf.name_scope('compute_accuray'):
-            self.label = tf.argmax(self.input_y, 1)
+            if self.sparse_labels:
+                # argmax of an all zero one-hot row is 0 as well
+                self.label = tf.cast(tf.maximum(self.input_y, 0), tf.int64)
+            else:
+                self.label = tf.argmax(self.input_y, 1)
             self.prediction = tf.argmax(self.logits, 1)
 
             # training accuracy
             correct_at_1 = tf.nn.in_top_k(self.logits, self.label, 1)
             self.accuracy_at_1 =\
                 tf.reduce_mean(tf.cast(correct_at_1, tf.float32))
+            # training progress, higher is better; sampled training
+            # steps leave the full logits out, their cost is used instead
+            if self.softmax == 'full':
+                self.train_score = self.accuracy_at_1
+            else:
+                self.train_score = -self.cost
 
         with tf.name_scope("test_accuracy"):
             self.precision_at_1, self.precision_op_at_1 = \
@@ -1851,6 +688,9 @@ class Model(object):
         # Keep track of gradient values and sparsity (optional)
         grad_summaries = []
         for g, v in self.grads_and_vars:
+            if isinstance(g, tf.IndexedSlices):
+                # rows of the sampled classes, not a dense copy
+                g = g.values
             if g is not None:
                 grad_hist_summary = tf.summary.histogram(
                     "{}/grad/hist".format(v.name), g)
@@ -1867,14 +707,14 @@ class Model(object):
         streaming_accuray_summary =\
             tf.summary.scalar("streaming_accuray",
                               self.recall_op_at_1)
-        accuracy_summary_at_1 = \
-            tf.summary.scalar("accuracy_at_1", self.accuracy_at_1)
+        train_summaries = [loss_summary, grad_summaries_merged]
+        if self.softmax == 'full':
+            # training accuracy needs the full logits
+            train_summaries.insert(1, tf.summary.scalar(
+                "accuracy_at_1", self.accuracy_at_1))
 
         # Train Summaries
-        self.train_summary_op = tf.summary.merge(
-            [loss_summary,
-             accuracy_summary_at_1,
-             grad_summaries_merged])
+        self.train_summary_op = tf.summary.merge(train_summaries)
 
         # test summaries
         self.test_summary_op = tf.summary.merge(
@@ -3,12 +3,21 @@
 # 导包
 import os
 import re
+import json
+import time
+import hashlib
 import nltk
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from dateutil.parser import parse
-from datetime import timedelta
+from datetime import datetime, timedelta
+from functools import lru_cache
+from collections import Counter
+from multiprocessing import Pool, cpu_count
 from nltk.corpus import stopwords
+from token_cache import TokenCache, cache_namespace
+import corpus_store
 
 
 def select_lines_comments(lines_raw):
@@ -98,109 +107,334 @@ def get_wordnet_pos(treebank_tag):
         return 'n'
 
 
-def clean_words(words_raw, wnl, english_stopwords):
-    pos_words = nltk.pos_tag(words_raw)
-    clean_words = [wnl.lemmatize(word_pos[0], get_wordnet_pos(
-        word_pos[1])) for word_pos in pos_words]
-    clean_words = ' '.join(clean_words).lower().split()
+def lemma_cache(wnl, maxsize=2 ** 16):
+    # bounded memo of (word, wordnet pos) -> lemma,
+    # shared by all documents of a worker
+    @lru_cache(maxsize=maxsize)
+    def lemmatize(word, pos):
+        return wnl.lemmatize(word, pos)
+    return lemmatize
+
+
+def lemmatize_sentences(sentences_words, lemmatize, lemma_table=None):
+    # lemmas of tokenized sentences, pos tagged in one batch;
+    # fast mode: no tagging, words are looked up in lemma_table
+    if lemma_table is not None:
+        return [[lemma_table.get(word) or lemmatize(word, 'n')
+                 for word in words] for words in sentences_words]
+    tagged_sentences = nltk.pos_tag_sents(sentences_words)
+    return [[lemmatize(word, get_wordnet_pos(tag)) for word, tag in tagged]
+            for tagged in tagged_sentences]
+
+
+def filter_words(lemmas, english_stopwords):
+    clean_words = ' '.join(lemmas).lower().split()
     clean_words = [
         word for word in clean_words if word not in english_stopwords]
     clean_words = [word for word in clean_words if word.isalpha()]
-
     return clean_words
 
-# read lines
+
+def clean_words(words_raw, wnl, english_stopwords):
+    lemmatize = lemma_cache(wnl)
+    lemmas = lemmatize_sentences([words_raw], lemmatize)[0]
+    return filter_words(lemmas, english_stopwords)
 
 
-def read_lines(file_path):
+def tokenize_sentences(raw_text):
+    # sentences tokinzer, cean raw sentence, words tokenizer
+    return [nltk.word_tokenize(clean_raw_cnn(sentence))
+            for sentence in nltk.sent_tokenize(raw_text)]
+
+
+def read_raw_text(file_path):
     # open description file
     with open(file_path, encoding='latin2') as f:
         # remove last 5 lines
         lines_raw = f.readlines()
-        # read lines specially
-        selected_lines = clean_raw(lines_raw)
-        # raw text
-        raw_text = ' '.join(selected_lines)
-        # decode utf8 coding
-        raw_text = raw_text.encode('utf8').decode('utf8')
-        # sentences tokinzer
-        sentences = nltk.sent_tokenize(raw_text)
-        tokens = []
-        # dealing words
+    # read lines specially
+    selected_lines = clean_raw(lines_raw)
+    # raw text
+    raw_text = ' '.join(selected_lines)
+    # decode utf8 coding
+    return raw_text.encode('utf8').decode('utf8')
+
+# read lines
+
+
+READ_LINES_VERSION = 1
+
+
+def read_lines(file_path, cache=None, wnl=None, english_stopwords=None,
+               lemmatize=None, lemma_table=None):
+    # wnl, english_stopwords, lemmatize: shared per worker by init_ingestion
+    # lemma_table: fast mode without pos tagging
+    raw_text = read_raw_text(file_path)
+    # token streams of unchanged bugs come from the cache
+    if cache is not None:
+        bug_id = os.path.splitext(os.path.basename(file_path))[0]
+        if lemma_table is None:
+            namespace = cache_namespace('read_lines', READ_LINES_VERSION)
+        else:
+            namespace = cache_namespace(
+                'read_lines', READ_LINES_VERSION, fast=True)
+        tokens = cache.get(bug_id, raw_text, namespace)
+        if tokens:
+            return ' '.join(tokens)
+    # dealing words
+    if wnl is None:
         wnl = nltk.WordNetLemmatizer()
-        english_stopwords = stopwords.words('english')
-        for sentence in sentences:
-            # cean raw sentence
-            sentence = clean_raw_cnn(sentence)
-            # words tokenizer
-            raw_words = nltk.word_tokenize(sentence)
-            # clearn word
-            tmp = clean_words(raw_words, wnl, english_stopwords)
-            tokens.extend(tmp)
-
-        assert len(tokens) > 0
-        line = ' '.join(tokens)
+    if english_stopwords is None:
+        english_stopwords = set(stopwords.words('english'))
+    if lemmatize is None:
+        lemmatize = lemma_cache(wnl)
+    # clearn word
+    lemmas = lemmatize_sentences(
+        tokenize_sentences(raw_text), lemmatize, lemma_table)
+    tokens = filter_words(
+        [lemma for sentence in lemmas for lemma in sentence],
+        english_stopwords)
+
+    assert len(tokens) > 0
+    if cache is not None:
+        cache.put(bug_id, raw_text, namespace, tokens)
+    line = ' '.join(tokens)
 
     return line
 
 
+def build_lemma_table(file_paths, lemma_table_file=None):
+    # word -> most frequent pos tagged lemma of the word,
+    # the lookup table of the fast mode
+    lemmatize = lemma_cache(nltk.WordNetLemmatizer())
+    counts = {}
+    for file_path in file_paths:
+        sentences_words = tokenize_sentences(read_raw_text(file_path))
+        lemmas = lemmatize_sentences(sentences_words, lemmatize)
+        for words, sentence in zip(sentences_words, lemmas):
+            for word, lemma in zip(words, sentence):
+                counts.setdefault(word, Counter())[lemma] += 1
+    lemma_table = dict((word, counter.most_common(1)[0][0])
+                       for word, counter in counts.items())
+    if lemma_table_file:
+        with open(lemma_table_file, 'w', encoding='utf8') as f:
+            json.dump(lemma_table, f)
+    return lemma_table
+
+
+def load_lemma_table(lemma_table_file):
+    with open(lemma_table_file, encoding='utf8') as f:
+        return json.load(f)
+
+
+def compare_lemmatization(file_paths, lemma_table):
+    """
+    throughput of the pos tagged and the fast mode on the same documents
+    and agreement of the fast lemmas with the tagged ones
+    """
+    documents = [tokenize_sentences(read_raw_text(file_path))
+                 for file_path in file_paths]
+    results = {}
+    for mode, table in [('tagged', None), ('fast', lemma_table)]:
+        lemmatize = lemma_cache(nltk.WordNetLemmatizer())
+        start = time.time()
+        results[mode] = [lemmatize_sentences(sentences_words, lemmatize, table)
+                         for sentences_words in documents]
+        seconds = max(time.time() - start, 1e-6)
+        print('%s: %.1f docs/sec (%.2fs)' % (
+            mode, len(documents) / seconds, seconds))
+        results[mode + '_docs_per_sec'] = len(documents) / seconds
+    total = 0
+    same = 0
+    for tagged_document, fast_document in zip(results['tagged'],
+                                              results['fast']):
+        for tagged, fast in zip(tagged_document, fast_document):
+            total += len(tagged)
+            same += sum(1 for a, b in zip(tagged, fast) if a == b)
+    accuracy = float(same) / total if total else 1.0
+    print('fast lemma agreement: %.4f on %d tokens' % (accuracy, total))
+    return {'tagged_docs_per_sec': results['tagged_docs_per_sec'],
+            'fast_docs_per_sec': results['fast_docs_per_sec'],
+            'accuracy': accuracy, 'tokens': total}
+
+
+# hours added to the Bugzilla timestamps per timezone
+TZ_LOOKUP_HOURS = {'EDT': 12, 'EST': 13, 'PDT': 15, 'PST': 16}
+WHEN_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
 def parse_when(when):
-    tz_lookup_tabel = {'EDT': timedelta(hours=12), 'EST': timedelta(
-        hours=13), 'PDT': timedelta(hours=15), 'PST': timedelta(hours=16)}
+    # fixed format first, dateutil for anything else
     tz = when.split()[2]
-    t = parse(when) + tz_lookup_tabel[tz]
-    return t.strftime('%Y-%m-%d %H:%M:%S')
+    try:
+        t = datetime.strptime(' '.join(when.split()[:2]), WHEN_FORMAT)
+    except ValueError:
+        t = parse(when)
+    t = t + timedelta(hours=TZ_LOOKUP_HOURS[tz])
+    return t.strftime(WHEN_FORMAT)
 
 
-def merged_files(data_files, results_files):
-    # 读取文件，处理并写入bugs_all.csv文件
-    for bug_file in os.listdir(data_files + '/buglist'):
+def parse_when_column(whens):
+    """
+    vectorized parse_when: '2004-01-02 11:00:00 PDT' strings to datetime64
+    shifted by the timezone column, unknown timezones become NaT
+    """
+    whens = pd.Series(whens).astype(str).str.strip()
+    if whens.empty:
+        # rsplit of no rows has no columns at all
+        return pd.Series([], index=whens.index, dtype='datetime64[ns]')
+    parts = whens.str.rsplit(' ', n=1, expand=True)
+    if parts.shape[1] < 2:
+        parts[1] = None
+    times = pd.to_datetime(parts[0], format=WHEN_FORMAT, errors='coerce')
+    hours = parts[1].map(TZ_LOOKUP_HOURS)
+    # rows not in the fixed format go through dateutil
+    slow = times.isnull() & hours.notnull()
+    if slow.any():
+        times[slow] = pd.to_datetime(
+            [parse(when, ignoretz=True) for when in whens[slow]])
+    missing = hours.isnull()
+    if missing.any():
+        print('缺少时区：%s' % ', '.join(sorted(set(
+            parts[1][missing].fillna('').astype(str)))))
+    return times + pd.to_timedelta(hours, unit='h')
+
+
+# lemmatizer, stopwords and token cache of an ingestion worker
+ingestion_state = {}
+
+
+def init_ingestion(cache_file=None, lemma_table_file=None):
+    ingestion_state['wnl'] = nltk.WordNetLemmatizer()
+    ingestion_state['lemmatize'] = lemma_cache(ingestion_state['wnl'])
+    ingestion_state['english_stopwords'] = set(stopwords.words('english'))
+    ingestion_state['cache'] = TokenCache(cache_file) if cache_file else None
+    ingestion_state['lemma_table'] = load_lemma_table(lemma_table_file)\
+        if lemma_table_file else None
+
+
+def bug_tasks(data_files):
+    # (bug_dir, buglist line) in a fixed order: sorted buglist files,
+    # file order of the bugs
+    for bug_file in sorted(os.listdir(data_files + '/buglist')):
         bug_dir = bug_file.split('.')[0]
         file_path = data_files + '/buglist/' + bug_file
         with open(file_path, mode='r', encoding='utf8') as f:
             bugs = f.readlines()[1:]
-            for bug in bugs:
-                tmp = bug.split(',')
-                bug_id, bug_who = tmp[0], tmp[4].split(
-                    '"')[1] if '"' in tmp[4] else tmp[4]
-                bug_assingee = bug_who.split(
-                    '@')[0] if '@' in bug_who else bug_who
-                print(data_files + '/description/' +
-                      bug_dir + '/' + bug_id + '.txt')
-                # 读取描述文件
-                file_path = data_files +\
-                    '/description/' + bug_dir + '/' + bug_id + '.txt'
-                line = read_lines(file_path)
-                # for raw data
-#                 line = "\""+line + "\""
-                # 读取修改时间
-                print(data_files + '/bughistory_raw/' +
-                      bug_dir + '/' + bug_id + '.csv')
-                file_path = data_files +\
-                    '/bughistory_raw/' + bug_dir + '/' + bug_id + '.csv'
-                with open(file_path, encoding='latin2') as f:
-                    when = f.readlines()[-1].split(',')[0]
-                    when = parse_when(when)
-                bug = ','.join([when, bug_id, bug_who, line, bug_assingee])
-
+        for bug in bugs:
+            yield data_files, bug_dir, bug
+
+
+def read_bug_record(task):
+    # (when, id, who, text, fixer) of one bug
+    data_files, bug_dir, bug = task
+    tmp = bug.split(',')
+    bug_id, bug_who = tmp[0], tmp[4].split(
+        '"')[1] if '"' in tmp[4] else tmp[4]
+    bug_assingee = bug_who.split(
+        '@')[0] if '@' in bug_who else bug_who
+    # 读取描述文件
+    file_path = data_files +\
+        '/description/' + bug_dir + '/' + bug_id + '.txt'
+    line = read_lines(file_path, ingestion_state['cache'],
+                      ingestion_state['wnl'],
+                      ingestion_state['english_stopwords'],
+                      ingestion_state['lemmatize'],
+                      ingestion_state['lemma_table'])
+    # for raw data
+    # line = "\""+line + "\""
+    # 读取修改时间
+    file_path = data_files +\
+        '/bughistory_raw/' + bug_dir + '/' + bug_id + '.csv'
+    with open(file_path, encoding='latin2') as f:
+        when = f.readlines()[-1].split(',')[0]
+        when = parse_when(when)
+    return [when, bug_id, bug_who, line, bug_assingee]
+
+
+def read_bug(task):
+    # one line of bugs_all.csv
+    return ','.join(read_bug_record(task)) + '\n'
+
+
+def map_bugs(func, tasks, workers=None, chunk_size=64, cache_file=None,
+             lemma_table_file=None):
+    # func over the bug tasks on an ingestion pool, results in task order
+    if workers is None:
+        workers = cpu_count()
+    if workers <= 1:
+        init_ingestion(cache_file, lemma_table_file)
+        for task in tasks:
+            yield func(task)
+        return
+    pool = Pool(workers, initializer=init_ingestion,
+                initargs=(cache_file, lemma_table_file))
+    try:
+        for result in pool.imap(func, tasks, chunk_size):
+            yield result
+    finally:
+        pool.terminate()
+
+
+def merged_files(data_files, results_files, cache_file=None, workers=None,
+                 chunk_size=64, buffer_lines=4096, lemma_table_file=None):
+    # 读取文件，处理并写入bugs_all.csv文件
+    # bugs are processed on a pool, lines are written in task order
+    # lemma_table_file: fast mode, see build_lemma_table
+    lines = map_bugs(read_bug, bug_tasks(data_files), workers, chunk_size,
+                     cache_file, lemma_table_file)
+    with open(results_files, mode='a', encoding='utf8') as f:
+        buffer = []
+        for count, line in enumerate(lines, 1):
+            buffer.append(line)
+            if len(buffer) >= buffer_lines:
                 # 写入文件
-                with open(results_files, mode='a', encoding='utf8') as f:
-                    f.write(bug)
-                    f.write('\n')
-
-
-def sortedbytimesplited(results_files):
-    train_all = pd.read_csv(results_files, parse_dates=[3])
+                f.write(''.join(buffer))
+                buffer = []
+                print('%d bugs merged' % count)
+        f.write(''.join(buffer))
+
+
+def ingest_new_bugs(data_files, store_dir, cache_file=None, workers=None,
+                    chunk_size=64, lemma_table_file=None):
+    # incremental mode: only bugs whose id is not in the corpus store
+    # are read, they are appended to the store in time order
+    store = corpus_store.open_store(store_dir)
+    known = set(store.column(store.id_column, 0, len(store)))\
+        if store else set()
+    tasks = [task for task in bug_tasks(data_files)
+             if task[2].split(',')[0] not in known]
+    print('%d new bugs' % len(tasks))
+    if not tasks:
+        return 0
+    records = list(map_bugs(read_bug_record, tasks, workers, chunk_size,
+                            cache_file, lemma_table_file))
+    bugs = pd.DataFrame(records, columns=['when', 'id', 'who', 'text', 'fixer'])
+    if store is None:
+        corpus_store.write_corpus(store_dir, bugs)
+        return len(bugs)
+    return corpus_store.append_corpus(
+        store_dir, bugs.rename(columns={'id': store.id_column}))
+
+
+def sortedbytimesplited(results_files, save_dir=None, export_csv=True):
+    # time sorted corpus store with the 11 splits as row offsets,
+    # export_csv also writes the split csv files
+    if save_dir is None:
+        save_dir = os.path.dirname(results_files) + '/'
+    train_all = pd.read_csv(results_files)
+    train_all['when'] = pd.to_datetime(train_all.when, format=WHEN_FORMAT)
     train_all_sorted = train_all.sort_values('when')
+    corpus_store.write_corpus(save_dir + 'corpus/', train_all_sorted)
+    if not export_csv:
+        return
 
     # 将数据分成11份
     bug_len = len(train_all_sorted)
-    bug_part_size = int((bug_len - 1) / 11) + 1
-    for i in range(11):
-        begin_index = i * bug_part_size
-        end_index = min((i + 1) * bug_part_size, bug_len - 1)
+    for i, (begin_index, end_index) in enumerate(
+            corpus_store.split_offsets(bug_len, 11)):
         bug_parted = train_all_sorted.iloc[begin_index:end_index]
-        bug_parted.to_csv(data_files + sub_dir + str(i) + '.csv',
+        bug_parted.to_csv(save_dir + str(i) + '.csv',
                           header=True, index=False)
 
 
@@ -228,77 +462,107 @@ def stats_class_df(doc_class_list, class_dict):
 
 
 def stats_term_class_df(doc_terms_list, doc_class_list, term_dict, class_dict):
-    term_class_df_mat = np.zeros((len(term_dict), len(class_dict)), np.float32)
-    for k in range(len(doc_class_list)):
-        class_index = class_dict[doc_class_list[k]]
-        doc_terms = doc_terms_list[k]
-        for term in set(doc_terms):
-            term_index = term_dict[term]
-            term_class_df_mat[term_index][class_index] += 1
-    return term_class_df_mat
+    # A = X^T Y with X the binary document-term matrix
+    # and Y the one-hot class matrix, both sparse
+    term_ids = []
+    doc_lengths = []
+    for doc_terms in doc_terms_list:
+        doc_term_ids = set(term_dict[term] for term in doc_terms)
+        term_ids.extend(doc_term_ids)
+        doc_lengths.append(len(doc_term_ids))
+    num_docs = len(doc_lengths)
+    doc_ids = np.repeat(np.arange(num_docs), doc_lengths)
+    doc_term_mat = sparse.csr_matrix(
+        (np.ones(len(term_ids), dtype=np.float32), (doc_ids, term_ids)),
+        shape=(num_docs, len(term_dict)))
+    class_ids = [class_dict[doc_class] for doc_class in doc_class_list]
+    doc_class_mat = sparse.csr_matrix(
+        (np.ones(num_docs, dtype=np.float32),
+         (np.arange(num_docs), class_ids)),
+        shape=(num_docs, len(class_dict)))
+    term_class_df_mat = doc_term_mat.T.dot(doc_class_mat)
+    return sparse.csr_matrix(term_class_df_mat, dtype=np.float32)
+
+
+TERM_BLOCK_SIZE = 4096
+
+
+def term_blocks(term_class_df_mat, block_size=TERM_BLOCK_SIZE):
+    # dense [block_size, n_classes] slices of the term-class matrix,
+    # keeps the broadcasting below bounded in memory
+    for begin in range(0, term_class_df_mat.shape[0], block_size):
+        block = term_class_df_mat[begin:begin + block_size]
+        if sparse.issparse(block):
+            block = block.toarray()
+        yield begin, np.asarray(block, dtype=np.float64)
+
+
+def term_class_margins(class_df_list, term_class_df_mat):
+    class_df = np.asarray(class_df_list, dtype=np.float64)
+    term_df = np.asarray(term_class_df_mat.sum(axis=1),
+                         dtype=np.float64).ravel()
+    return class_df, term_df, class_df.sum()
+
+
+def rank_terms(term_set, term_score_array):
+    sorted_term_score_index = term_score_array.argsort()[:: -1]
+    term_set_fs = [term_set[index] for index in sorted_term_score_index]
+    print(term_set_fs[:10])
+    return term_set_fs
 
 
 def feature_selection_mi(class_df_list, term_set, term_class_df_mat):
-    A = term_class_df_mat
-    B = np.array([(sum(x) - x).tolist() for x in A])
-    C = np.tile(class_df_list, (A.shape[0], 1)) - A
-    N = sum(class_df_list)
+    class_df, term_df, N = term_class_margins(
+        class_df_list, term_class_df_mat)
     class_set_size = len(class_df_list)
 
-    term_score_mat = np.log(
-        ((A + 1.0) * N) / ((A + C) * (A + B + class_set_size)))
-    term_score_max_list = [max(x) for x in term_score_mat]
-    term_score_array = np.array(term_score_max_list)
-    sorted_term_score_index = term_score_array.argsort()[:: -1]
-    term_set_fs = [term_set[index] for index in sorted_term_score_index]
-
-    print(term_set_fs[:10])
-    return term_set_fs
+    term_score_array = np.empty(len(term_df))
+    for begin, A in term_blocks(term_class_df_mat):
+        # A + B is the term df, A + C the class df
+        t_df = term_df[begin:begin + len(A), None]
+        term_score_mat = np.log(
+            ((A + 1.0) * N) / (class_df * (t_df + class_set_size)))
+        term_score_array[begin:begin + len(A)] = term_score_mat.max(axis=1)
+    return rank_terms(term_set, term_score_array)
 
 
 def feature_selection_ig(class_df_list, term_set, term_class_df_mat):
-    A = term_class_df_mat
-    B = np.array([(sum(x) - x).tolist() for x in A])
-    C = np.tile(class_df_list, (A.shape[0], 1)) - A
-    N = sum(class_df_list)
-    D = N - A - B - C
-    term_df_array = np.sum(A, axis=1)
+    class_df, term_df, N = term_class_margins(
+        class_df_list, term_class_df_mat)
     class_set_size = len(class_df_list)
 
-    p_t = term_df_array / N
+    p_t = term_df / N
     p_not_t = 1 - p_t
-    p_c_t_mat = (A + 1) / (A + B + class_set_size)
-    p_c_not_t_mat = (C + 1) / (C + D + class_set_size)
-    p_c_t = np.sum(p_c_t_mat * np.log(p_c_t_mat), axis=1)
-    p_c_not_t = np.sum(p_c_not_t_mat * np.log(p_c_not_t_mat), axis=1)
+    p_c_t = np.empty(len(term_df))
+    p_c_not_t = np.empty(len(term_df))
+    for begin, A in term_blocks(term_class_df_mat):
+        end = begin + len(A)
+        t_df = term_df[begin:end, None]
+        # C = class_df - A and C + D = N - term_df
+        p_c_t_mat = (A + 1) / (t_df + class_set_size)
+        p_c_not_t_mat = (class_df - A + 1) / (N - t_df + class_set_size)
+        p_c_t[begin:end] = np.sum(p_c_t_mat * np.log(p_c_t_mat), axis=1)
+        p_c_not_t[begin:end] = np.sum(
+            p_c_not_t_mat * np.log(p_c_not_t_mat), axis=1)
 
     term_score_array = p_t * p_c_t + p_not_t * p_c_not_t
-    sorted_term_score_index = term_score_array.argsort()[:: -1]
-    term_set_fs = [term_set[index] for index in sorted_term_score_index]
-
-    print(term_set_fs[:10])
-    return term_set_fs
+    return rank_terms(term_set, term_score_array)
 
 
 def feature_selection_wllr(class_df_list, term_set, term_class_df_mat):
-    A = term_class_df_mat
-    B = np.array([(sum(x) - x).tolist() for x in A])
-    C_Total = np.tile(class_df_list, (A.shape[0], 1))
-    N = sum(class_df_list)
-    C_Total_Not = N - C_Total
+    class_df, term_df, N = term_class_margins(
+        class_df_list, term_class_df_mat)
     term_set_size = len(term_set)
 
-    p_t_c = (A + 1E-6) / (C_Total + 1E-6 * term_set_size)
-    p_t_not_c = (B + 1E-6) / (C_Total_Not + 1E-6 * term_set_size)
-    term_score_mat = p_t_c * np.log(p_t_c / p_t_not_c)
-
-    term_score_max_list = [max(x) for x in term_score_mat]
-    term_score_array = np.array(term_score_max_list)
-    sorted_term_score_index = term_score_array.argsort()[:: -1]
-    term_set_fs = [term_set[index] for index in sorted_term_score_index]
-
-    print(term_set_fs[:10])
-    return term_set_fs
+    term_score_array = np.empty(len(term_df))
+    for begin, A in term_blocks(term_class_df_mat):
+        # B = term_df - A
+        B = term_df[begin:begin + len(A), None] - A
+        p_t_c = (A + 1E-6) / (class_df + 1E-6 * term_set_size)
+        p_t_not_c = (B + 1E-6) / (N - class_df + 1E-6 * term_set_size)
+        term_score_mat = p_t_c * np.log(p_t_c / p_t_not_c)
+        term_score_array[begin:begin + len(A)] = term_score_mat.max(axis=1)
+    return rank_terms(term_set, term_score_array)
 
 
 def feature_selection(doc_terms_list, doc_class_list, fs_method, percent):
@@ -310,6 +574,12 @@ def feature_selection(doc_terms_list, doc_class_list, fs_method, percent):
         doc_terms_list, doc_class_list, term_dict, class_dict)
     term_set = [term[0]
                 for term in sorted(term_dict.items(), key=lambda x: x[1])]
+    return feature_selection_stats(
+        class_df_list, term_set, term_class_df_mat, fs_method, percent)
+
+
+def feature_selection_stats(class_df_list, term_set, term_class_df_mat,
+                            fs_method, percent):
     term_set_size = len(term_set)
     selection_size = int(term_set_size * percent)
     term_set_fs = []
@@ -327,22 +597,178 @@ def feature_selection(doc_terms_list, doc_class_list, fs_method, percent):
     return term_set_fs[:selection_size]
 
 
+def split_statistics(data, cache_file=None):
+    # term-class df counts of one chronological split:
+    # (sorted terms, sorted classes, sparse counts, class df)
+    if cache_file and os.path.exists(cache_file):
+        with np.load(cache_file) as stats:
+            term_class_df_mat = sparse.csr_matrix(
+                (stats['data'], stats['indices'], stats['indptr']),
+                shape=tuple(stats['shape']))
+            return stats['terms'].tolist(), stats['classes'].tolist(),\
+                term_class_df_mat, stats['class_df']
+    doc_terms_list = [doc.split() for doc in data.text]
+    doc_class_list = data.fixer.astype(str).values
+    term_dict = get_term_dict(doc_terms_list)
+    class_dict = get_class_dict(doc_class_list)
+    term_class_df_mat = stats_term_class_df(
+        doc_terms_list, doc_class_list, term_dict, class_dict)
+    class_df = np.array(stats_class_df(doc_class_list, class_dict))
+    terms = sorted(term_dict, key=term_dict.get)
+    classes = sorted(class_dict, key=class_dict.get)
+    if cache_file:
+        np.savez(cache_file, data=term_class_df_mat.data,
+                 indices=term_class_df_mat.indices,
+                 indptr=term_class_df_mat.indptr,
+                 shape=term_class_df_mat.shape,
+                 terms=np.array(terms, dtype=str),
+                 classes=np.array(classes, dtype=str), class_df=class_df)
+    return terms, classes, term_class_df_mat, class_df
+
+
+def split_statistics_file(data_file, encoding='utf8', stats_dir=None,
+                          data=None):
+    # cached next to the split, keyed by its size and modification time
+    if stats_dir is None:
+        stats_dir = os.path.join(os.path.dirname(data_file), 'stats')
+    if not os.path.exists(stats_dir):
+        os.makedirs(stats_dir)
+    stat = os.stat(data_file)
+    cache_file = os.path.join(stats_dir, '%s.%d-%d.npz' % (
+        os.path.basename(data_file), stat.st_size, int(stat.st_mtime)))
+    if data is None and not os.path.exists(cache_file):
+        data = pd.read_csv(data_file, encoding=encoding)
+    return split_statistics(data, cache_file)
+
+
+def merge_statistics(splits_stats):
+    # statistics of a training window = sum of the split statistics,
+    # terms and classes sorted like get_term_dict and get_class_dict
+    term_set = sorted(set().union(*[stats[0] for stats in splits_stats]))
+    class_set = sorted(set().union(*[stats[1] for stats in splits_stats]))
+    term_index = dict(zip(term_set, range(len(term_set))))
+    class_index = dict(zip(class_set, range(len(class_set))))
+    rows, cols, values = [], [], []
+    class_df = np.zeros(len(class_set))
+    for terms, classes, term_class_df_mat, split_class_df in splits_stats:
+        term_map = np.array([term_index[term] for term in terms], dtype=int)
+        class_map = np.array([class_index[c] for c in classes], dtype=int)
+        coo = term_class_df_mat.tocoo()
+        rows.append(term_map[coo.row])
+        cols.append(class_map[coo.col])
+        values.append(coo.data)
+        class_df[class_map] += split_class_df
+    term_class_df_mat = sparse.csr_matrix(
+        (np.concatenate(values), (np.concatenate(rows),
+                                  np.concatenate(cols))),
+        shape=(len(term_set), len(class_set)), dtype=np.float32)
+    return class_df.tolist(), term_set, term_class_df_mat
+
+
+STATS_BLOCK_ROWS = 4096
+
+
+def rows_statistics(store, begin, end, cache_file=None):
+    data = store.frame(begin, end, ['text', store.label_column])
+    data = data.rename(columns={store.label_column: 'fixer'})
+    return split_statistics(data, cache_file)
+
+
+def block_statistics(store, block, block_rows=STATS_BLOCK_ROWS,
+                     stats_dir=None):
+    # statistics of a full row block of a corpus store, cached by the ids
+    # of its rows: appending new bugs never changes a full block
+    if stats_dir is None:
+        stats_dir = os.path.join(store.save_dir, 'stats')
+    if not os.path.exists(stats_dir):
+        os.makedirs(stats_dir)
+    begin = block * block_rows
+    ids = store.column(store.id_column, begin, begin + block_rows)
+    digest = hashlib.sha1('\n'.join(ids).encode('utf8')).hexdigest()
+    cache_file = os.path.join(stats_dir, 'block%d-%d.%s.npz' % (
+        block, block_rows, digest))
+    return rows_statistics(store, begin, begin + block_rows, cache_file)
+
+
+def store_statistics(store, splits, stats_dir=None,
+                     block_rows=STATS_BLOCK_ROWS):
+    # statistics of chronological splits of a corpus store:
+    # cached full blocks + the rows before and after them
+    splits_stats = []
+    for begin, end in store.rows(splits):
+        first_block = -(-begin // block_rows)
+        last_block = max(end // block_rows, first_block)
+        if begin < min(first_block * block_rows, end):
+            splits_stats.append(rows_statistics(
+                store, begin, min(first_block * block_rows, end)))
+        for block in range(first_block, last_block):
+            splits_stats.append(
+                block_statistics(store, block, block_rows, stats_dir))
+        if max(last_block * block_rows, begin) < end:
+            splits_stats.append(rows_statistics(
+                store, max(last_block * block_rows, begin), end))
+    return merge_statistics(splits_stats)
+
+
+def window_statistics(data_files, encoding='utf8', stats_dir=None,
+                      store=None):
+    # store: CorpusStore, data_files then only name the splits
+    if store is not None:
+        return store_statistics(store, data_files, stats_dir)
+    return merge_statistics(
+        [split_statistics_file(data_file, encoding, stats_dir)
+         for data_file in data_files])
+
+
+# selected features of a filtering worker
+worker_features = frozenset()
+
+
+def init_feature_filter(features):
+    global worker_features
+    worker_features = features
+
+
+def filter_by_features(doc, features=None, min_words=3):
+    # keep the selected words, documents left with too few keep all words
+    if features is None:
+        features = worker_features
+    tmp = [word for word in doc.split() if word in features]
+    if len(tmp) < min_words:
+        return doc
+    return ' '.join(tmp)
+
+
+def filter_documents(docs, features, pool=None, chunk_size=512):
+    # features is a (frozen)set, so every word costs one hash lookup
+    if pool is None:
+        return [filter_by_features(doc, features) for doc in docs]
+    return pool.map(filter_by_features, docs, chunk_size)
+
+
 def filter_by_feature_selection(data_dir, fs_method='IG',
                                 percent=0.7, encoding='utf8',
-                                validation=False):
+                                validation=False, workers=None):
+    if workers is None:
+        workers = cpu_count()
     start_index = 2 if validation else 1
+    # every split is read and counted once for all steps
+    splits = {}
+    splits_stats = {}
+
+    def read_split(file):
+        if file not in splits:
+            splits[file] = pd.read_csv(file, encoding=encoding)
+            splits_stats[file] = split_statistics_file(
+                file, encoding, data=splits[file])
+        return splits[file]
+
     for step in range(start_index, 11):
         data_files = [data_dir + str(i) + '.csv' for i in range(step + 1)]
-        if validation:
-            train_data = pd.concat(
-                [pd.read_csv(file, encoding=encoding)
-                 for file in data_files[:-2]])
-        else:
-            train_data = pd.concat(
-                [pd.read_csv(file, encoding=encoding)
-                 for file in data_files[:-1]])
+        train_files = data_files[:-2] if validation else data_files[:-1]
+        train_data = pd.concat([read_split(file) for file in train_files])
 
-        test_data = pd.read_csv(data_files[-1], encoding=encoding)
+        test_data = read_split(data_files[-1])
 
         text_train = train_data.text
         fixer_train = train_data.fixer
@@ -350,42 +776,48 @@ def filter_by_feature_selection(data_dir, fs_method='IG',
         text_test = test_data.text
         fixer_test = test_data.fixer
         # 特征选择 待完善
-        featurs_names = feature_selection(
-            [doc.split() for doc in text_train],
-            fixer_train.values, fs_method, percent)
-
-        def filter_by_features_names(doc):
-            doc = doc.split()
-            tmp = [word for word in doc if word in featurs_names]
-            if len(tmp) < 3:
-                return doc
-            else:
-                return ' '.join(tmp)
+        class_df_list, term_set, term_class_df_mat = merge_statistics(
+            [splits_stats[file] for file in train_files])
+        featurs_names = feature_selection_stats(
+            class_df_list, term_set, term_class_df_mat, fs_method, percent)
+
+        features = frozenset(featurs_names)
+        pool = Pool(workers, initializer=init_feature_filter,
+                    initargs=(features,)) if workers > 1 else None
         print('Training data selection')
-        text_train.apply(filter_by_features_names)
+        text_train = pd.Series(
+            filter_documents(text_train.values, features, pool),
+            index=text_train.index, name=text_train.name)
         print('Finishing>>>>>>')
         print('Testing data selection')
-        text_test.apply(filter_by_features_names)
+        text_test = pd.Series(
+            filter_documents(text_test.values, features, pool),
+            index=text_test.index, name=text_test.name)
         print('Finishing>>>>>>')
         data_train = pd.concat([text_train, fixer_train], axis=1)
 
         results_dir = data_dir + fs_method + str('/')
-        if not os.path.exists(data_dir):
-            os.mkdir(data_dir)
+        if not os.path.exists(results_dir):
+            os.mkdir(results_dir)
         file_train = results_dir + str(percent) + str(step) + '.train.csv'
         data_train.to_csv(file_train, index=False)
         data_test = pd.concat([text_test, fixer_test], axis=1)
         file_test = results_dir + str(percent) + str(step) + '.test.csv'
         data_test.to_csv(file_test, index=False)
         if validation:
-            dev_data = pd.read_csv(data_files[-2], encoding=encoding)
+            dev_data = read_split(data_files[-2])
             text_dev = dev_data.text
             fixer_dev = dev_data.fixer
             print('Developing data selection')
-            text_dev.apply(filter_by_features_names)
+            text_dev = pd.Series(
+                filter_documents(text_dev.values, features, pool),
+                index=text_dev.index, name=text_dev.name)
             data_dev = pd.concat([text_dev, fixer_dev], axis=1)
             file_dev = results_dir + str(percent) + str(step) + '.dev.csv'
             data_dev.to_csv(file_dev, index=False)
+        if pool is not None:
+            pool.close()
+            pool.join()
         print('Finishing %s' % step)
 
 
@@ -403,10 +835,17 @@ if __name__ == '__main__':
     data_files = data_dir + data_set
     sub_dir = '/song_no_select/'
     results_files = data_files + sub_dir + 'bugs_all.csv'
-    # 写入列名
-    with open(results_files, 'w') as f:
-        f.write('when,id,who,text,fixer\n')
-    # 合并文件
-    merged_files(data_files, results_files)
-    # 将文件分成十一份
-    sortedbytimesplited(results_files)
+    store_dir = data_files + sub_dir + 'corpus/'
+    if corpus_store.open_store(store_dir) is not None:
+        # 增量处理：只处理新的bug
+        ingest_new_bugs(data_files, store_dir,
+                        cache_file=data_files + '/cache/tokens.sqlite')
+    else:
+        # 写入列名
+        with open(results_files, 'w') as f:
+            f.write('when,id,who,text,fixer\n')
+        # 合并文件
+        merged_files(data_files, results_files,
+                     cache_file=data_files + '/cache/tokens.sqlite')
+        # 将文件分成十一份
+        sortedbytimesplited(results_files)
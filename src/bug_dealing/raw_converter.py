@@ -0,0 +1,133 @@
+# -*- code:utf-8 -*-
+# 将Bugzilla原始数据（bug list, description, bug history）转换成按时间排序的语料库
+import os
+import sys
+import pandas as pd
+from multiprocessing import Pool, cpu_count
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+import corpus_store
+import prepocessing_bugs
+
+HISTORY_COLUMNS = ['When', 'Who', 'What', 'Removed', 'Added']
+
+
+def read_description(file_path):
+    # 简单的将每行文本提取出来，并去掉多余空格，组合起来便是一个描述性文件
+    with open(file_path, 'r', encoding='latin-1') as f:
+        return " ".join(map(str.strip, f.readlines()))
+
+
+def parse_history(lines):
+    """
+    (when, who) of the last FIXED resolution in the bug history lines,
+    None when the bug was never fixed
+    """
+    # 原始文件格式不统一，只处理前五列的数据
+    rows = iter(lines)
+    header = [name.strip() for name in next(rows, '').strip().split(',')[:5]]
+    if header != HISTORY_COLUMNS:
+        header = HISTORY_COLUMNS
+    when_index = header.index('When')
+    who_index = header.index('Who')
+    what_index = header.index('What')
+    added_index = header.index('Added')
+    fixed = None
+    for line in rows:
+        row = line.strip().split(',')[:5]
+        if len(row) < 5:
+            continue
+        if row[added_index].strip() == 'FIXED' and\
+                row[what_index].strip() == 'Resolution':
+            # 最后一次修复记录
+            if fixed is None or row[when_index] > fixed[0]:
+                fixed = (row[when_index], row[who_index])
+    return fixed
+
+
+def read_history(file_path):
+    with open(file_path, 'r', encoding='latin-1') as f:
+        return parse_history(f)
+
+
+def convert_bug_list(task):
+    # bug list文件里面的每一个bug：读取其描述文件和bug history文件
+    data_dir, list_file, bug_dir, description_dir, history_dir = task
+    bug_list_record = pd.read_csv(data_dir + list_file, encoding='latin-1')
+    records = []
+    for bug in bug_list_record.values:
+        bug_id = str(bug[0])
+        fixed = read_history(
+            data_dir + history_dir + bug_dir + '/' + bug_id + '.csv')
+        if fixed is None:
+            continue
+        description = read_description(
+            data_dir + description_dir + bug_dir + '/' + bug_id + '.txt')
+        records.append((fixed[0], bug_id, str(bug[8]), description,
+                        fixed[1]))
+    return records
+
+
+def convert(data_dir, list_files, description_dir='description/',
+            history_dir='bughistory_raw/', workers=None, chunk_size=1,
+            export_csv=True, buffer_size=1 << 20):
+    """
+    one pass over the raw dump: bug list files are converted in parallel,
+    fixed bugs go to raw/*.csv through buffered writers and, sorted by
+    time, to the corpus store raw/../corpus/
+    """
+    if workers is None:
+        workers = cpu_count()
+    raw_dir = data_dir + 'raw/'
+    if not os.path.exists(raw_dir):
+        os.makedirs(raw_dir)
+    # list file bugs<j>.csv -> description and history dir bugs<j>/
+    tasks = [(data_dir, list_file,
+              os.path.splitext(os.path.basename(list_file))[0],
+              description_dir, history_dir) for list_file in list_files]
+    pool = Pool(workers) if workers > 1 else None
+    results = pool.imap(convert_bug_list, tasks, chunk_size) if pool\
+        else map(convert_bug_list, tasks)
+    records = []
+    try:
+        with open(raw_dir + 'bug_summary_raw.csv', 'w', encoding='latin-1',
+                  buffering=buffer_size) as summary_f,\
+            open(raw_dir + 'bug_description_raw.csv', 'w',
+                 encoding='latin-1', buffering=buffer_size) as description_f,\
+            open(raw_dir + 'bug_list_raw.csv', 'w', encoding='latin-1',
+                 buffering=buffer_size) as list_f:
+            for task, bug_records in zip(tasks, results):
+                print('%s: %d fixed bugs' % (task[1], len(bug_records)))
+                for when, bug_id, summary, description, who in bug_records:
+                    summary_f.write(summary + '\n')
+                    description_f.write(description + '\n')
+                    list_f.write(when + ',' + who + '\n')
+                records.extend(bug_records)
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    bug_raw = pd.DataFrame(records, columns=[
+        'when', 'bug_id', 'summary', 'description', 'who'])
+    bug_raw['when'] = prepocessing_bugs.parse_when_column(bug_raw.when)
+    # 按照时间将数据进行排序
+    bug_sorted_raw = bug_raw.sort_values('when', kind='mergesort')
+    # 列式语料库，按时间排序，11份数据以行偏移保存
+    corpus = bug_sorted_raw[['when', 'bug_id', 'who']].copy()
+    corpus['text'] = bug_sorted_raw.summary + ' ' +\
+        bug_sorted_raw.description
+    corpus_store.write_corpus(data_dir + 'corpus/', corpus,
+                              label_column='who', id_column='bug_id')
+    if export_csv:
+        # 将排序好的数据写入磁盘备份
+        bug_sorted_raw.to_csv(
+            raw_dir + 'sorted_summary_description.csv',
+            columns=['description', 'summary'], header=False, index=False)
+        bug_sorted_raw.to_csv(raw_dir + 'sorted_bug_id_date_who.csv',
+                              columns=['when', 'bug_id', 'who'], index=False)
+        # 将数据分成11份
+        for i, (begin_index, end_index) in enumerate(
+                corpus_store.split_offsets(len(bug_sorted_raw), 11)):
+            bug_parted = bug_sorted_raw.iloc[begin_index:end_index]
+            bug_parted.to_csv(data_dir + str(i) + '.csv',
+                              header=False, index=False)
+    return bug_sorted_raw
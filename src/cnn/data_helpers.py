@@ -145,23 +145,24 @@ def batch_iter(data, batch_size, num_epochs=1, shuffle=False):
             yield shuffled_data[start_index: end_index]
 
 
-def load_files(train_files, dev_files, class_file):
-
+def load_window(files, store=None):
+    # text and labels of the split files,
+    # read by row offsets when a corpus store is given
+    if store is not None:
+        window = store.window(files, ['text', store.label_column])
+        return window.text, window[store.label_column]
     data_list = list()
-    for file in train_files:
+    for file in files:
         data = pd.read_csv(file, encoding='latin-1')
         data_list.append(data)
     data = pd.DataFrame(np.concatenate(data_list))
-    x_train = data[3]
-    y_train = data[4]
+    return data[3], data[4]
 
-    data_list = list()
-    for file in dev_files:
-        data = pd.read_csv(file, encoding='latin-1')
-        data_list.append(data)
-    data = pd.DataFrame(np.concatenate(data_list))
-    x_dev = data[3]
-    y_dev = data[4]
+
+def load_files(train_files, dev_files, class_file, store=None):
+
+    x_train, y_train = load_window(train_files, store)
+    x_dev, y_dev = load_window(dev_files, store)
     # 处理training data
     # document length取80%的分位数
     document_length_df = pd.DataFrame([len(xx.split(" ")) for xx in x_train])
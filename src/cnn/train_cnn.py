@@ -1,13 +1,16 @@
 #! /usr/bin/env python
 # -*- coding:utf-8 -*-
 from tensorflow.contrib.tensorboard.plugins import projector
-from gensim.models.word2vec import KeyedVectors
 import tensorflow as tf
 import os
+import sys
 import numpy as np
 import datetime
 import data_helpers
 import text_cnn
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+import embedding_store
+import corpus_store
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 
 # Parameters
@@ -95,7 +98,8 @@ train_files = [data_dir + str(i) + '.csv' for i in range(train_index)]
 test_files = [data_dir +
               str(i) + '.csv' for i in range(train_index, train_index + 1)]
 x_train, y_train, x_dev, y_dev, vocabulary_processor = data_helpers.load_files(
-    train_files, test_files, class_file)
+    train_files, test_files, class_file,
+    store=corpus_store.open_store(data_dir + 'corpus/'))
 
 
 # Training
@@ -235,19 +239,10 @@ with tf.Graph().as_default():
         initW = None
         if FLAGS.embedding_type in \
                 ['static', 'none_static', 'multiple_channels']:
-            # initial matrix with random uniform
-            initW = np.random.uniform(
-                -0.25,
-                0.25,
-                (len(vocabulary_processor.vocabulary_), FLAGS.embedding_dim))
             # load any vectors from the word2vec
-            print("Load word2vec file {}\n".format(FLAGS.embedding_file))
-            word_vectors = KeyedVectors.load_word2vec_format(
-                FLAGS.embedding_file, binary=True)
-            for word in word_vectors.vocab:
-                idx = vocabulary_processor.vocabulary_.get(word)
-                if idx != 0:
-                    initW[idx] = word_vectors[word]
+            initW = embedding_store.embedding_matrix(
+                dict(vocabulary_processor.vocabulary_._mapping),
+                FLAGS.embedding_file, FLAGS.embedding_dim)
             sess.run(cnn.W.assign(initW))
             if FLAGS.embedding_type == 'multiple_channels':
                 sess.run(cnn.W_static.assign(initW))
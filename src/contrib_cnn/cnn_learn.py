@@ -18,8 +18,8 @@ from __future__ import division
 from __future__ import print_function
 
 import argparse
+import os
 import sys
-from gensim.models.word2vec import KeyedVectors
 
 import numpy as np
 import pandas
@@ -28,6 +28,9 @@ from sklearn.model_selection import GridSearchCV
 from sklearn.metrics import accuracy_score
 import tensorflow as tf
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+import embedding_store
+
 FLAGS = None
 
 WORDS_FEATURE = 'words'
@@ -69,14 +72,9 @@ def conception_layer(net, filter_lists, kw, n_filters, document_length, pooling_
 
 
 def get_pretrained_embedding(vocabulary_processor, embedding_file, n_words, embedding_size):
-    print("Load word2vec file {}\n".format(embedding_file))
-    initW = np.random.uniform(-0.25, 0.25, (n_words, embedding_size))
-    word_vectors = KeyedVectors.load_word2vec_format(embedding_file, binary=True)
-    for word in word_vectors.vocab:
-        idx = vocabulary_processor.vocabulary_.get(word)
-        if idx != 0:
-            initW[idx] = word_vectors[word]
-    return initW
+    return embedding_store.embedding_matrix(
+        dict(vocabulary_processor.vocabulary_._mapping),
+        embedding_file, embedding_size, n_words=n_words)
 
 
 def cnn_model(features, labels, mode, params):
@@ -0,0 +1,109 @@
+# -*- code:utf-8 -*-
+# 参数扫描时复用计算图：同一结构、同一输入形状只构图一次，每次运行前重置变量
+import time
+import collections
+import numpy as np
+import tensorflow as tf
+
+from models import Model
+
+
+class SweepRunner(object):
+    """
+    one graph and session per model type and input shape,
+    variables are reinitialized and embeddings fed for every run
+    """
+
+    def __init__(self, session_conf=None, length_bucket=1, max_graphs=4,
+                 max_to_keep=5):
+        # documents are zero padded up to a multiple of length_bucket,
+        # 1 keeps the exact document length of every run; padding changes
+        # the models (last lstm step, pooling windows), so only sweeps
+        # whose runs would share graphs should bucket
+        self.session_conf = session_conf
+        self.length_bucket = length_bucket
+        self.max_graphs = max_graphs
+        self.max_to_keep = max_to_keep
+        self.entries = collections.OrderedDict()
+        self.runs = 0
+        self.builds = 0
+        self.build_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def graph_config(self, config_model, embedding_rows):
+        config = dict(config_model)
+        config['max_sent_length'] = int(np.ceil(
+            float(config['max_sent_length']) / self.length_bucket)) *\
+            self.length_bucket
+        config['embedding_shape'] = (
+            int(embedding_rows), int(config['embedding_shape'][1]))
+        return config
+
+    def _build(self, model_type, config):
+        start = time.time()
+        graph = tf.Graph()
+        with graph.as_default():
+            model = Model(model_type=model_type, config_model=config)
+            saver = tf.train.Saver(
+                var_list=tf.trainable_variables(),
+                max_to_keep=self.max_to_keep)
+            init_op = tf.group(tf.global_variables_initializer(),
+                               tf.local_variables_initializer())
+            # runs must not add ops to a shared graph
+            graph.finalize()
+        sess = tf.Session(graph=graph, config=self.session_conf)
+        seconds = time.time() - start
+        self.builds += 1
+        self.build_seconds += seconds
+        return {'model': model, 'sess': sess, 'saver': saver,
+                'init_op': init_op, 'seconds': seconds}
+
+    def run(self, model_type, config_model, embedding, capacity=None):
+        """
+        (model, sess, saver) with freshly initialized variables and
+        embedding loaded; capacity: embedding rows of the graph, set it
+        to the largest vocabulary of the sweep to share one graph
+        """
+        config = self.graph_config(
+            config_model, max(capacity or 0, len(embedding)))
+        key = (model_type, repr(sorted(config.items())))
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            if len(self.entries) >= self.max_graphs:
+                # least recently used graph
+                _, old = self.entries.popitem(last=False)
+                old['sess'].close()
+            entry = self._build(model_type, config)
+            print("Built {} graph in {:.1f}s".format(
+                model_type, entry['seconds']))
+        else:
+            self.saved_seconds += entry['seconds']
+            print("Reuse {} graph, {:.1f}s saved".format(
+                model_type, entry['seconds']))
+        self.entries[key] = entry
+        self.runs += 1
+        model = entry['model']
+        entry['sess'].run(entry['init_op'])
+        if config['embedding_type'] != 'rand':
+            model.load_embedding(entry['sess'], embedding)
+        return model, entry['sess'], entry['saver']
+
+    def pad(self, x, model):
+        # zero pad the id matrix to the document length of the graph
+        length = model.config['max_sent_length']
+        if x.shape[1] == length:
+            return x
+        padded = np.zeros((len(x), length), dtype=x.dtype)
+        padded[:, :x.shape[1]] = x
+        return padded
+
+    def report(self):
+        return "sweep: {} runs on {} graph builds ({:.1f}s), " \
+            "about {:.1f}s saved by reuse".format(
+                self.runs, self.builds,
+                self.build_seconds, self.saved_seconds)
+
+    def close(self):
+        for entry in self.entries.values():
+            entry['sess'].close()
+        self.entries.clear()
@@ -4,6 +4,7 @@ import os
 import numpy as np
 import datetime
 import data_utls
+import architectures
 from models import Model
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 
@@ -66,6 +67,18 @@ tf.flags.DEFINE_string(
 tf.flags.DEFINE_float(
     "percentile", 1.0,
     "features selection percentile (default: 0.3)")
+tf.flags.DEFINE_string(
+    "input_pipeline", "feed_dict",
+    "feed_dict or dataset: in-graph batches with prefetch")
+tf.flags.DEFINE_boolean(
+    "sparse_labels", True,
+    "int32 class ids instead of one-hot labels")
+tf.flags.DEFINE_string(
+    "softmax", "full",
+    "full, sampled or nce: softmax of the training steps")
+tf.flags.DEFINE_integer(
+    "num_sampled", 512,
+    "negative classes of sampled or nce softmax (default: 512)")
 FLAGS = tf.flags.FLAGS
 
 
@@ -74,23 +87,26 @@ def train_step(cnn, train_summary_writer, sess, x_batch_train, y_batch_train):
     A single training step
     """
     feed_dict = {
-        cnn.input_x: x_batch_train,
-        cnn.input_y: y_batch_train,
         cnn.dropout_keep_prob: FLAGS.dropout_keep_prob,
         cnn.is_training: True
     }
+    # batches of the dataset pipeline are not fed
+    if x_batch_train is not None:
+        feed_dict[cnn.input_x] = x_batch_train
+        feed_dict[cnn.input_y] = y_batch_train
+    # accuracy with the full softmax, the negative cost with the sampled
+    # one, whose training steps never compute the full logits
     _, step_train, summaries,\
         loss, acc_at_1 =\
         sess.run([cnn.train_op, cnn.global_step,
-                  cnn.train_summary_op, cnn.cost, cnn.accuracy_at_1],
+                  cnn.train_summary_op, cnn.cost, cnn.train_score],
                  feed_dict)
     if step_train % FLAGS.print_loss == 0:
         time_str = datetime.datetime.now().isoformat()
         print(
-            "{}: step {}, loss {:g}, acc_1 {:g}".format(time_str,
-                                                        step_train,
-                                                        loss,
-                                                        acc_at_1))
+            "{}: step {}, loss {:g}, {} {:g}".format(
+                time_str, step_train, loss,
+                'acc_1' if FLAGS.softmax == 'full' else 'score', acc_at_1))
     train_summary_writer.add_summary(summaries, step_train)
     return acc_at_1
 
@@ -155,6 +171,9 @@ def main(_):
                    "text_inception_dense"]
     model_types = ["textcnn"]
     # model_types = ["text_conv_dense"]
+    # unknown model types fail before any data is loaded
+    for model_type in model_types:
+        architectures.check_model_type(model_type)
     train_indexes = range(1, 2)
     # song_no_select_summary_description song_no_select
     train_set = "chrome"
@@ -187,8 +206,15 @@ def main(_):
                 'train_phase': True,
                 'batch_size': FLAGS.batch_size,
                 'decay_steps': decay_steps,
-                'decay_rate': FLAGS.decay_rate
+                'decay_rate': FLAGS.decay_rate,
+                'input_pipeline': FLAGS.input_pipeline,
+                'sparse_labels': FLAGS.sparse_labels,
+                'softmax': FLAGS.softmax,
+                'num_sampled': FLAGS.num_sampled
             }
+            # size of the model before its graph is built
+            print("{}: {}".format(
+                model_type, architectures.info(model_type, config_model)))
             data_results = results_dir + model_type + "/"
             FLAGS.checkpointDir = checkpointDir + model_type
             if not tf.gfile.Exists(data_results):
@@ -245,16 +271,22 @@ def train(
                 train_summary_dir, sess.graph)
 
             # Generate batches
-            batches = data_utls.batch_generator(
-                x_train, y_train, lb,
-                FLAGS.batch_size, FLAGS.num_epochs,
-                shuffle=True)
+            if FLAGS.input_pipeline == 'dataset':
+                # batches are assembled and prefetched in the graph
+                num_steps = cnn.init_dataset(
+                    sess, x_train, data_utls.label_ids(lb, y_train),
+                    FLAGS.batch_size, FLAGS.num_epochs, shuffle=True)
+                batches = ((None, None, None) for _ in range(num_steps))
+            else:
+                batches = data_utls.batch_generator(
+                    x_train, y_train, lb,
+                    FLAGS.batch_size, FLAGS.num_epochs,
+                    shuffle=True, sparse=FLAGS.sparse_labels)
             # Training loop. For each batch...
-            best_accuracy = 0.0
+            best_accuracy = 0.0 if FLAGS.softmax == 'full' else -np.inf
             last_improvement_step = 0
             numer_iter = int((len(y_train) - 1) / FLAGS.batch_size) + 1
-            for batch, _ in batches:
-                x_batch, y_batch = zip(*batch)
+            for x_batch, y_batch, _ in batches:
                 accuracy = train_step(
                     cnn, train_summary_writer, sess, x_batch, y_batch)
                 current_step = tf.train.global_step(sess, cnn.global_step)
@@ -282,14 +314,14 @@ def train(
                 test_summary_dir, sess.graph)
             print("\n Testing:")
             dev_batches = data_utls.batch_generator(
-                x_dev, y_dev, lb, FLAGS.batch_size)
+                x_dev, y_dev, lb, FLAGS.batch_size,
+                sparse=FLAGS.sparse_labels)
             step = 0
             top_k_values = []
             top_k_indices = []
             labels = []
-            for dev_batch, label in dev_batches:
+            for x_dev_batch, y_dev_batch, label in dev_batches:
                 step += 1
-                x_dev_batch, y_dev_batch = zip(*dev_batch)
                 top_k_value, top_k_indice, loss, recall, precision = test_step(
                     cnn, sess, x_dev_batch, y_dev_batch, step,
                     writer=test_summary_writer)
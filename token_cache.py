@@ -0,0 +1,104 @@
+# -*- code:utf-8 -*-
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+
+def cache_namespace(name, version, **options):
+    # preprocessing function + version + options, part of every key
+    return '%s:%s:%s' % (name, version, json.dumps(options, sort_keys=True))
+
+
+def content_hash(content):
+    return hashlib.sha1(content.encode('utf8')).hexdigest()
+
+
+class TokenCache(object):
+    """
+    on-disk cache of token streams keyed by
+    (bug id, content hash, preprocessing namespace),
+    the least recently used entries are evicted above max_bytes
+    """
+
+    def __init__(self, cache_file, max_bytes=2 ** 30):
+        cache_dir = os.path.dirname(cache_file)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(cache_file, timeout=60)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS tokens ('
+            'key TEXT PRIMARY KEY, bug_id TEXT, tokens TEXT, '
+            'size INTEGER, used REAL)')
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS tokens_used ON tokens (used)')
+        self.conn.commit()
+        self.total_bytes = self.conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM tokens').fetchone()[0]
+
+    @staticmethod
+    def make_key(bug_id, content, namespace):
+        key = '\0'.join([namespace, str(bug_id), content_hash(content)])
+        return hashlib.sha1(key.encode('utf8')).hexdigest()
+
+    def get_many(self, entries, namespace):
+        # entries are (bug_id, content) pairs, misses come back as None
+        keys = [self.make_key(bug_id, content, namespace)
+                for bug_id, content in entries]
+        found = {}
+        for begin in range(0, len(keys), 500):
+            part = keys[begin:begin + 500]
+            rows = self.conn.execute(
+                'SELECT key, tokens FROM tokens WHERE key IN (%s)' %
+                ','.join('?' * len(part)), part)
+            for key, tokens in rows:
+                found[key] = json.loads(tokens)
+        if found:
+            now = time.time()
+            self.conn.executemany(
+                'UPDATE tokens SET used = ? WHERE key = ?',
+                [(now, key) for key in found])
+            self.conn.commit()
+        return [found.get(key) for key in keys]
+
+    def put_many(self, entries, namespace, tokens_list):
+        now = time.time()
+        rows = []
+        for (bug_id, content), tokens in zip(entries, tokens_list):
+            value = json.dumps(list(tokens))
+            rows.append((self.make_key(bug_id, content, namespace),
+                         str(bug_id), value, len(value), now))
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO tokens VALUES (?, ?, ?, ?, ?)', rows)
+        self.conn.commit()
+        self.total_bytes += sum(row[3] for row in rows)
+        if self.total_bytes > self.max_bytes:
+            self._evict()
+
+    def get(self, bug_id, content, namespace):
+        return self.get_many([(bug_id, content)], namespace)[0]
+
+    def put(self, bug_id, content, namespace, tokens):
+        self.put_many([(bug_id, content)], namespace, [tokens])
+
+    def _evict(self):
+        # drop the oldest entries until 90% of max_bytes is left
+        target = int(self.max_bytes * 0.9)
+        total = self.conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM tokens').fetchone()[0]
+        rows = self.conn.execute(
+            'SELECT key, size FROM tokens ORDER BY used').fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= target:
+                break
+            evicted.append((key,))
+            total -= size
+        self.conn.executemany('DELETE FROM tokens WHERE key = ?', evicted)
+        self.conn.commit()
+        self.total_bytes = total
+
+    def close(self):
+        self.conn.close()